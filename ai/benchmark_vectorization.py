@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+
+# fetch.py insists on a key at import time; this script never calls Gemini
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-only")
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import fetch
+from text_index import IncrementalTextIndex
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+
+
+def build_fit_index(texts):
+    """The fit-based vectorizer, configured exactly like VectorizationManager.initialize"""
+    vectorizer = TfidfVectorizer(
+        stop_words="english",
+        min_df=1,
+        ngram_range=(1, 2),
+        max_features=5000,
+        use_idf=True,
+        sublinear_tf=True
+    )
+    return vectorizer, vectorizer.fit_transform(texts)
+
+
+def top_k(vectors, query_vector, k=TOP_K):
+    scores = (vectors @ query_vector.T).toarray().ravel()
+    return set(fetch.top_k_indices(scores, k).tolist())
+
+
+def benchmark_vectorization():
+    """Compare the fit-based TF-IDF path with the incremental hashed index"""
+    fetch.VectorizationManager.prepare_records(fetch.json_data)
+    usernames = [fetch.get_username(item.get("channel_info", "")) for item in fetch.json_data]
+    texts = [fetch.VectorizationManager.build_influencer_text(item) for item in fetch.json_data]
+
+    # Queries: every distinct enhanced category, phrased like a business description
+    categories = sorted(set(fetch.enhanced_categories_cache.values()))
+    queries = [f"{category.replace('_', ' ')} brand {category} products" for category in categories]
+
+    start = time.perf_counter()
+    vectorizer, fit_vectors = build_fit_index(texts)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = IncrementalTextIndex()
+    index.upsert_many(usernames, texts)
+    incremental_vectors = index.matrix(usernames)
+    build_seconds = time.perf_counter() - start
+
+    # Matching quality: overlap of the top-K influencers per query
+    overlaps = []
+    for query in queries:
+        fit_top = top_k(fit_vectors, vectorizer.transform([query]))
+        incremental_top = top_k(incremental_vectors, index.transform([query]))
+        overlaps.append(len(fit_top & incremental_top) / TOP_K)
+
+    # Cost of adding one influencer: full refit vs. incremental upsert
+    new_text = texts[0] + " newcomer"
+    start = time.perf_counter()
+    build_fit_index(texts + [new_text])
+    refit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.upsert_many(["__benchmark_newcomer__"], [new_text])
+    upsert_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.matrix(usernames + ["__benchmark_newcomer__"])
+    rematerialize_seconds = time.perf_counter() - start
+
+    logger.info(f"Corpus: {len(texts)} influencers, {len(queries)} category queries")
+    logger.info(f"Top-{TOP_K} overlap with fit-based TF-IDF: mean {np.mean(overlaps):.2f}, min {np.min(overlaps):.2f}")
+    logger.info(f"Initial build: fit {fit_seconds * 1000:.1f}ms, incremental {build_seconds * 1000:.1f}ms")
+    # The upsert alone is O(change); re-weighting influencer_vectors is O(catalog) and always follows it
+    logger.info(f"Add one influencer: refit {refit_seconds * 1000:.1f}ms, "
+                f"incremental {(upsert_seconds + rematerialize_seconds) * 1000:.2f}ms "
+                f"(upsert {upsert_seconds * 1000:.2f}ms + re-weight influencer_vectors {rematerialize_seconds * 1000:.2f}ms)")
+
+
+if __name__ == "__main__":
+    benchmark_vectorization()
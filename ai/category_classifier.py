@@ -0,0 +1,270 @@
+import os
+import json
+import hashlib
+import time
+import logging
+import warnings
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import KFold, cross_val_predict
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+logger = logging.getLogger(__name__)
+
+# Trained pipeline plus its metadata, written with joblib
+MODEL_FILE = os.getenv("CATEGORY_MODEL_FILE", "category_classifier.joblib")
+# Creators labeled by the classifier rather than Gemini; kept out of the training labels
+PREDICTED_FILE = "predicted_categories.json"
+
+# Predictions are accepted without asking Gemini above a confidence threshold, picked at
+# training time as the lowest one whose cross-validated accuracy reaches TARGET_PRECISION
+TARGET_PRECISION = float(os.getenv("CATEGORY_TARGET_PRECISION", 0.9))
+MIN_TRAINING_LABELS = 20
+MIN_CALIBRATION_SAMPLES = 10    # Accepted cross-validation predictions a threshold must rest on
+
+COUNT_COLUMNS = ["followers", "avg_likes", "posts", "total_likes", "new_post_avg_like"]
+SCORE_COLUMNS = ["influence_score"]
+NUMERIC_COLUMNS = COUNT_COLUMNS + SCORE_COLUMNS + ["engagement"]
+SUFFIX_MULTIPLIERS = {"k": 1e3, "m": 1e6, "b": 1e9}
+
+
+def parse_counts(values: pd.Series) -> pd.Series:
+    """Vectorized parse of counts like '475.8m' or '3.3k' (unparseable values become NaN)"""
+    text = values.astype(str).str.strip().str.lower().str.replace(",", "", regex=False)
+    multiplier = text.str[-1].map(SUFFIX_MULTIPLIERS).fillna(1.0)
+    number = pd.to_numeric(text.where(~text.str[-1].isin(list(SUFFIX_MULTIPLIERS)), text.str[:-1]), errors="coerce")
+    return number * multiplier
+
+
+def influencer_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Model inputs for records: username text, country and log-scaled numeric metrics"""
+    raw = pd.DataFrame.from_records(records)
+    frame = pd.DataFrame(index=raw.index)
+    frame["username"] = raw.get("channel_info", pd.Series("", index=raw.index)).fillna("").astype(str).str.strip()
+    frame["country"] = raw.get("country", pd.Series("Unknown", index=raw.index)).fillna("Unknown").astype(str)
+    for column in COUNT_COLUMNS:
+        values = parse_counts(raw[column]) if column in raw else pd.Series(np.nan, index=raw.index)
+        frame[column] = np.log1p(values.clip(lower=0)).fillna(0.0)
+    for column in SCORE_COLUMNS:
+        frame[column] = pd.to_numeric(raw.get(column), errors="coerce").fillna(0.0) if column in raw else 0.0
+    engagement = raw["avg_engagement"] if "avg_engagement" in raw else pd.Series("0", index=raw.index)
+    frame["engagement"] = pd.to_numeric(
+        engagement.astype(str).str.replace("%", "", regex=False), errors="coerce"
+    ).fillna(0.0)
+    return frame
+
+
+def build_pipeline() -> Pipeline:
+    features = ColumnTransformer([
+        # Character n-grams pick up name fragments like "music", "fc", "official" or "tv"
+        ("username", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), lowercase=True, sublinear_tf=True), "username"),
+        ("country", OneHotEncoder(handle_unknown="ignore"), ["country"]),
+        ("numeric", StandardScaler(), NUMERIC_COLUMNS),
+    ])
+    return Pipeline([
+        ("features", features),
+        ("classifier", LogisticRegression(max_iter=2000, C=1.0)),
+    ])
+
+
+def training_examples(records: List[Dict[str, Any]], categories: Dict[str, str], exclude=()) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Records with a known category (keyed by stripped channel_info) and their normalized labels"""
+    excluded = set(exclude)
+    labeled, labels = [], []
+    for record in records:
+        username = str(record.get("channel_info", "")).strip()
+        category = categories.get(username)
+        if category and username not in excluded:
+            labeled.append(record)
+            labels.append(str(category).strip().lower())
+    return labeled, labels
+
+
+def training_key(records: List[Dict[str, Any]], labels: List[str], target_precision: float = TARGET_PRECISION) -> str:
+    """
+    Hash of what a model is trained on: the sorted (username, label) pairs, the pipeline's
+    settings and the target precision. Corrected labels change it even when the count doesn't.
+    """
+    pairs = sorted(zip((str(record.get("channel_info", "")).strip() for record in records), labels))
+    settings = build_pipeline().get_params(deep=True)
+    config = {
+        name: value for name, value in sorted(settings.items())
+        if isinstance(value, (str, int, float, bool, tuple, list, type(None)))
+    }
+    payload = json.dumps([pairs, config, target_precision], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def cross_validate(records: List[Dict[str, Any]], labels: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Out-of-fold (confidence, correct) for every labeled record"""
+    folds = KFold(n_splits=min(5, len(labels)), shuffle=True, random_state=0)
+    with warnings.catch_warnings():
+        # Rare categories are missing from some training folds; those rows just score low
+        warnings.simplefilter("ignore", RuntimeWarning)
+        probabilities = cross_val_predict(build_pipeline(), influencer_frame(records), labels, cv=folds, method="predict_proba")
+    classes = np.array(sorted(set(labels)))
+    return probabilities.max(axis=1), classes[probabilities.argmax(axis=1)] == np.array(labels)
+
+
+def calibrate_threshold(confidence: np.ndarray, correct: np.ndarray, target_precision: float) -> float:
+    """
+    Lowest confidence threshold whose accepted predictions are at least target_precision
+    accurate, with MIN_CALIBRATION_SAMPLES behind it. inf when no threshold qualifies.
+    """
+    order = np.argsort(-confidence, kind="stable")
+    accepted = np.arange(1, len(order) + 1)
+    precision = np.cumsum(correct[order]) / accepted
+    qualifies = np.nonzero((precision >= target_precision) & (accepted >= MIN_CALIBRATION_SAMPLES))[0]
+    if len(qualifies) == 0:
+        return float("inf")
+    return float(confidence[order][qualifies[-1]])
+
+
+def train(records: List[Dict[str, Any]], labels: List[str], target_precision: float = TARGET_PRECISION) -> Dict[str, Any]:
+    confidence, correct = cross_validate(records, labels)
+    threshold = calibrate_threshold(confidence, correct, target_precision)
+    accepted = confidence >= threshold
+
+    pipeline = build_pipeline()
+    pipeline.fit(influencer_frame(records), labels)
+    return {
+        "pipeline": pipeline,
+        "threshold": threshold,
+        "training_rows": len(labels),
+        "training_key": training_key(records, labels, target_precision),
+        "trained_at": time.time(),
+        "metrics": {
+            "cv_accuracy": round(float(correct.mean()), 4),
+            "target_precision": target_precision,
+            "cv_accepted_share": round(float(accepted.mean()), 4),
+            "cv_accepted_accuracy": round(float(correct[accepted].mean()), 4) if accepted.any() else None,
+        },
+    }
+
+
+def save_model(model: Dict[str, Any], path: str = MODEL_FILE):
+    temporary_path = path + ".tmp"
+    joblib.dump(model, temporary_path)
+    os.replace(temporary_path, path)
+
+
+def load_model(path: str = MODEL_FILE) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+
+def load_predicted(path: str = PREDICTED_FILE) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_predicted(updates: Dict[str, Dict[str, Any]], path: str = PREDICTED_FILE):
+    predicted = load_predicted(path)
+    predicted.update(updates)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(predicted, f, indent=2)
+    os.replace(temporary_path, path)
+
+
+def load_or_train(records: List[Dict[str, Any]], categories: Dict[str, str], path: str = MODEL_FILE) -> Optional[Dict[str, Any]]:
+    """
+    The saved model, retrained first when the usable labels (or the feature setup) changed
+    since it was trained, see training_key. None when there are too few labels (or classes)
+    to train on.
+    """
+    labeled, labels = training_examples(records, categories, exclude=load_predicted())
+    if len(labels) < MIN_TRAINING_LABELS or len(set(labels)) < 2:
+        logger.info(f"Only {len(labels)} labeled creators, not using the local classifier")
+        return None
+
+    model = load_model(path)
+    if model is None or model.get("training_key") != training_key(labeled, labels):
+        started = time.perf_counter()
+        model = train(labeled, labels)
+        save_model(model, path)
+        logger.info(
+            f"Trained category classifier on {len(labels)} creators in {time.perf_counter() - started:.2f}s "
+            f"(threshold {model['threshold']:.2f}, {model['metrics']})"
+        )
+    return model
+
+
+def predict(model: Dict[str, Any], records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(category, confidence) arrays for records, in one batch"""
+    if not records:
+        return np.array([], dtype=object), np.array([])
+    probabilities = model["pipeline"].predict_proba(influencer_frame(records))
+    classes = model["pipeline"].classes_
+    return classes[probabilities.argmax(axis=1)], probabilities.max(axis=1)
+
+
+def split_by_confidence(model: Optional[Dict[str, Any]], records: List[Dict[str, Any]], usernames: List[str]):
+    """
+    Accept predictions at or above the model's calibrated threshold and leave the rest for Gemini.
+    Returns ({username: {"category", "confidence"}}, records still needing Gemini).
+    """
+    if model is None:
+        return {}, list(records)
+    threshold = model["threshold"]
+    categories, confidence = predict(model, records)
+    accepted, uncertain = {}, []
+    for record, username, category, score in zip(records, usernames, categories, confidence):
+        if score >= threshold:
+            accepted[username] = {"category": str(category), "confidence": round(float(score), 4)}
+        else:
+            uncertain.append(record)
+    return accepted, uncertain
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the local influencer category classifier or batch-predict with it")
+    parser.add_argument("command", choices=["train", "predict"])
+    parser.add_argument("--input", default="output_file.json", help="Influencer records")
+    parser.add_argument("--categories", default="enhanced_categories.json", help="Known username -> category labels")
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--target-precision", type=float, default=TARGET_PRECISION)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    args = parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+    categories = {}
+    if os.path.exists(args.categories):
+        with open(args.categories, 'r', encoding='utf-8') as f:
+            categories = json.load(f)
+    labeled, labels = training_examples(json_data, categories, exclude=load_predicted())
+
+    if args.command == "train":
+        started = time.perf_counter()
+        model = train(labeled, labels, args.target_precision)
+        save_model(model, args.model)
+        logger.info(f"Trained on {len(labels)} creators ({len(set(labels))} categories) in {time.perf_counter() - started:.2f}s")
+        logger.info(f"Confidence threshold {model['threshold']:.2f}: {json.dumps(model['metrics'])}")
+        logger.info(f"Saved to {args.model}")
+    else:
+        model = load_model(args.model)
+        if model is None:
+            raise SystemExit(f"No model at {args.model}; run 'train' first")
+        started = time.perf_counter()
+        predicted, confidence = predict(model, json_data)
+        elapsed = time.perf_counter() - started
+        confident = confidence >= model["threshold"]
+        logger.info(f"Predicted {len(json_data)} creators in {elapsed:.2f}s; {confident.sum()} at or above {model['threshold']:.2f}")
+        for record, category, score in list(zip(json_data, predicted, confidence))[:20]:
+            logger.info(f"{str(record.get('channel_info', '')).strip():<30}{category:<25}{score:.2f}")
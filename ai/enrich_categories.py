@@ -3,6 +3,7 @@ import os
 import time
 import logging
 from google import generativeai as genai
+from category_classifier import load_or_train, save_predicted, split_by_confidence
 
 # Configure logging
 logging.basicConfig(
@@ -20,14 +21,53 @@ def get_username(channel_info):
         return "Unknown"
     return channel_info.strip()
 
+def build_category_prompt(batch):
+    """Prompt asking Gemini for one category per influencer in batch"""
+    prompt_parts = [
+        "You are an expert in influencer marketing categorization. For each influencer below, " 
+        "analyze their username and provide a specific, accurate category label (e.g., 'beauty', " 
+        "'tech', 'fitness', 'gaming', 'sports', 'entertainment', 'music', 'fashion', etc.). Return ONLY " 
+        "a JSON object where each key is the influencer's username and value is their category. " 
+        "Be very specific with categories.\n\n"
+    ]
+    
+    for influencer in batch:
+        username = get_username(influencer.get("channel_info", "Unknown"))
+        followers = influencer.get("followers", "Unknown")
+        avg_likes = influencer.get("avg_likes", "Unknown")
+        country = influencer.get("country", "Unknown")
+        
+        # Add any available context
+        prompt_parts.append(f"Username: {username}\nFollowers: {followers}\nAvg Likes: {avg_likes}\nCountry: {country}\n\n")
+    
+    return "".join(prompt_parts)
+
+def parse_category_response(response_text):
+    """Username -> category from Gemini's answer to build_category_prompt (raises ValueError on bad JSON)"""
+    # Extract JSON part if necessary
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+        
+    # Parse JSON response
+    category_updates = json.loads(response_text)
+    
+    categories = {}
+    for username, category in category_updates.items():
+        clean_username = username.strip()
+        if clean_username.startswith('@'):
+            clean_username = clean_username[1:]
+        categories[clean_username] = category
+    return categories
+
 def enrich_categories(input_file="output_file.json"):
-    """Use Gemini to get more accurate categories for influencers and save to file"""
+    """
+    Categorize influencers missing from OUTPUT_FILE and save to file. The local classifier
+    (category_classifier.py) labels the creators it is confident about; only the rest
+    are sent to Gemini.
+    """
     try:
-        # Check if file already exists to avoid re-running API calls
-        if os.path.exists(OUTPUT_FILE):
-            logger.info(f"Enhanced categories file already exists at {OUTPUT_FILE}. Skipping API calls.")
-            return
-            
         logger.info(f"Loading influencer data from {input_file}...")
         
         # Load the influencer data
@@ -36,19 +76,40 @@ def enrich_categories(input_file="output_file.json"):
             
         logger.info(f"Loaded {len(json_data)} influencer records")
         
-        # Initialize result dictionary
+        # Keep categories from earlier runs, so API calls are only made for new creators
         enhanced_categories = {}
+        if os.path.exists(OUTPUT_FILE):
+            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+                enhanced_categories = json.load(f)
+        new_influencers = [
+            influencer for influencer in json_data
+            if get_username(influencer.get("channel_info", "Unknown")) not in enhanced_categories
+        ]
+        if not new_influencers:
+            logger.info(f"Every influencer already has a category in {OUTPUT_FILE}. Skipping API calls.")
+            return
         
-        # Configure the API key (set your API key here or use environment variable)
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            api_key = input("Please enter your Gemini API key: ")
-            
-        genai.configure(api_key=api_key)
+        # Confident local predictions need no API call
+        classifier = load_or_train(json_data, enhanced_categories)
+        predicted, all_influencers = split_by_confidence(
+            classifier, new_influencers,
+            [get_username(influencer.get("channel_info", "Unknown")) for influencer in new_influencers]
+        )
+        enhanced_categories.update({username: prediction["category"] for username, prediction in predicted.items()})
+        if predicted:
+            save_predicted(predicted)
+        logger.info(f"{len(new_influencers)} new creators: {len(predicted)} classified locally, {len(all_influencers)} left for Gemini")
+        
+        if all_influencers:
+            # Configure the API key (set your API key here or use environment variable)
+            api_key = os.environ.get("GEMINI_API_KEY")
+            if not api_key:
+                api_key = input("Please enter your Gemini API key: ")
+                
+            genai.configure(api_key=api_key)
         
         # Process influencers in batches to avoid token limits
         batch_size = 25
-        all_influencers = json_data.copy()
         total_batches = (len(all_influencers) + batch_size - 1) // batch_size
         
         for batch_num in range(total_batches):
@@ -58,48 +119,18 @@ def enrich_categories(input_file="output_file.json"):
             
             logger.info(f"Processing batch {batch_num+1}/{total_batches} (items {start_idx+1}-{end_idx})")
             
-            # Build prompt for categorization
-            prompt_parts = [
-                "You are an expert in influencer marketing categorization. For each influencer below, " 
-                "analyze their username and provide a specific, accurate category label (e.g., 'beauty', " 
-                "'tech', 'fitness', 'gaming', 'sports', 'entertainment', 'music', 'fashion', etc.). Return ONLY " 
-                "a JSON object where each key is the influencer's username and value is their category. " 
-                "Be very specific with categories.\n\n"
-            ]
-            
-            for influencer in batch:
-                username = get_username(influencer.get("channel_info", "Unknown"))
-                followers = influencer.get("followers", "Unknown")
-                avg_likes = influencer.get("avg_likes", "Unknown")
-                country = influencer.get("country", "Unknown")
-                
-                # Add any available context
-                prompt_parts.append(f"Username: {username}\nFollowers: {followers}\nAvg Likes: {avg_likes}\nCountry: {country}\n\n")
-            
-            full_prompt = "".join(prompt_parts)
+            full_prompt = build_category_prompt(batch)
             
             # Call Gemini for category refinement
             try:
                 model = genai.GenerativeModel("gemini-2.5-flash")
                 response = model.generate_content(full_prompt)
-                response_text = response.text
-                
-                # Extract JSON part if necessary
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].split("```")[0].strip()
-                    
-                # Parse JSON response
-                category_updates = json.loads(response_text)
+                category_updates = parse_category_response(response.text)
                 
                 # Update categories in our result dictionary
                 for username, category in category_updates.items():
-                    clean_username = username.strip()
-                    if clean_username.startswith('@'):
-                        clean_username = clean_username[1:]
-                    enhanced_categories[clean_username] = category
-                    logger.info(f"Enhanced category for {clean_username}: {category}")
+                    enhanced_categories[username] = category
+                    logger.info(f"Enhanced category for {username}: {category}")
                     
                 # Don't overload the API
                 if batch_num < total_batches - 1:
@@ -1,15 +1,25 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+import asyncio
+import bisect
+import hashlib
+import heapq
+import ipaddress
 import json
 import logging
 import math
 import random
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError, field_validator
 import google.generativeai as genai
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 import numpy as np
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from google.api_core.exceptions import GoogleAPICallError, NotFound
@@ -23,17 +33,19 @@ import numpy as np
 from sklearn.linear_model import LinearRegression
 import pandas as pd
 from io import StringIO
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from text_index import IncrementalTextIndex
+from job_queue import JobQueue, JOB_STATUSES
+from timeseries_store import TimeSeriesStore, INTERVALS, AGGREGATES, downsample
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background job workers, see the background jobs part
+    start_job_workers(asyncio.get_running_loop())
+    yield
+    stop_job_workers()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  
-    allow_credentials=True,
-    allow_methods=["*"], 
-    allow_headers=["*"],  
-)
+app = FastAPI(lifespan=lifespan)
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -46,27 +58,271 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 JSON_FILE_PATH = 'output_file.json'
+ENHANCED_CATEGORIES_FILE = 'enhanced_categories.json'
+
+# Written by `main.py --incremental`: which records changed between two versions of JSON_FILE_PATH
+CHANGE_LIST_PATH = JSON_FILE_PATH + ".changes.json"
+
+def file_digest(path: str) -> str:
+    """SHA-1 of a file's bytes ('' when it doesn't exist)"""
+    if not os.path.exists(path):
+        return ""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def snapshot_version(file_sha: str, categories_sha: str) -> str:
+    """Identifies a dataset snapshot: the JSON file plus the enhanced categories applied to it"""
+    return hashlib.sha1(f"{file_sha}:{categories_sha}".encode("utf-8")).hexdigest()[:12]
 
 try:
     with open(JSON_FILE_PATH, 'r') as json_file:
         json_data = json.load(json_file)
     logger.info("JSON data loaded successfully")
+    # Identifies the loaded snapshot so derived results can be cached per dataset version
+    dataset_file_sha = file_digest(JSON_FILE_PATH)
+    dataset_categories_sha = file_digest(ENHANCED_CATEGORIES_FILE)
+    dataset_version = snapshot_version(dataset_file_sha, dataset_categories_sha)
 except FileNotFoundError:
     raise Exception(f"JSON file not found at {JSON_FILE_PATH}")
 except json.JSONDecodeError:
     raise Exception(f"Invalid JSON format in {JSON_FILE_PATH}")
 
+# Admission control part
+# Expensive routes are grouped; each group has a concurrency limit with a bounded wait
+# queue, and each client gets a token bucket per group. Requests over the limits are
+# rejected right away (429 for a client over its rate, 503 when the group is saturated)
+# with a Retry-After header, so cheap endpoints keep answering under load.
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 2))
+ADMISSION_MAX_TRACKED_CLIENTS = int(os.getenv("ADMISSION_MAX_TRACKED_CLIENTS", 10000))
+MAX_RECOMMENDATION_COUNT = int(os.getenv("MAX_RECOMMENDATION_COUNT", 50))
+# Comma-separated proxy addresses or networks whose X-Forwarded-For headers are believed
+ADMISSION_TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if entry.strip()
+]
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class TokenBuckets:
+    """Per-client token buckets; the least recently seen clients are forgotten first"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = ADMISSION_MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()  # client -> (tokens, last refill time)
+
+    def take(self, client: str):
+        now = time.monotonic()
+        tokens, last = self.buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.buckets[client] = (tokens, now)
+            raise AdmissionRejected(429, "Too many requests", (1 - tokens) / self.rate)
+        self.buckets[client] = (tokens - 1, now)
+        while len(self.buckets) > self.max_clients:
+            self.buckets.popitem(last=False)
+
+class AdmissionGate:
+    """Concurrency limit with a bounded queue of waiters"""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, rate: float, burst: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.buckets = TokenBuckets(rate, burst)
+        self.stats = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    async def acquire(self, client: str):
+        try:
+            self.buckets.take(client)
+        except AdmissionRejected:
+            self.stats["rate_limited"] += 1
+            raise
+
+        if self.semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.stats["queue_full"] += 1
+                raise AdmissionRejected(503, f"Server busy ({self.name})", ADMISSION_QUEUE_TIMEOUT_SECONDS)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), ADMISSION_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.stats["queue_timeout"] += 1
+                raise AdmissionRejected(503, f"Server busy ({self.name})", ADMISSION_QUEUE_TIMEOUT_SECONDS)
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+
+        self.active += 1
+        self.stats["admitted"] += 1
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            **self.stats,
+        }
+
+admission_gates = {
+    # Whole-catalog scoring
+    "catalog_scan": AdmissionGate(
+        "catalog_scan",
+        concurrency=int(os.getenv("CATALOG_SCAN_CONCURRENCY", 4)),
+        queue_size=int(os.getenv("CATALOG_SCAN_QUEUE_SIZE", 8)),
+        rate=float(os.getenv("CATALOG_SCAN_CLIENT_RATE", 2)),
+        burst=int(os.getenv("CATALOG_SCAN_CLIENT_BURST", 5)),
+    ),
+    # Gemini-backed routes
+    "gemini": AdmissionGate(
+        "gemini",
+        concurrency=int(os.getenv("GEMINI_ROUTE_CONCURRENCY", 8)),
+        queue_size=int(os.getenv("GEMINI_ROUTE_QUEUE_SIZE", 16)),
+        rate=float(os.getenv("GEMINI_ROUTE_CLIENT_RATE", 1)),
+        burst=int(os.getenv("GEMINI_ROUTE_CLIENT_BURST", 5)),
+    ),
+}
+
+admission_routes = {
+    "/batch-collab-recommendations": "catalog_scan",
+    "/batch-collab-simulation": "catalog_scan",
+    "/batch-collab-matrix": "catalog_scan",
+    "/campaign-optimizer": "catalog_scan",
+    "/admin/reload-data": "catalog_scan",
+    "/generate-summary": "gemini",
+    "/generate-summary/stream": "gemini",
+    "/receive-business": "gemini",
+}
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in ADMISSION_TRUSTED_PROXIES)
+
+def client_key(request: Request) -> str:
+    """
+    Client address. X-Forwarded-For is only used when the peer is a trusted proxy, and then
+    the right-most hop that isn't one is the client: hops left of it come from the client
+    itself and can be anything.
+    """
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or not is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    gate = admission_gates.get(admission_routes.get(request.url.path)) if request.method == "POST" else None
+    if gate is None:
+        return await call_next(request)
+
+    try:
+        await gate.acquire(client_key(request))
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected {request.url.path}: {e.detail}")
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": e.detail},
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        gate.release()
+        raise
+
+    # Hold the slot until the body is sent, so streamed responses count while they run
+    body_iterator = response.body_iterator
+
+    async def release_when_sent():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            gate.release()
+
+    response.body_iterator = release_when_sent()
+    return response
+
+@app.get("/health/admission")
+def admission_health():
+    """Load-shedding counters per route group"""
+    return {name: gate.snapshot() for name, gate in admission_gates.items()}
+
+# Registered last so it is the outermost middleware and shed responses carry CORS headers
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  
+    allow_credentials=True,
+    allow_methods=["*"], 
+    allow_headers=["*"],  
+)
+
 # ------------------------------------- Romeiro's code started here -----------------------------------------
 
 class InfluencerRequest(BaseModel):
     influencer: Dict[str, Any]
 
-@app.post("/generate-summary")
-async def generate_summary(request: InfluencerRequest):
-    try:
-        influencer = request.influencer
-
-        prompt = f"""
+# Concurrent /generate-summary calls are coalesced: identical requests share one
+# Gemini call, and distinct influencers arriving within the window share one prompt.
+SUMMARY_BATCH_WINDOW_MS = float(os.getenv("SUMMARY_BATCH_WINDOW_MS", 50))
+SUMMARY_MAX_BATCH_SIZE = int(os.getenv("SUMMARY_MAX_BATCH_SIZE", 10))
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 1000))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 24 * 3600))
+
+class ResponseCache:
+    """Small LRU cache with a per-entry time-to-live, keyed by prompt"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self.entries[key] = (time.time(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+summary_cache = ResponseCache(SUMMARY_CACHE_SIZE, SUMMARY_CACHE_TTL_SECONDS)
+
+def build_summary_prompt(influencer: Dict[str, Any]) -> str:
+    """Prompt asking Gemini for a short summary of one influencer"""
+    return f"""
         Create a professional, concise summary of this social media influencer:
         
         Username: {influencer.get('channel_info')}
@@ -83,14 +339,384 @@ async def generate_summary(request: InfluencerRequest):
         influencer's profile notable based on these metrics.
         """
 
-        model = genai.GenerativeModel("gemini-2.5-flash")
+def build_batch_summary_prompt(influencers: List[Dict[str, Any]]) -> str:
+    """Prompt asking Gemini for summaries of several influencers as one JSON object"""
+    prompt_parts = [
+        "Create a professional, concise summary of each social media influencer below. "
+        "For each one, include insights about their engagement quality, content longevity "
+        "and overall influence potential. Keep each summary to 3-4 sentences and focus on what "
+        "makes the influencer's profile notable based on the metrics. Return ONLY a JSON object "
+        "where each key is the influencer's ID and the value is their summary.\n\n"
+    ]
+    for i, influencer in enumerate(influencers):
+        prompt_parts.append(
+            f"ID: {i}\n"
+            f"Username: {influencer.get('channel_info')}\n"
+            f"Followers: {influencer.get('followers')}\n"
+            f"Posts: {influencer.get('posts')}\n"
+            f"Average Likes: {influencer.get('avg_likes')}\n"
+            f"Engagement Rate: {influencer.get('avg_engagement')}\n"
+            f"Country: {influencer.get('country', 'Unknown')}\n"
+            f"Influence Score: {influencer.get('influence_score')}\n"
+            f"Engagement Quality Score: {influencer.get('engagement_quality_score', 'N/A')}\n"
+            f"Longevity Score: {influencer.get('longevity_score', 'N/A')}\n\n"
+        )
+    return "".join(prompt_parts)
+
+def extract_json_text(response_text: str) -> str:
+    """Strip markdown code fences Gemini sometimes wraps around JSON"""
+    if "```json" in response_text:
+        return response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        return response_text.split("```")[1].split("```")[0].strip()
+    return response_text.strip()
+
+def generate_summary_text(prompt: str, timeout: Optional[float] = None) -> str:
+    """Blocking Gemini call; run it in a worker thread from async code"""
+    model = genai.GenerativeModel("gemini-2.5-flash")
+    if timeout:
+        response = model.generate_content(prompt, request_options={"timeout": timeout})
+    else:
         response = model.generate_content(prompt)
-        summary = response.text
-        
+    return response.text
+
+# Deadlines and circuit breaker for Gemini calls
+# Calls that fail, time out or take longer than GEMINI_SLOW_CALL_SECONDS count against
+# the breaker; after GEMINI_BREAKER_FAILURE_THRESHOLD in a row it opens and endpoints
+# answer from local fallbacks until GEMINI_BREAKER_RESET_SECONDS have passed.
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 20))
+GEMINI_SLOW_CALL_SECONDS = float(os.getenv("GEMINI_SLOW_CALL_SECONDS", 10))
+GEMINI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", 5))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed: calls go through. open: calls are rejected until reset_seconds pass.
+    half_open: one trial call decides whether to close again or re-open.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, slow_call_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.stats = {"calls": 0, "successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "times_opened": 0}
+
+    def allow_request(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                self.stats["rejected"] += 1
+                return False
+            self.state = "half_open"
+            self.trial_in_flight = False
+
+        if self.state == "half_open":
+            if self.trial_in_flight:
+                self.stats["rejected"] += 1
+                return False
+            self.trial_in_flight = True
+
+        self.stats["calls"] += 1
+        return True
+
+    def record_success(self, duration: float):
+        if duration > self.slow_call_seconds:
+            # Slow answers still count against the breaker
+            self.stats["slow_calls"] += 1
+            self.record_failure()
+            return
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Gemini circuit breaker opened after {self.consecutive_failures} consecutive failures")
+                self.stats["times_opened"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Forget a call that ended without an answer either way (e.g. the client went away),
+        so a half-open breaker lets the next call be its trial instead of waiting forever.
+        """
+        self.trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == "open":
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in_seconds": retry_in,
+            "timeout_seconds": GEMINI_TIMEOUT_SECONDS,
+            "slow_call_seconds": self.slow_call_seconds,
+            **self.stats,
+        }
+
+gemini_breaker = CircuitBreaker(GEMINI_BREAKER_FAILURE_THRESHOLD, GEMINI_BREAKER_RESET_SECONDS, GEMINI_SLOW_CALL_SECONDS)
+
+async def call_gemini(prompt: str, timeout: Optional[float] = None) -> str:
+    """Gemini call with a deadline, guarded by gemini_breaker"""
+    timeout = timeout or GEMINI_TIMEOUT_SECONDS
+    if not gemini_breaker.allow_request():
+        raise CircuitOpenError("Gemini circuit breaker is open")
+
+    started = time.monotonic()
+    try:
+        text = await asyncio.wait_for(asyncio.to_thread(generate_summary_text, prompt, timeout), timeout)
+    except Exception:
+        gemini_breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancelled before Gemini answered; that says nothing about Gemini's health
+        gemini_breaker.release_trial()
+        raise
+    gemini_breaker.record_success(time.monotonic() - started)
+    return text
+
+def describe_score(value, thresholds: List[tuple], default: str) -> str:
+    """Pick the label of the first threshold the value reaches"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    for threshold, label in thresholds:
+        if value >= threshold:
+            return label
+    return default
+
+def build_fallback_summary(influencer: Dict[str, Any]) -> str:
+    """Template summary used when Gemini is unavailable"""
+    username = influencer.get('channel_info', 'This influencer')
+    country = influencer.get('country')
+    location = f" based in {country}" if isinstance(country, str) and country and country != "Unknown" else ""
+    engagement_quality = influencer.get('engagement_quality_score', 'N/A')
+    longevity = influencer.get('longevity_score', 'N/A')
+
+    quality = describe_score(engagement_quality, [(5, "exceptional"), (2, "strong"), (1, "solid")], "modest")
+    presence = describe_score(longevity, [(8, "long-running and prolific"), (6, "well-established"), (4, "growing")], "relatively new")
+
+    def fmt(value):
+        return f"{value:.2f}" if isinstance(value, (int, float)) else str(value)
+
+    return (
+        f"{username} is a creator{location} with {influencer.get('followers', 'an unknown number of')} followers "
+        f"and an average engagement rate of {influencer.get('avg_engagement', 'N/A')}. "
+        f"An engagement quality score of {fmt(engagement_quality)} points to {quality} audience interaction, "
+        f"and a longevity score of {fmt(longevity)} reflects a {presence} posting history. "
+        f"With an influence score of {influencer.get('influence_score', 'N/A')}, "
+        f"they are worth considering for campaigns that fit their audience."
+    )
+
+class SummaryCoalescer:
+    """
+    Singleflight plus micro-batching for summary generation.
+    Requests with the same prompt wait on the same future; distinct requests
+    collected during window_ms (or until max_batch_size) go out as one prompt.
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        self.window_seconds = max(0.0, window_ms) / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.pending: List[tuple] = []
+        self.flush_handle = None
+        # The loop only keeps weak references to tasks; these keep running batches alive
+        self.tasks: set = set()
+
+    async def summarize(self, influencer: Dict[str, Any]) -> str:
+        prompt = build_summary_prompt(influencer)
+        cached = summary_cache.get(prompt)
+        if cached is not None:
+            return cached
+
+        future = self.in_flight.get(prompt)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.in_flight[prompt] = future
+            self.pending.append((prompt, influencer, future))
+
+            if len(self.pending) >= self.max_batch_size or self.window_seconds == 0:
+                self.flush()
+            elif self.flush_handle is None:
+                self.flush_handle = loop.call_later(self.window_seconds, self.flush)
+
+        # Shield so one caller disconnecting doesn't cancel the call for everyone else
+        return await asyncio.shield(future)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.ensure_future(self.run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, batch: List[tuple]):
+        try:
+            if len(batch) == 1:
+                prompt = batch[0][0]
+                summaries = {0: await call_gemini(prompt)}
+            else:
+                logger.info(f"Generating {len(batch)} summaries in one Gemini call")
+                response_text = await call_gemini(build_batch_summary_prompt([item[1] for item in batch]))
+                try:
+                    parsed = json.loads(extract_json_text(response_text))
+                    summaries = {int(key): str(value) for key, value in parsed.items()}
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f"Could not parse batched summaries, falling back to single calls: {str(e)}")
+                    summaries = {}
+
+                # Anything the batched answer missed gets its own call
+                missing = [i for i in range(len(batch)) if not summaries.get(i)]
+                if missing:
+                    texts = await asyncio.gather(
+                        *(call_gemini(batch[i][0]) for i in missing),
+                        return_exceptions=True,
+                    )
+                    summaries.update(zip(missing, texts))
+
+            for i, (prompt, _, future) in enumerate(batch):
+                result = summaries[i]
+                if not isinstance(result, BaseException):
+                    summary_cache.set(prompt, result)
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for prompt, _, future in batch:
+                if self.in_flight.get(prompt) is future:
+                    del self.in_flight[prompt]
+
+summary_coalescer = SummaryCoalescer(SUMMARY_BATCH_WINDOW_MS, SUMMARY_MAX_BATCH_SIZE)
+
+@app.post("/generate-summary")
+async def generate_summary(request: InfluencerRequest):
+    try:
+        summary = await summary_coalescer.summarize(request.influencer)
         return {"summary": summary}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
-    
+        # Slow, failing or circuit-broken Gemini: answer locally instead of a 500
+        logger.warning(f"Using fallback summary: {type(e).__name__}: {str(e)}")
+        return {"summary": build_fallback_summary(request.influencer), "fallback": True}
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Encode one Server-Sent Event"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+async def stream_summary_events(prompt: str, influencer: Dict[str, Any]):
+    """Yield SSE messages for a summary, streaming chunks from Gemini as they arrive"""
+    cached = summary_cache.get(prompt)
+    if cached is not None:
+        yield format_sse({"text": cached})
+        yield format_sse({"summary": cached, "cached": True}, event="done")
+        return
+
+    if not gemini_breaker.allow_request():
+        fallback = build_fallback_summary(influencer)
+        yield format_sse({"text": fallback})
+        yield format_sse({"summary": fallback, "cached": False, "fallback": True}, event="done")
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    end_of_stream = object()
+
+    def produce():
+        # Runs in a worker thread; hands each chunk back to the event loop
+        try:
+            model = genai.GenerativeModel("gemini-2.5-flash")
+            stream = model.generate_content(prompt, stream=True, request_options={"timeout": GEMINI_TIMEOUT_SECONDS})
+            for chunk in stream:
+                if chunk.text:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            loop.call_soon_threadsafe(queue.put_nowait, end_of_stream)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    producer = loop.run_in_executor(None, produce)
+    started = time.monotonic()
+    deadline = started + GEMINI_TIMEOUT_SECONDS
+    parts = []
+    resolved = False
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                item = TimeoutError(f"no complete answer within {GEMINI_TIMEOUT_SECONDS}s")
+            if item is end_of_stream:
+                break
+            if isinstance(item, Exception):
+                gemini_breaker.record_failure()
+                resolved = True
+                logger.error(f"Error streaming summary: {str(item)}")
+                if not parts:
+                    # Nothing shown yet, so the local summary can stand in
+                    fallback = build_fallback_summary(influencer)
+                    yield format_sse({"text": fallback})
+                    yield format_sse({"summary": fallback, "cached": False, "fallback": True}, event="done")
+                else:
+                    yield format_sse({"detail": f"Error generating summary: {str(item)}"}, event="error")
+                return
+            parts.append(item)
+            yield format_sse({"text": item})
+
+        gemini_breaker.record_success(time.monotonic() - started)
+        resolved = True
+        summary = "".join(parts)
+        summary_cache.set(prompt, summary)
+        yield format_sse({"summary": summary, "cached": False}, event="done")
+    finally:
+        if not resolved:
+            # The client closed the stream (or the task was cancelled) before Gemini finished
+            gemini_breaker.release_trial()
+        # A stalled worker is left to finish on its own rather than holding the response open
+        if producer.done():
+            await producer
+
+@app.post("/generate-summary/stream")
+async def generate_summary_stream(request: InfluencerRequest):
+    """
+    Stream a summary as Server-Sent Events: one `data: {"text": ...}` message per chunk,
+    then a `done` event with the full summary (or an `error` event).
+    Cached summaries are sent whole without calling Gemini, and a local fallback
+    summary is sent when Gemini is unavailable.
+    """
+    prompt = build_summary_prompt(request.influencer)
+    return StreamingResponse(
+        stream_summary_events(prompt, request.influencer),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 # Add this function to help with username extraction
 def get_username(channel_info):
@@ -99,11 +725,70 @@ def get_username(channel_info):
         return "unknown"
     return channel_info[1:] if channel_info.startswith("@") else channel_info
 
-# Add this new endpoint
+# Time-series history part
+# Real history written by main.py on every ingest (see timeseries_store.py). The store is
+# memory-mapped, so range queries read only the requested influencer's points. Influencers
+# without stored history keep the synthesized trends below.
+
+TIMESERIES_PATH = os.getenv("TIMESERIES_PATH", "timeseries")
+timeseries = TimeSeriesStore(TIMESERIES_PATH, readonly=True)
+
+def parse_history_time(value: Optional[str], name: str) -> Optional[int]:
+    """ISO date or datetime query parameter -> epoch seconds (UTC unless a zone is given)"""
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or datetime")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def stored_trend_points(channel_info: str, start: Optional[str], end: Optional[str], interval: str, aggregate: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Stored history of one influencer downsampled to one point per interval, in the same
+    shape as the synthesized trend points. None when the store has never seen them.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(INTERVALS)}")
+    if aggregate not in AGGREGATES:
+        raise HTTPException(status_code=400, detail=f"aggregate must be one of: {', '.join(AGGREGATES)}")
+    start_time, end_time = parse_history_time(start, "start"), parse_history_time(end, "end")
+
+    timeseries.refresh()
+    if channel_info not in timeseries.ids:
+        return None
+    buckets = downsample(timeseries.query(channel_info, start_time, end_time), interval, aggregate)
+    points = []
+    for i, day in enumerate(buckets["bucket"].tolist()):
+        points.append({
+            "month": day.strftime("%b") if interval == "month" else day.strftime("%d %b"),
+            "period": day.strftime("%b %Y"),
+            "date": day.isoformat(),
+            "followers": int(buckets["followers"][i]),
+            "engagement": round(float(buckets["engagement"][i]), 2),
+            "likes": int(buckets["likes"][i]),
+            "quality_score": round(float(buckets["quality"][i]), 3),
+        })
+    return points
+
+def month_edges(months: int) -> List[int]:
+    """Epoch seconds of the first instant of each of the last `months` calendar months (UTC), plus the next one"""
+    current = np.datetime64(datetime.now(timezone.utc).strftime("%Y-%m"), "M")
+    return np.arange(current - (months - 1), current + 2).astype("datetime64[s]").astype(np.int64).tolist()
+
 @app.get("/trends/{username}")
-async def get_influencer_trends(username: str):
+async def get_influencer_trends(
+    username: str,
+    start: Optional[str] = Query(None, description="ISO date; stored history only"),
+    end: Optional[str] = Query(None, description="ISO date; stored history only"),
+    interval: str = Query("month", description="day, week or month"),
+    aggregate: str = Query("last", description="last, mean, min or max of the points in each interval"),
+):
     """
-    Generate realistic trend data for a specific influencer based on their metrics.
+    Trend data for a specific influencer: stored history when main.py has snapshotted them,
+    otherwise realistic data generated from their current metrics.
     """
     logger.info(f"Generating trend data for influencer: {username}")
     
@@ -114,6 +799,10 @@ async def get_influencer_trends(username: str):
         logger.warning(f"Influencer '{username}' not found, generating generic data")
         # If we can't find the influencer, generate some generic data
         return generate_generic_trend_data()
+
+    stored = stored_trend_points(influencer.get("channel_info", ""), start, end, interval, aggregate)
+    if stored is not None:
+        return stored
     
     # Generate last 12 months of data based on influencer metrics
     data = []
@@ -248,6 +937,148 @@ def generate_generic_trend_data():
     
     return data
 
+# Growth forecasting part
+# Linear trends for every influencer at once. The monthly series of a snapshot form a
+# (creators x months) matrix per metric, and slope, intercept and r^2 of every row come
+# from one closed-form least-squares solve (months without data are masked out).
+
+GROWTH_METRICS = ("followers", "engagement")
+GROWTH_HISTORY_MONTHS = 12
+GROWTH_FORECAST_MONTHS = int(os.getenv("GROWTH_FORECAST_MONTHS", 6))
+
+@lru_cache(maxsize=2)
+def catalog_history(version: str) -> Dict[str, np.ndarray]:
+    """
+    Monthly series per influencer, oldest month first, shape (creators, months).
+    The last stored value of each calendar month when the time-series store covers at
+    least two of them, otherwise drawn once per snapshot from the same model as
+    calculate_month_metrics. Snapshots appended without a data change are picked up
+    with the next dataset version.
+    """
+    edges = month_edges(GROWTH_HISTORY_MONTHS)
+    timeseries.refresh()
+    if timeseries.covered_buckets(edges) >= 2:
+        channels = [item.get("channel_info", "") for item in json_data]
+        history = timeseries.latest_per_bucket(channels, edges, GROWTH_METRICS)
+        return {"followers": history["followers"], "engagement": np.round(history["engagement"], 2)}
+
+    rng = np.random.default_rng(int(version, 16))
+    features = catalog_features
+    size = len(features["usernames"])
+    offsets = np.arange(-(GROWTH_HISTORY_MONTHS - 1), 1)
+
+    # calculate_month_metrics, vectorized over influencers and months
+    growth_rate = 1 + ((features["influence"] / 100) * 0.045 + 0.005)
+    randomness = rng.uniform(0.97, 1.03, (size, len(offsets)))
+    followers = np.trunc(features["followers"][:, None] * growth_rate[:, None] ** (offsets + 12) * randomness)
+
+    month_in_year = (datetime.now().month + offsets) % 12
+    seasonal_factor = np.sin(month_in_year / 12 * 2 * math.pi) * 0.15
+    quality_factor = 1 - (features["engagement_quality"] / 2)
+    random_factor = rng.uniform(-0.1, 0.1, (size, len(offsets))) * quality_factor[:, None]
+    engagement = np.fmax(0.1, features["engagement"][:, None] * (1 + seasonal_factor + random_factor))
+
+    return {"followers": followers, "engagement": np.round(engagement, 2)}
+
+def fit_linear_trends(series: np.ndarray, horizon: int = GROWTH_FORECAST_MONTHS) -> Dict[str, np.ndarray]:
+    """
+    Least-squares line y = intercept + slope * t for every row of series (t = 0, 1, ...).
+    NaN entries are ignored. Rows with fewer than two points get NaN results.
+    """
+    t = np.arange(series.shape[1], dtype=float)
+    observed = np.isfinite(series)
+    y = np.where(observed, series, 0.0)
+    w = observed.astype(float)
+
+    n = w.sum(axis=1)
+    sum_t = w @ t
+    sum_tt = w @ (t * t)
+    sum_y = y.sum(axis=1)
+    sum_ty = y @ t
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = n * sum_tt - sum_t ** 2
+        slope = (n * sum_ty - sum_t * sum_y) / denominator
+        intercept = (sum_y - slope * sum_t) / n
+
+        fitted = intercept[:, None] + slope[:, None] * t
+        residual = (((y - fitted) * w) ** 2).sum(axis=1)
+        mean = sum_y / n
+        total = (((y - mean[:, None]) * w) ** 2).sum(axis=1)
+        r_squared = np.where(total > 0, 1 - residual / total, 1.0)
+
+        last_t = t[-1]
+        current = intercept + slope * last_t
+        projected = intercept + slope * (last_t + horizon)
+        growth_rate = np.where(current > 0, slope / current * 100, np.nan)  # % per month
+
+    valid = n >= 2
+    return {
+        "slope": np.where(valid, slope, np.nan),
+        "intercept": np.where(valid, intercept, np.nan),
+        "r_squared": np.where(valid, r_squared, np.nan),
+        "current": np.where(valid, current, np.nan),
+        "projected": np.where(valid, projected, np.nan),
+        "growth_rate": np.where(valid, growth_rate, np.nan),
+    }
+
+@lru_cache(maxsize=2)
+def growth_models(version: str) -> Dict[str, Dict[str, np.ndarray]]:
+    """Fitted trends per metric for one snapshot"""
+    history = catalog_history(version)
+    return {metric: fit_linear_trends(history[metric]) for metric in GROWTH_METRICS}
+
+@app.get("/rankings/growth")
+def growth_ranking(
+    metric: str = Query("followers", description="followers or engagement"),
+    sort: str = Query("growth_rate", description="growth_rate (% per month) or slope (units per month)"),
+    limit: int = Query(20, ge=1, le=MAX_RECOMMENDATION_COUNT),
+    country: Optional[str] = None,
+    category: Optional[str] = None,
+    min_followers: Optional[float] = Query(None, ge=0),
+    min_r_squared: float = Query(0.0, ge=0, le=1),
+):
+    """Fastest growing influencers by fitted monthly trend, with optional filters"""
+    if metric not in GROWTH_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(GROWTH_METRICS)}")
+    if sort not in ("growth_rate", "slope"):
+        raise HTTPException(status_code=400, detail="sort must be growth_rate or slope")
+
+    model = growth_models(dataset_version)[metric]
+    eligible = np.isfinite(model[sort]) & (np.nan_to_num(model["r_squared"]) >= min_r_squared)
+
+    country_ids, country_names, category_ids, category_names = catalog_segments(dataset_version)
+    if country:
+        lowered = [name.lower() for name in country_names]
+        eligible &= np.isin(country_ids, [i for i, name in enumerate(lowered) if name == country.lower()])
+    if category:
+        lowered = [name.lower() for name in category_names]
+        eligible &= np.isin(category_ids, [i for i, name in enumerate(lowered) if name == category.lower()])
+    if min_followers is not None:
+        eligible &= catalog_features["followers"] >= min_followers
+
+    rows = np.nonzero(eligible)[0]
+    top = rows[top_k_indices(model[sort][rows], limit)]
+    return {
+        "metric": metric,
+        "sort": sort,
+        "forecast_months": GROWTH_FORECAST_MONTHS,
+        "results": [
+            {
+                "username": catalog_features["usernames"][i],
+                "channel_info": json_data[i].get("channel_info", ""),
+                "country": country_names[country_ids[i]],
+                "category": category_names[category_ids[i]],
+                "slope": compact_value(float(model["slope"][i])),
+                "growth_rate": compact_value(float(model["growth_rate"][i])),
+                "r_squared": compact_value(float(model["r_squared"][i])),
+                "current": compact_value(float(model["current"][i])),
+                "projected": compact_value(float(model["projected"][i])),
+            }
+            for i in top.tolist()
+        ],
+    }
+
 
 
 # Collab Simulator part
@@ -259,9 +1090,91 @@ class BusinessDetails(BaseModel):
     businessCategory: str
     description: str
 
+# ROI uncertainty part
+# Optional Monte Carlo mode for /collab-simulation: the fixed assumptions of
+# calculate_roi_estimate (AOV, conversion band, engaged audience, cost) are drawn from
+# distributions and the ROI is computed for every draw in one NumPy pass.
+
+RoiDistribution = Literal["fixed", "normal", "lognormal", "uniform", "triangular"]
+
+class DistributionSpec(BaseModel):
+    """
+    fixed: always center. normal: mean center, sd spread. lognormal: median center,
+    log-sd spread. uniform/triangular: center +/- spread. Draws are clipped at 0.
+    """
+    distribution: RoiDistribution = "lognormal"
+    center: float = 1.0
+    spread: float = Field(0.0, ge=0)
+
+class UncertaintyConfig(BaseModel):
+    draws: int = Field(20000, ge=1000, le=100000)
+    seed: Optional[int] = None
+    aov: DistributionSpec = DistributionSpec(center=50, spread=0.3)             # Average order value in $
+    conversion_rate: DistributionSpec = DistributionSpec(spread=0.5)            # Multiplier on the modelled rate
+    reach: DistributionSpec = DistributionSpec(distribution="normal", spread=0.2)  # Multiplier on the engaged audience
+    cost: DistributionSpec = DistributionSpec(spread=0.25)                      # Multiplier on the cost estimate
+
+    @field_validator("cost")
+    @classmethod
+    def check_cost_positive(cls, spec: DistributionSpec):
+        """ROI divides by the cost, so the cost multiplier may never draw 0 or less"""
+        if spec.center <= 0:
+            raise ValueError("cost center must be greater than 0")
+        if spec.spread > 0:
+            if spec.distribution == "normal":
+                raise ValueError("a normal cost can draw values <= 0; use lognormal, uniform or triangular")
+            if spec.distribution in ("uniform", "triangular") and spec.spread >= spec.center:
+                raise ValueError(f"a {spec.distribution} cost needs spread < center to stay above 0")
+        return spec
+
+def sample_distribution(spec: DistributionSpec, rng: np.random.Generator, draws: int) -> np.ndarray:
+    if spec.distribution == "fixed" or spec.spread == 0:
+        samples = np.full(draws, spec.center, dtype=float)
+    elif spec.distribution == "normal":
+        samples = rng.normal(spec.center, spec.spread, draws)
+    elif spec.distribution == "lognormal":
+        samples = spec.center * rng.lognormal(0.0, spec.spread, draws)
+    elif spec.distribution == "uniform":
+        samples = rng.uniform(spec.center - spec.spread, spec.center + spec.spread, draws)
+    else:
+        samples = rng.triangular(spec.center - spec.spread, spec.center, spec.center + spec.spread, draws)
+    return np.fmax(0, samples)
+
+def simulate_roi_distribution(match_percentage: float, features: Dict[str, Any], idx: int, config: UncertaintyConfig) -> Dict[str, float]:
+    """
+    ROI percentiles and probability of a positive ROI for one influencer row of features.
+    Same model as calculate_roi_estimate, without the floor at 0.
+    """
+    rng = np.random.default_rng(config.seed)
+    draws = config.draws
+
+    conversion_rate = (0.0005 + (match_percentage / 100) * 0.0045) * features["quality_multiplier"][idx]
+    engaged_audience = np.nan_to_num(features["engaged_audience"][idx])
+    revenue = (
+        engaged_audience * sample_distribution(config.reach, rng, draws) *
+        conversion_rate * sample_distribution(config.conversion_rate, rng, draws) *
+        sample_distribution(config.aov, rng, draws)
+    )
+    # Strictly positive, see UncertaintyConfig.check_cost_positive
+    cost = features["cost_estimate"][idx] * sample_distribution(config.cost, rng, draws)
+
+    confidence_factor = 0.7 + (match_percentage / 100) * 0.3
+    roi = ((revenue - cost) / cost) * 100 * confidence_factor
+
+    p5, p50, p95 = np.percentile(roi, [5, 50, 95])
+    return {
+        "draws": draws,
+        "p5": round(float(p5), 2),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "mean": round(float(roi.mean()), 2),
+        "prob_positive": round(float((roi > 0).mean()), 4),
+    }
+
 class CollabRequest(BaseModel):
     business: BusinessDetails
     influencer_username: str
+    uncertainty: Optional[UncertaintyConfig] = None  # Adds an ROI distribution to the response
 
 class CollabSimulationResponse(BaseModel):
     match_percentage: float
@@ -271,12 +1184,18 @@ class CollabSimulationResponse(BaseModel):
     relevancy_score: float
     longevity_potential: float
     recommendation: str
+    roi_distribution: Optional[Dict[str, float]] = None
 
 # Create a simple in-memory cache for our vectorized data
 tfidf_vectorizer = None
 influencer_vectors = None
 influencer_map = {}
 
+# "tfidf" refits a TfidfVectorizer over the whole corpus on every load;
+# "incremental" keeps a hashed IncrementalTextIndex that only re-vectorizes changed rows
+VECTORIZATION_MODE = os.getenv("VECTORIZATION_MODE", "tfidf")
+text_index = None
+
 # Add this at the beginning of your file if not already present
 from typing import Dict, List
 
@@ -297,7 +1216,7 @@ class VectorizationManager:
             import json
             
             # Path to the enhanced categories JSON file
-            categories_file = "enhanced_categories.json"
+            categories_file = ENHANCED_CATEGORIES_FILE
             
             if not os.path.exists(categories_file):
                 logger.warning(f"Categories file '{categories_file}' not found. Using default categories.")
@@ -324,14 +1243,74 @@ class VectorizationManager:
             logger.error("Using default categories instead")
         
     @staticmethod
-    def initialize():
-        global tfidf_vectorizer, influencer_vectors, influencer_map
+    def build_influencer_text(influencer: Dict[str, Any]) -> str:
+        """Weighted text used to vectorize one influencer"""
+        # Get all text-based data
+        description = influencer.get("description", "")
+        channel = influencer.get("channel_info", "")
+        category = influencer.get("category", "")
+        country = influencer.get("country", "")
+        keywords = influencer.get("keywords", "")  # Assuming you might have keywords in your data
+        posts_content = str(influencer.get("content_topics", ""))  # Any content topics if available
+        
+        # Weight important terms by repeating them
+        # This makes category and description words more influential
+        weighted_text = (
+            f"{description} {description} "  # Repeat for emphasis
+            f"{category} {category} {category} "  # Category is very important - repeat 3x
+            f"{keywords} {keywords} "  # Keywords are important - repeat 2x
+            f"{country} {posts_content} {channel}"
+        ).strip()
         
+        # Fallback for empty descriptions
+        if not weighted_text:
+            weighted_text = f"influencer content creator social media {category}"
+        
+        return weighted_text
+
+    @staticmethod
+    def prepare_records(records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Load enhanced categories, apply them to records and return their username -> row map"""
         # First enrich categories with Gemini
         VectorizationManager.enrich_categories()
         
+        # Built from scratch so reloads don't keep removed influencers
+        mapping = {}
+        for idx, influencer in enumerate(records):
+            username = get_username(influencer.get("channel_info", ""))
+            
+            # Use enhanced category if available, otherwise fallback
+            if username in enhanced_categories_cache:
+                # Also update the original data
+                influencer["category"] = enhanced_categories_cache[username]
+            
+            # Store username to influencer mapping
+            mapping[username] = idx
+        return mapping
+
+    @staticmethod
+    def initialize():
+        global tfidf_vectorizer, influencer_vectors, text_index, influencer_map
+        
+        influencer_map = VectorizationManager.prepare_records(json_data)
+        tfidf_vectorizer, influencer_vectors, text_index = VectorizationManager.build_vectors(json_data)
+
+    @staticmethod
+    def build_vectors(records: List[Dict[str, Any]]):
+        """(vectorizer, influencer_vectors, text_index) fitted to records; text_index is None in tfidf mode"""
+        # Extract descriptions and create a corpus with more comprehensive data
+        descriptions = [VectorizationManager.build_influencer_text(influencer) for influencer in records]
+        
+        if VECTORIZATION_MODE == "incremental":
+            # Hashed terms with incrementally maintained IDF, see text_index.py
+            index = IncrementalTextIndex()
+            usernames = [get_username(influencer.get("channel_info", "")) for influencer in records]
+            index.upsert_many(usernames, descriptions)
+            logger.info(f"Incremental text index initialized with {len(descriptions)} influencers")
+            return index, index.matrix(usernames), index
+        
         # Initialize TF-IDF vectorizer with improved parameters
-        tfidf_vectorizer = TfidfVectorizer(
+        vectorizer = TfidfVectorizer(
             stop_words="english",
             min_df=1,
             ngram_range=(1, 2),   # Include bigrams for better context
@@ -340,49 +1319,6 @@ class VectorizationManager:
             sublinear_tf=True     # Apply sublinear TF scaling for better results with varied text lengths
         )
         
-        # Extract descriptions and create a corpus with more comprehensive data
-        descriptions = []
-        keywords_list = []
-        
-        for idx, influencer in enumerate(json_data):
-            # Get all text-based data
-            description = influencer.get("description", "")
-            channel = influencer.get("channel_info", "")
-            username = get_username(channel)
-            
-            # Use enhanced category if available, otherwise fallback
-            if username in enhanced_categories_cache:
-                category = enhanced_categories_cache[username]
-                # Also update the original data
-                influencer["category"] = category
-            else:
-                category = influencer.get("category", "")
-                
-            country = influencer.get("country", "")
-            keywords = influencer.get("keywords", "")  # Assuming you might have keywords in your data
-            posts_content = str(influencer.get("content_topics", ""))  # Any content topics if available
-            
-            # Store username to influencer mapping
-            influencer_map[username] = idx
-            
-            # Weight important terms by repeating them
-            # This makes category and description words more influential
-            weighted_text = (
-                f"{description} {description} "  # Repeat for emphasis
-                f"{category} {category} {category} "  # Category is very important - repeat 3x
-                f"{keywords} {keywords} "  # Keywords are important - repeat 2x
-                f"{country} {posts_content} {channel}"
-            ).strip()
-            
-            # Fallback for empty descriptions
-            if not weighted_text:
-                weighted_text = f"influencer content creator social media {category}"
-                
-            descriptions.append(weighted_text)
-            
-            # Save keywords separately for additional matching
-            keywords_list.append(f"{category} {keywords}")
-        
         try:
             # Vectorize the enriched descriptions
             if not descriptions:
@@ -390,16 +1326,42 @@ class VectorizationManager:
                 descriptions = ["default content creator"]
                 
             # Fit and transform our enhanced corpus
-            influencer_vectors = tfidf_vectorizer.fit_transform(descriptions)
+            vectors = vectorizer.fit_transform(descriptions)
             logger.info(f"Vectorization initialized with {len(descriptions)} influencers")
             
         except ValueError as e:
             logger.error(f"Vectorization error: {str(e)}")
             # Create a fallback vectorizer
-            tfidf_vectorizer = TfidfVectorizer(stop_words=None)
-            dummy_texts = [f"influencer{i} content" for i in range(len(json_data))]
-            influencer_vectors = tfidf_vectorizer.fit_transform(dummy_texts)
+            vectorizer = TfidfVectorizer(stop_words=None)
+            dummy_texts = [f"influencer{i} content" for i in range(len(records))]
+            vectors = vectorizer.fit_transform(dummy_texts)
             logger.warning("Using fallback vectorization due to empty vocabulary")
+        return vectorizer, vectors, None
+
+    @staticmethod
+    def apply_changes(records: List[Dict[str, Any]], changed_rows: List[int], removed_usernames: List[str]):
+        """
+        Incremental mode only: re-vectorize the changed rows of records and drop removed
+        influencers, without refitting. Works on a copy of text_index, so the live one keeps
+        serving until reload_dataset() swaps the result in. Returns the same triple as build_vectors().
+        Hashing and document-frequency updates cost time proportional to the change, but
+        influencer_vectors is then re-weighted with the new IDF in one vectorized pass over
+        the whole catalog: every IDF weight depends on the corpus size, so no row keeps its
+        old weights once anything is added or removed.
+        """
+        index = text_index.copy()
+        index.remove_many(removed_usernames)
+        
+        changed = [records[idx] for idx in changed_rows]
+        index.upsert_many(
+            [get_username(influencer.get("channel_info", "")) for influencer in changed],
+            [VectorizationManager.build_influencer_text(influencer) for influencer in changed],
+        )
+        
+        # Rows follow records order so the username -> row map indices stay valid
+        usernames = [get_username(influencer.get("channel_info", "")) for influencer in records]
+        logger.info(f"Incremental text index updated: {len(changed_rows)} changed, {len(removed_usernames)} removed")
+        return index, index.matrix(usernames), index
 
 # Initialize vectorization on module import
 vectorization_manager = VectorizationManager()
@@ -415,42 +1377,26 @@ async def simulate_collaboration(request: CollabRequest):
     
     # Find the influencer
     influencer_username = request.influencer_username
-    influencer = next((item for item in json_data if get_username(item.get("channel_info", "")) == influencer_username), None)
+    idx = influencer_map.get(influencer_username)
     
-    if not influencer:
+    if idx is None:
         raise HTTPException(status_code=404, detail=f"Influencer '{influencer_username}' not found")
     
-    # Calculate match percentage using improved algorithm
-    match_percentage = calculate_match_percentage(request.business, influencer)
-    
-    # Calculate cost estimate based on followers and engagement
-    cost_estimate = calculate_cost_estimate(influencer)
-    
-    # Calculate estimated ROI with improved formula
-    roi_estimate = calculate_roi_estimate(match_percentage, influencer, request.business)
-    
-    # Calculate estimated reach
-    estimated_reach = calculate_reach(influencer)
-    
-    # Get relevancy score
-    relevancy_score = calculate_relevancy(request.business, influencer)
-    
-    # Calculate longevity potential
-    longevity_potential = calculate_longevity(influencer)
-    
-    # Generate recommendation
-    recommendation = generate_recommendation(match_percentage, roi_estimate, request.business, influencer)
-    
-    return {
-        "match_percentage": round(match_percentage, 1),
-        "estimated_cost": round(cost_estimate, 2),
-        "estimated_roi": round(roi_estimate, 2),
-        "estimated_reach": estimated_reach,
-        "relevancy_score": round(relevancy_score, 2),
-        "longevity_potential": round(longevity_potential, 2),
-        "recommendation": recommendation
-    }
-
+    # Influencer-only metrics (cost, reach, longevity, ...) are precomputed in catalog_features,
+    # so only the business-dependent terms are calculated here
+    features = select_features(catalog_features, np.array([idx]))
+    results, match_percentage = simulate_feature_rows(request.business, features, [json_data[idx]])
+    result = results[0]
+    result.pop("username")
+
+    if request.uncertainty is not None:
+        result["roi_distribution"] = simulate_roi_distribution(float(match_percentage[0]), features, 0, request.uncertainty)
+    return result
+
+# Per-influencer reference versions of the scoring model (calculate_match_percentage,
+# _cost_estimate, _roi_estimate, _reach, _relevancy, _longevity). Requests are scored by
+# their vectorized_* counterparts in the batch collab simulation part;
+# test_collab_scoring.py checks that both agree on the shipped catalog.
 def calculate_match_percentage(business: BusinessDetails, influencer: Dict[str, Any]) -> float:
     """
     Calculate the match percentage between business and influencer using 
@@ -467,6 +1413,7 @@ def calculate_match_percentage(business: BusinessDetails, influencer: Dict[str,
         # Get TF-IDF similarity
         # Create a comprehensive business description
         business_text = f"{business.businessName} {business.businessCategory} {business.description}"
+        influencer_username = get_username(influencer.get("channel_info", ""))
         
         # Handle empty business text
         if not business_text.strip():
@@ -476,7 +1423,6 @@ def calculate_match_percentage(business: BusinessDetails, influencer: Dict[str,
             business_vector = tfidf_vectorizer.transform([business_text])
             
             # Get the influencer's vector
-            influencer_username = get_username(influencer.get("channel_info", ""))
             if influencer_username in influencer_map:
                 idx = influencer_map[influencer_username]
                 influencer_vector = influencer_vectors[idx]
@@ -488,39 +1434,15 @@ def calculate_match_percentage(business: BusinessDetails, influencer: Dict[str,
         
         # Get enhanced category match score (using Gemini-improved categories)
         business_category = business.businessCategory.lower()
-        
+
         # Use enhanced category if available
         if influencer_username in enhanced_categories_cache:
             influencer_category = enhanced_categories_cache[influencer_username].lower()
         else:
             influencer_category = influencer.get("category", "").lower()
-        
-        # More sophisticated category matching
-        # Check for exact match
-        if business_category == influencer_category:
-            category_score = 1.0
-        elif business_category in influencer_category or influencer_category in business_category:
-            category_score = 0.85  # Increased from 0.8
-        else:
-            # Enhanced semantic matching for categories
-            # Use Jaccard similarity for partial word matching
-            business_words = set(business_category.lower().split())
-            influencer_words = set(influencer_category.lower().split())
-            
-            # Add synonyms for common business categories
-            business_expanded = expand_category_with_synonyms(business_category)
-            influencer_expanded = expand_category_with_synonyms(influencer_category)
-            
-            business_words.update(business_expanded)
-            influencer_words.update(influencer_expanded)
-            
-            if not business_words or not influencer_words:
-                category_score = 0.3
-            else:
-                intersection = len(business_words.intersection(influencer_words))
-                union = len(business_words.union(influencer_words))
-                category_score = intersection / union if union > 0 else 0.3
-        
+
+        category_score = calculate_category_match(business_category, influencer_category)
+
         # Calculate metrics score based on influencer quality metrics
         engagement_quality = float(influencer.get("engagement_quality_score", 1.0))
         # Normalize engagement quality to 0-1 scale
@@ -552,6 +1474,34 @@ def calculate_match_percentage(business: BusinessDetails, influencer: Dict[str,
         logger.error(f"Error calculating match percentage: {str(e)}")
         return 50.0  # Default match on error
 
+def calculate_category_match(business_category: str, influencer_category: str) -> float:
+    """Score (0-1) how well a lowercased business category matches an influencer category"""
+    # More sophisticated category matching
+    # Check for exact match
+    if business_category == influencer_category:
+        return 1.0
+    elif business_category in influencer_category or influencer_category in business_category:
+        return 0.85  # Increased from 0.8
+
+    # Enhanced semantic matching for categories
+    # Use Jaccard similarity for partial word matching
+    business_words = set(business_category.lower().split())
+    influencer_words = set(influencer_category.lower().split())
+
+    # Add synonyms for common business categories
+    business_expanded = expand_category_with_synonyms(business_category)
+    influencer_expanded = expand_category_with_synonyms(influencer_category)
+
+    business_words.update(business_expanded)
+    influencer_words.update(influencer_expanded)
+
+    if not business_words or not influencer_words:
+        return 0.3
+
+    intersection = len(business_words.intersection(influencer_words))
+    union = len(business_words.union(influencer_words))
+    return intersection / union if union > 0 else 0.3
+
 def expand_category_with_synonyms(category: str) -> List[str]:
     """Add common synonyms and related terms for better category matching"""
     category = category.lower()
@@ -728,24 +1678,9 @@ def calculate_relevancy(business: BusinessDetails, influencer: Dict[str, Any]) -
     """Calculate relevancy score between business category and influencer with better algorithm"""
     business_category = business.businessCategory.lower()
     influencer_category = influencer.get("category", "").lower()
-    
-    # Calculate category match score (similar to part of match percentage calculation)
-    if business_category == influencer_category:
-        category_score = 100
-    elif business_category in influencer_category or influencer_category in business_category:
-        category_score = 80
-    else:
-        # Use Jaccard similarity for partial word matching
-        business_words = set(business_category.split())
-        influencer_words = set(influencer_category.split())
-        
-        if not business_words or not influencer_words:
-            category_score = 30
-        else:
-            intersection = len(business_words.intersection(influencer_words))
-            union = len(business_words.union(influencer_words))
-            category_score = (intersection / union if union > 0 else 0.3) * 100
-    
+
+    category_score = calculate_relevancy_category_score(business_category, influencer_category)
+
     # Adjust based on engagement quality score
     engagement_quality = float(influencer.get("engagement_quality_score", 1.0))
     # Normalize if needed
@@ -755,6 +1690,25 @@ def calculate_relevancy(business: BusinessDetails, influencer: Dict[str, Any]) -
     # Calculate final relevancy with greater weight on category match
     return category_score * 0.8 + (engagement_quality * 20) * 0.2
 
+def calculate_relevancy_category_score(business_category: str, influencer_category: str) -> float:
+    """Category part (0-100) of the relevancy score, without synonym expansion"""
+    # Calculate category match score (similar to part of match percentage calculation)
+    if business_category == influencer_category:
+        return 100
+    elif business_category in influencer_category or influencer_category in business_category:
+        return 80
+
+    # Use Jaccard similarity for partial word matching
+    business_words = set(business_category.split())
+    influencer_words = set(influencer_category.split())
+
+    if not business_words or not influencer_words:
+        return 30
+
+    intersection = len(business_words.intersection(influencer_words))
+    union = len(business_words.union(influencer_words))
+    return (intersection / union if union > 0 else 0.3) * 100
+
 def calculate_longevity(influencer: Dict[str, Any]) -> float:
     """Calculate longevity potential of collaboration"""
     # Get longevity score if available
@@ -811,7 +1765,7 @@ def parse_follower_count(followers_str) -> float:
 
 class BatchCollabRequest(BaseModel):
     business: BusinessDetails
-    count: Optional[int] = 5
+    count: Optional[int] = Field(5, ge=1, le=MAX_RECOMMENDATION_COUNT)
 
 @app.post("/batch-collab-recommendations")
 async def batch_recommendations(request: BatchCollabRequest):
@@ -820,67 +1774,1457 @@ async def batch_recommendations(request: BatchCollabRequest):
     based on business details with improved ranking algorithm
     """
     logger.info(f"Generating batch recommendations for {request.business.businessName}")
+    count = MAX_RECOMMENDATION_COUNT if request.count is None else request.count
+
+    # Served from the candidate index when possible, see rank_from_category_candidates
+    ranked = rank_from_category_candidates(request.business, count)
+    if ranked is not None:
+        top, match_percentage, roi_estimate, composite_score = ranked
+        return {"recommendations": [
+            build_recommendation_item(request.business, idx, match_percentage[i], roi_estimate[i], composite_score[i])
+            for i, idx in enumerate(top)
+        ]}
     
-    results = []
-    
-    # Process all influencers
-    for influencer in json_data:
-        influencer_username = get_username(influencer.get("channel_info", ""))
-        
-        # Calculate key metrics
-        match_percentage = calculate_match_percentage(request.business, influencer)
-        cost_estimate = calculate_cost_estimate(influencer)
-        roi_estimate = calculate_roi_estimate(match_percentage, influencer, request.business)
-        
-        # Calculate composite score with heavy ROI emphasis
-        # ROI gets 60% weight, match gets 30%, cost efficiency gets 10%
-        follower_count = parse_follower_count(influencer.get("followers", "10K"))
-        cost_efficiency = min(100, (follower_count / cost_estimate) / 100) if cost_estimate > 0 else 0
-        
-        # Scale ROI to 0-100 range for scoring purposes (cap at 500% ROI)
-        scaled_roi = min(100, roi_estimate / 5)
-        
-        # Calculate composite score (higher is better)
-        composite_score = (
-            scaled_roi * 0.6 +
-            match_percentage * 0.3 +
-            cost_efficiency * 0.1
-        )
-        
-        # Get recommendation text
-        recommendation = generate_recommendation(match_percentage, roi_estimate, request.business, influencer)
-        
-        results.append({
-            "username": influencer_username,
-            "channel_info": influencer.get("channel_info", ""),
-            "match_percentage": round(match_percentage, 1),
-            "estimated_cost": round(cost_estimate, 2),
-            "estimated_roi": round(roi_estimate, 2),
-            "followers": influencer.get("followers", "Unknown"),
-            "category": influencer.get("category", "Unknown"),
-            "composite_score": round(composite_score, 1),
-            "recommendation": recommendation
-        })
+    # Score the whole catalog at once against the precomputed influencer metrics
+    match_percentage = vectorized_match_percentage(request.business, catalog_features)
+    roi_estimate = vectorized_roi_estimate(match_percentage, catalog_features)
+    composite_score = vectorized_composite_score(match_percentage, roi_estimate, catalog_features)
     
-    # Sort by composite score (descending)
-    results.sort(key=lambda x: x["composite_score"], reverse=True)
+    # Sort by rounded composite score (descending), keeping catalog order on ties
+    top = top_k_indices(np.round(composite_score, 1), count)
     
     # Return top N results
-    return {"recommendations": results[:request.count]}
+    return {"recommendations": [
+        build_recommendation_item(request.business, idx, match_percentage[idx], roi_estimate[idx], composite_score[idx])
+        for idx in top
+    ]}
+
+def build_recommendation_item(business: BusinessDetails, idx: int, match_percentage: float, roi_estimate: float, composite_score: float) -> Dict[str, Any]:
+    """One /batch-collab-recommendations entry for the catalog influencer at row idx"""
+    influencer = json_data[idx]
+    return {
+        "username": catalog_features["usernames"][idx],
+        "channel_info": influencer.get("channel_info", ""),
+        "match_percentage": round(float(match_percentage), 1),
+        "estimated_cost": round(float(catalog_features["cost_estimate"][idx]), 2),
+        "estimated_roi": round(float(roi_estimate), 2),
+        "followers": influencer.get("followers", "Unknown"),
+        "category": influencer.get("category", "Unknown"),
+        "composite_score": round(float(composite_score), 1),
+        "recommendation": generate_recommendation(float(match_percentage), float(roi_estimate), business, influencer)
+    }
+
+
+# Batch collab simulation part
+# The functions below are array versions of the per-influencer calculate_* helpers
+# above. They must produce the same numbers (test_collab_scoring.py checks them on the
+# shipped catalog), so keep the formulas in sync.
+# np.fmax/np.fmin mirror Python's max(constant, x)/min(constant, x), which return
+# the constant when x is NaN (e.g. an 'NaN%' engagement rate).
+
+def parse_engagement_rate(engagement_str) -> float:
+    """Parse an engagement rate like '1.39%' (or a raw fraction) into a percentage"""
+    if isinstance(engagement_str, str) and '%' in engagement_str:
+        return float(engagement_str.replace('%', '').strip())
+    return float(engagement_str) * 100 if float(engagement_str) < 1 else float(engagement_str)
+
+def get_match_category(influencer: Dict[str, Any]) -> str:
+    """Category used for match scoring, preferring the enhanced category"""
+    username = get_username(influencer.get("channel_info", ""))
+    if username in enhanced_categories_cache:
+        return enhanced_categories_cache[username].lower()
+    return influencer.get("category", "").lower()
+
+def build_influencer_features(influencers: List[Dict[str, Any]], vector_map: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Parse many influencers once into aligned numpy arrays and derive every metric
+    that depends only on the influencer (cost, reach, longevity, ROI and match parts).
+    vector_map is the username -> influencer_vectors row map (default influencer_map).
+    """
+    vector_map = influencer_map if vector_map is None else vector_map
+    usernames = [get_username(item.get("channel_info", "")) for item in influencers]
+    features = {
+        "usernames": usernames,
+        "followers": np.array([parse_follower_count(item.get("followers", "10K")) for item in influencers], dtype=float),
+        "engagement": np.array([parse_engagement_rate(item.get("avg_engagement", "1%")) for item in influencers], dtype=float),
+        "credibility": np.array([float(item.get("credibility_score", 50)) for item in influencers], dtype=float),
+        "influence": np.array([float(item.get("influence_score", 50)) for item in influencers], dtype=float),
+        "engagement_quality": np.array([float(item.get("engagement_quality_score", 1.0)) for item in influencers], dtype=float),
+        "longevity": np.array([float(item.get("longevity_score", 5)) for item in influencers], dtype=float),
+        "match_category": [get_match_category(item) for item in influencers],
+        "category": [item.get("category", "").lower() for item in influencers],
+        # Row in influencer_vectors, or -1 when the influencer is not in the corpus
+        "vector_index": np.array([vector_map.get(username, -1) for username in usernames], dtype=np.int64),
+    }
+
+    followers = features["followers"]
+    cost_estimate = vectorized_cost_estimate(features)
+    engagement_quality = features["engagement_quality"]
+    engagement_quality = np.where(engagement_quality > 5, engagement_quality / 5, engagement_quality)
+
+    features.update({
+        "cost_estimate": cost_estimate,
+        "estimated_reach": vectorized_reach(features),
+        "longevity_potential": vectorized_longevity(features),
+        "metrics_score": vectorized_metrics_score(features),
+        # Business-independent parts of calculate_roi_estimate and the composite score
+        "engaged_audience": followers * (features["engagement"] / 100),
+        "quality_multiplier": 0.5 + ((features["credibility"] / 100) * 0.25 + (engagement_quality) * 0.25),
+        "cost_efficiency": np.fmin(100, (followers / cost_estimate) / 100),
+        # Engagement part of calculate_relevancy
+        "relevancy_quality": (engagement_quality * 20) * 0.2,
+    })
+    return features
+
+def vectorized_cost_estimate(features: Dict[str, Any]) -> np.ndarray:
+    """Array version of calculate_cost_estimate"""
+    followers = features["followers"]
+    base_cost = np.select(
+        [followers < 10000, followers < 100000, followers < 1000000],
+        [
+            (followers / 1000) * 0.8,
+            8 + ((followers - 10000) / 1000) * 0.6,
+            62 + ((followers - 100000) / 1000) * 0.4,
+        ],
+        default=422 + ((followers - 1000000) / 1000) * 0.2,
+    )
+    engagement_multiplier = (features["engagement"] / 2.0) ** 0.8
+    influence_multiplier = (features["influence"] / 50) ** 0.7
+    credibility_multiplier = (features["credibility"] / 50) ** 0.5
+
+    calculated_cost = base_cost * engagement_multiplier * influence_multiplier * credibility_multiplier
+    return np.fmax(50, calculated_cost)
+
+def vectorized_roi_estimate(match_percentage: np.ndarray, features: Dict[str, Any]) -> np.ndarray:
+    """Array version of calculate_roi_estimate; match_percentage may be (M,) or (N, M)"""
+    base_conversion = 0.0005 + (match_percentage / 100) * 0.0045
+    conversion_rate = base_conversion * features["quality_multiplier"]
+
+    aov = 50
+    estimated_revenue = features["engaged_audience"] * conversion_rate * aov
+
+    cost_estimate = features["cost_estimate"]
+    roi = ((estimated_revenue - cost_estimate) / cost_estimate) * 100
+    confidence_factor = 0.7 + (match_percentage / 100) * 0.3
+    return np.fmax(0, roi * confidence_factor)
+
+def vectorized_reach(features: Dict[str, Any]) -> np.ndarray:
+    """Array version of calculate_reach"""
+    followers = features["followers"]
+    engagement = features["engagement"]
+    base_reach_pct = np.select(
+        [followers < 10000, followers < 100000, followers < 1000000],
+        [25, 20, 15],
+        default=10,
+    )
+    engagement_bonus = np.fmin(15, engagement * 2)
+    reach_percentage = np.fmin(50, base_reach_pct + engagement_bonus)
+    viral_multiplier = 1 + (engagement / 100) * (features["credibility"] / 100)
+    reach = np.trunc(followers * (reach_percentage / 100) * viral_multiplier)
+    return np.nan_to_num(reach, nan=0).astype(np.int64)
+
+def vectorized_longevity(features: Dict[str, Any]) -> np.ndarray:
+    """Array version of calculate_longevity"""
+    longevity_score = features["longevity"]
+    longevity_score = np.where(longevity_score > 10, longevity_score / 10, longevity_score)
+    combined_score = longevity_score * 0.7 + (features["credibility"] / 10) * 0.3
+    return combined_score * 10
+
+def vectorized_metrics_score(features: Dict[str, Any]) -> np.ndarray:
+    """Business-independent metrics component of calculate_match_percentage"""
+    engagement_quality = features["engagement_quality"]
+    engagement_quality = np.select(
+        [engagement_quality > 10, engagement_quality > 1],
+        [engagement_quality / 10, engagement_quality / 5],
+        default=engagement_quality,
+    )
+    credibility = features["credibility"] / 100
+    influence = features["influence"] / 100
+    return engagement_quality * 0.5 + credibility * 0.25 + influence * 0.25
+
+def vectorized_category_scores(business_category: str, categories: List[str], score_fn) -> np.ndarray:
+    """Score every influencer category against one business category, once per distinct category"""
+    unique_categories, inverse = np.unique(np.array(categories, dtype=object), return_inverse=True)
+    unique_scores = np.array([score_fn(business_category, category) for category in unique_categories], dtype=float)
+    return unique_scores[inverse]
+
+def vectorized_tfidf_similarity(business_vectors, features: Dict[str, Any]) -> np.ndarray:
+    """Cosine similarity of N business vectors against the given influencers' rows, shape (N, M)"""
+    vector_index = features["vector_index"]
+    known = vector_index >= 0
+    similarity = np.full((business_vectors.shape[0], len(vector_index)), 0.5)  # Default if not found
+    if known.any():
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        rows = influencer_vectors[vector_index[known]]
+        similarity[:, known] = (business_vectors @ rows.T).toarray()
+    if "text_vectors" in features:
+        # Influencers outside the corpus, vectorized from their own text (see raw_influencer_features)
+        unknown = ~known
+        similarity[:, unknown] = (business_vectors @ features["text_vectors"][unknown].T).toarray()
+    return similarity
+
+def vectorized_match_percentage(business: BusinessDetails, features: Dict[str, Any], business_vector=None) -> np.ndarray:
+    """Array version of calculate_match_percentage for one business against many influencers"""
+    business_text = f"{business.businessName} {business.businessCategory} {business.description}"
+    if not business_text.strip():
+        tfidf_similarity = np.full(len(features["usernames"]), 0.5)
+    else:
+        if business_vector is None:
+            business_vector = tfidf_vectorizer.transform([business_text])
+        tfidf_similarity = vectorized_tfidf_similarity(business_vector, features)[0]
+
+    category_score = vectorized_category_scores(
+        business.businessCategory.lower(), features["match_category"], calculate_category_match
+    )
+    return combine_match_parts(tfidf_similarity, category_score, features["metrics_score"])
+
+def combine_match_parts(tfidf_similarity: np.ndarray, category_score: np.ndarray, metrics_score: np.ndarray) -> np.ndarray:
+    """Match percentage from its text, category and metrics parts"""
+    final_score = (
+        tfidf_similarity * 0.4 +
+        category_score * 0.4 +
+        metrics_score * 0.2
+    )
+    scaled_score = (final_score ** 0.65) * 100
+    return np.fmax(10, np.fmin(100, scaled_score))
+
+def vectorized_relevancy(business: BusinessDetails, features: Dict[str, Any]) -> np.ndarray:
+    """Array version of calculate_relevancy"""
+    category_score = vectorized_category_scores(
+        business.businessCategory.lower(), features["category"], calculate_relevancy_category_score
+    )
+    return category_score * 0.8 + features["relevancy_quality"]
+
+class InfluencerRow(BaseModel):
+    """A raw influencer row in the output_file.json format, e.g. one not yet in the catalog"""
+    channel_info: str
+    followers: Union[str, float] = "10K"
+    avg_engagement: Union[str, float] = "1%"
+    credibility_score: float = 50
+    influence_score: float = 50
+    engagement_quality_score: float = 1.0
+    longevity_score: float = 5
+    category: str = ""
+    description: str = ""
+    country: str = ""
+    keywords: str = ""
+    content_topics: str = ""
+
+    @field_validator("followers")
+    @classmethod
+    def check_followers(cls, value):
+        parse_follower_count(value)  # Raises ValueError (-> 422) on e.g. 'abc'
+        return value
+
+    @field_validator("avg_engagement")
+    @classmethod
+    def check_engagement(cls, value):
+        parse_engagement_rate(value)
+        return value
+
+class BatchCollabSimulationRequest(BaseModel):
+    business: BusinessDetails
+    influencer_usernames: Optional[List[str]] = None
+    influencers: Optional[List[InfluencerRow]] = None
+
+class BatchCollabSimulationItem(CollabSimulationResponse):
+    username: str
+
+class BatchCollabSimulationResponse(BaseModel):
+    results: List[BatchCollabSimulationItem]
+    not_found: List[str]
+
+def raw_influencer_features(influencers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Feature table for influencers outside the corpus. Their text is vectorized with the
+    fitted vocabulary so they get the same text similarity as a catalog row with that
+    text, instead of the 'not found' default.
+    """
+    features = build_influencer_features(influencers, vector_map={})
+    features["text_vectors"] = tfidf_vectorizer.transform(
+        [VectorizationManager.build_influencer_text(influencer) for influencer in influencers]
+    )
+    return features
+
+@app.post("/batch-collab-simulation", response_model=BatchCollabSimulationResponse)
+async def batch_simulate_collaboration(request: BatchCollabSimulationRequest):
+    """
+    Simulate collaborations between one business and many influencers.
+    Returns the same fields as /collab-simulation for every influencer,
+    computed in a single vectorized pass.
+    """
+    if not request.influencer_usernames and not request.influencers:
+        raise HTTPException(status_code=400, detail="Provide influencer_usernames or influencers")
+
+    indices = []
+    not_found = []
+    for username in request.influencer_usernames or []:
+        idx = influencer_map.get(username)
+        if idx is None:
+            not_found.append(username)
+        else:
+            indices.append(idx)
+
+    logger.info(f"Simulating {len(indices) + len(request.influencers or [])} collabs for {request.business.businessName}")
+
+    results = []
+    if indices:
+        # Catalog influencers reuse their precomputed metrics
+        features = select_features(catalog_features, np.array(indices))
+        results.extend(simulate_feature_rows(request.business, features, [json_data[idx] for idx in indices])[0])
+    if request.influencers:
+        influencers = [influencer.model_dump() for influencer in request.influencers]
+        features = raw_influencer_features(influencers)
+        results.extend(simulate_feature_rows(request.business, features, influencers)[0])
+
+    return {"results": results, "not_found": not_found}
+
+def simulate_feature_rows(business: BusinessDetails, features: Dict[str, Any], influencers: List[Dict[str, Any]]):
+    """
+    Collab simulation results for the influencers described by features, in order,
+    and the unrounded match percentages they were computed from
+    """
+    match_percentage = vectorized_match_percentage(business, features)
+    roi_estimate = vectorized_roi_estimate(match_percentage, features)
+    relevancy_score = vectorized_relevancy(business, features)
+
+    results = []
+    for i, influencer in enumerate(influencers):
+        results.append({
+            "username": features["usernames"][i],
+            "match_percentage": round(float(match_percentage[i]), 1),
+            "estimated_cost": round(float(features["cost_estimate"][i]), 2),
+            "estimated_roi": round(float(roi_estimate[i]), 2),
+            "estimated_reach": int(features["estimated_reach"][i]),
+            "relevancy_score": round(float(relevancy_score[i]), 2),
+            "longevity_potential": round(float(features["longevity_potential"][i]), 2),
+            "recommendation": generate_recommendation(
+                float(match_percentage[i]), float(roi_estimate[i]), business, influencer
+            ),
+        })
+    return results, match_percentage
+
+
+# Match matrix part (many businesses x many influencers)
+
+# Upper bound on the number of dense (business, influencer) cells held in memory at once
+MATCH_MATRIX_MAX_BLOCK_CELLS = int(os.getenv("MATCH_MATRIX_MAX_BLOCK_CELLS", 2_000_000))
+
+class MatchMatrixRequest(BaseModel):
+    businesses: List[BusinessDetails]
+    count: int = Field(5, ge=1, le=MAX_RECOMMENDATION_COUNT)
+    block_size: Optional[int] = Field(256, ge=1)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, ties broken by position.
+    Matches a stable descending sort without sorting the whole array.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    negated = -scores
+    kth = np.partition(negated, k - 1)[k - 1]
+    candidates = np.nonzero(negated <= kth)[0]
+    order = np.lexsort((candidates, negated[candidates]))
+    return candidates[order[:k]]
+
+def vectorized_composite_score(match_percentage: np.ndarray, roi_estimate: np.ndarray, features: Dict[str, Any]) -> np.ndarray:
+    """Array version of the composite ranking score used by /batch-collab-recommendations"""
+    scaled_roi = np.fmin(100, roi_estimate / 5)
+    return (
+        scaled_roi * 0.6 +
+        match_percentage * 0.3 +
+        features["cost_efficiency"] * 0.1
+    )
+
+def score_business_block(businesses: List[BusinessDetails], features: Dict[str, Any], category_cache: Dict[str, np.ndarray]):
+    """Compute (match, roi, composite) arrays of shape (len(businesses), M) for one block"""
+    texts = [f"{b.businessName} {b.businessCategory} {b.description}" for b in businesses]
+    business_vectors = tfidf_vectorizer.transform(texts)
+
+    # One sparse product for the whole block against the catalog rows
+    tfidf_similarity = vectorized_tfidf_similarity(business_vectors, features)
+    for i, text in enumerate(texts):
+        if not text.strip():
+            tfidf_similarity[i] = 0.5  # Default for empty text
+
+    category_score = np.empty_like(tfidf_similarity)
+    for i, business in enumerate(businesses):
+        business_category = business.businessCategory.lower()
+        if business_category not in category_cache:
+            category_cache[business_category] = vectorized_category_scores(
+                business_category, features["match_category"], calculate_category_match
+            )
+        category_score[i] = category_cache[business_category]
+
+    match_percentage = combine_match_parts(tfidf_similarity, category_score, features["metrics_score"])
+    roi_estimate = vectorized_roi_estimate(match_percentage, features)
+    composite_score = vectorized_composite_score(match_percentage, roi_estimate, features)
+    return match_percentage, roi_estimate, composite_score
+
+@app.post("/batch-collab-matrix")
+async def batch_collab_matrix(request: MatchMatrixRequest):
+    """
+    Rank the catalog for many businesses at once and return the top matches for each.
+    Businesses are scored in blocks so the dense score matrix never exceeds
+    MATCH_MATRIX_MAX_BLOCK_CELLS cells.
+    """
+    if not request.businesses:
+        raise HTTPException(status_code=400, detail="Provide at least one business")
+
+    logger.info(f"Computing match matrix for {len(request.businesses)} businesses")
+
+    category_cache = {}
+
+    catalog_size = max(1, len(json_data))
+    block_size = max(1, min(request.block_size or 256, MATCH_MATRIX_MAX_BLOCK_CELLS // catalog_size))
+
+    results = []
+    for start in range(0, len(request.businesses), block_size):
+        block = request.businesses[start:start + block_size]
+        match_percentage, roi_estimate, composite_score = score_business_block(
+            block, catalog_features, category_cache
+        )
+
+        for i, business in enumerate(block):
+            # Same ordering as /batch-collab-recommendations: rounded score, catalog order on ties
+            top = top_k_indices(np.round(composite_score[i], 1), request.count)
+            recommendations = [
+                build_recommendation_item(
+                    business, idx, match_percentage[i, idx], roi_estimate[i, idx], composite_score[i, idx]
+                )
+                for idx in top
+            ]
+            results.append({"businessName": business.businessName, "recommendations": recommendations})
+
+    return {"results": results}
+
+# Derived metrics part
+# Influencer-only metrics are materialized once per dataset snapshot in catalog_features
+# (aligned with json_data) and only recomputed for rows that changed on reload.
+
+def hash_influencer_row(influencer: Dict[str, Any]) -> str:
+    """Content hash of one record, used to detect changed rows between snapshots"""
+    return hashlib.sha1(json.dumps(influencer, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def select_features(features: Dict[str, Any], indices: np.ndarray) -> Dict[str, Any]:
+    """Rows of a feature table, in the order given by indices"""
+    return {
+        key: value[indices] if isinstance(value, np.ndarray) else [value[i] for i in indices]
+        for key, value in features.items()
+    }
+
+def materialize_catalog_features(records: List[Dict[str, Any]], row_hashes: List[str], previous_features: Optional[Dict[str, Any]] = None, previous_hashes: Optional[List[str]] = None, vector_map: Optional[Dict[str, int]] = None):
+    """
+    Build the feature table for records, reusing rows of previous_features whose
+    content hash is unchanged. Returns (features, number of recomputed rows).
+    """
+    vector_map = influencer_map if vector_map is None else vector_map
+    if not previous_features or previous_hashes is None:
+        return build_influencer_features(records, vector_map), len(records)
+
+    previous_position = {row_hash: i for i, row_hash in enumerate(previous_hashes)}
+    reused_new = [i for i, row_hash in enumerate(row_hashes) if row_hash in previous_position]
+    reused_old = [previous_position[row_hashes[i]] for i in reused_new]
+    reused_set = set(reused_new)
+    changed = [i for i in range(len(records)) if i not in reused_set]
+
+    fresh = build_influencer_features([records[i] for i in changed], vector_map)
+    features = {}
+    for key, previous in previous_features.items():
+        if isinstance(previous, np.ndarray):
+            column = np.empty(len(records), dtype=previous.dtype)
+            column[reused_new] = previous[reused_old]
+            column[changed] = fresh[key]
+        else:
+            column = [None] * len(records)
+            for new_i, old_i in zip(reused_new, reused_old):
+                column[new_i] = previous[old_i]
+            for j, new_i in enumerate(changed):
+                column[new_i] = fresh[key][j]
+        features[key] = column
+
+    # These depend on catalog-wide lookups that are rebuilt on every load
+    features["match_category"] = [get_match_category(item) for item in records]
+    features["vector_index"] = np.array(
+        [vector_map.get(username, -1) for username in features["usernames"]], dtype=np.int64
+    )
+    return features, len(changed)
+
+catalog_row_hashes = [hash_influencer_row(item) for item in json_data]
+catalog_features, _ = materialize_catalog_features(json_data, catalog_row_hashes)
+logger.info(f"Materialized derived metrics for {len(json_data)} influencers")
+
+# Category candidates part
+# For every canonical category (the values of enhanced_categories.json) the catalog is
+# ranked once per dataset snapshot for a business that shares no words with any
+# influencer. Influencers with no term in common with a business description have a text
+# similarity of exactly 0, so that ranking is their final order. A request only scores
+# the influencers whose vectors overlap its description vector and merges them with the
+# head of the precomputed ranking. Results are identical to a full scan.
+#
+# Overlapping influencers are found through an inverted index (term -> rows, the CSC form
+# of influencer_vectors), so a request touches the postings of its own terms only. Other
+# business categories are served from the match-category groups: every row of a group
+# gets the same category score, so each group is ranked once per (group, score) pair and
+# a request merges the heads of its groups.
+
+CATEGORY_CANDIDATE_POOL = int(os.getenv("CATEGORY_CANDIDATE_POOL", 500))
+CATEGORY_GROUP_CACHE_SIZE = int(os.getenv("CATEGORY_GROUP_CACHE_SIZE", 4096))
+
+# Feature columns needed to score a row once its category score is known
+CANDIDATE_SCORE_COLUMNS = ("vector_index", "metrics_score", "quality_multiplier", "engaged_audience", "cost_estimate", "cost_efficiency")
+
+def score_from_category(tfidf_similarity, category_score: np.ndarray, features: Dict[str, Any]):
+    """(match, roi, composite) arrays from precomputed category scores"""
+    match_percentage = combine_match_parts(tfidf_similarity, category_score, features["metrics_score"])
+    roi_estimate = vectorized_roi_estimate(match_percentage, features)
+    return match_percentage, roi_estimate, vectorized_composite_score(match_percentage, roi_estimate, features)
+
+def build_category_candidates(features: Dict[str, Any], row_hashes: List[str], previous: Optional[Dict[str, Any]] = None, vectors=None, version: Optional[str] = None):
+    """
+    Category scores, zero-similarity composite scores and their ranking per canonical
+    category for one dataset snapshot. Rows whose content and match category are unchanged
+    since previous reuse their scores. vectors and version describe the snapshot
+    (default: the loaded one). Returns (candidates, number of recomputed rows).
+    """
+    vectors = influencer_vectors if vectors is None else vectors
+    version = dataset_version if version is None else version
+    categories = sorted({category.lower() for category in enhanced_categories_cache.values() if category})
+    size = len(row_hashes)
+
+    reused_new, reused_old = [], []
+    if previous:
+        previous_position = {row_hash: i for i, row_hash in enumerate(previous["row_hashes"])}
+        for i, row_hash in enumerate(row_hashes):
+            old = previous_position.get(row_hash)
+            if old is not None and previous["match_category"][old] == features["match_category"][i]:
+                reused_new.append(i)
+                reused_old.append(old)
+    reused_set = set(reused_new)
+    changed = np.array([i for i in range(size) if i not in reused_set], dtype=np.int64)
+    changed_features = select_features(features, changed)
+
+    category_scores, base_scores, order, unranked = {}, {}, {}, {}
+    for category in categories:
+        if category in (previous or {}).get("base_scores", {}):
+            scores, base = np.empty(size), np.empty(size)
+            scores[reused_new] = previous["category_scores"][category][reused_old]
+            base[reused_new] = previous["base_scores"][category][reused_old]
+            scores[changed] = vectorized_category_scores(category, changed_features["match_category"], calculate_category_match)
+            base[changed] = score_from_category(0.0, scores[changed], changed_features)[2]
+        else:
+            scores = vectorized_category_scores(category, features["match_category"], calculate_category_match)
+            base = score_from_category(0.0, scores, features)[2]
+        category_scores[category] = scores
+        base_scores[category] = base
+        order[category] = top_k_indices(np.round(base, 1), CATEGORY_CANDIDATE_POOL)
+        unranked[category] = np.nonzero(np.isnan(base))[0]
+
+    # Catalog row of each influencer_vectors row, to map overlapping vectors back to rows
+    vector_index = features["vector_index"]
+    row_of_vector = np.full(vectors.shape[0], -1, dtype=np.int64)
+    row_of_vector[vector_index[vector_index >= 0]] = np.nonzero(vector_index >= 0)[0]
+
+    # Rows of each match category, in catalog order
+    group_names, group_of_row = np.unique(np.array(features["match_category"], dtype=object), return_inverse=True)
+    by_group = np.argsort(group_of_row, kind="stable")
+    group_rows = np.split(by_group, np.cumsum(np.bincount(group_of_row, minlength=len(group_names)))[:-1])
+
+    candidates = {
+        "dataset_version": version,
+        "row_hashes": row_hashes,
+        "match_category": list(features["match_category"]),
+        "category_scores": category_scores,
+        "base_scores": base_scores,
+        "order": order,
+        # Rows whose zero-similarity score is NaN can't be ranked ahead of time, so they are always scored
+        "unranked": unranked,
+        "postings": vectors.tocsc(),
+        "row_of_vector": row_of_vector,
+        "group_names": list(group_names),
+        "group_of_row": group_of_row,
+        "group_rows": group_rows,
+        # (group, category score) -> ranked head of that group, filled on demand
+        "group_heads": ResponseCache(CATEGORY_GROUP_CACHE_SIZE, float("inf")),
+        # Rows without a vector get the default similarity of 0.5, so they are always scored
+        "always_scored": np.nonzero(vector_index < 0)[0],
+    }
+    return candidates, len(changed)
+
+def shared_term_rows(business_vector) -> np.ndarray:
+    """Catalog rows whose vectors share at least one term with business_vector, from the term postings"""
+    postings = category_candidates["postings"]
+    terms = business_vector.indices
+    starts, lengths = postings.indptr[terms], np.diff(postings.indptr)[terms]
+    total = lengths.sum()
+    if total == 0:
+        return np.array([], dtype=np.int64)
+
+    # Positions of every posting of every query term, without a Python loop over terms
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    vector_rows = np.unique(postings.indices[offsets + np.arange(total)])
+    rows = category_candidates["row_of_vector"][vector_rows]
+    return rows[rows >= 0]
+
+def category_group_head(group: int, category_score: float) -> Dict[str, Any]:
+    """Rows of one match-category group ranked by zero-similarity score for one category score"""
+    key = (group, category_score)
+    head = category_candidates["group_heads"].get(key)
+    if head is None:
+        rows = category_candidates["group_rows"][group]
+        features = {column: catalog_features[column][rows] for column in CANDIDATE_SCORE_COLUMNS}
+        base = score_from_category(0.0, np.full(len(rows), category_score), features)[2]
+        ranked = ~np.isnan(base)
+        head = {
+            "order": rows[ranked][top_k_indices(np.round(base[ranked], 1), CATEGORY_CANDIDATE_POOL)],
+            "unranked": rows[~ranked],
+            "complete": ranked.sum() <= CATEGORY_CANDIDATE_POOL,
+        }
+        category_candidates["group_heads"].set(key, head)
+    return head
+
+def rank_from_category_candidates(business: BusinessDetails, count: int):
+    """
+    Top `count` catalog rows for a business from the candidate index, as
+    (indices, match, roi, composite). Returns None when the full scan is needed.
+    """
+    business_text = f"{business.businessName} {business.businessCategory} {business.description}"
+    if category_candidates["dataset_version"] != dataset_version or not business_text.strip():
+        # A blank business gets the default similarity for every row, not 0
+        return None
+
+    business_category = business.businessCategory.lower()
+    if business_category in category_candidates["order"]:
+        row_category_scores = category_candidates["category_scores"][business_category]
+        heads = [category_candidates["order"][business_category]]
+        complete = [len(heads[0]) == len(json_data)]
+        unranked = category_candidates["unranked"][business_category]
+        category_scores_of = lambda rows: row_category_scores[rows]
+    else:
+        group_scores = np.array([
+            calculate_category_match(business_category, name) for name in category_candidates["group_names"]
+        ])
+        group_heads = [category_group_head(group, score) for group, score in enumerate(group_scores)]
+        heads = [head["order"] for head in group_heads]
+        complete = [head["complete"] for head in group_heads]
+        unranked = np.concatenate([head["unranked"] for head in group_heads])
+        category_scores_of = lambda rows: group_scores[category_candidates["group_of_row"][rows]]
+
+    # Rows sharing at least one term with the description get their exact score
+    business_vector = tfidf_vectorizer.transform([business_text])
+    scored = np.union1d(
+        np.union1d(shared_term_rows(business_vector), category_candidates["always_scored"]), unranked
+    )
+
+    # Every other row keeps its zero-similarity score; take the head of each ranking
+    unscored = np.concatenate(heads)
+    keep = np.split(~np.isin(unscored, scored), np.cumsum([len(order) for order in heads])[:-1])
+    unscored_heads = []
+    for order, kept, is_complete in zip(heads, keep, complete):
+        head = order[kept][:count]
+        if len(head) < count and not is_complete:
+            return None
+        unscored_heads.append(head)
+    unscored_head = np.concatenate(unscored_heads).astype(np.int64)
+
+    features = {key: catalog_features[key][scored] for key in CANDIDATE_SCORE_COLUMNS}
+    tfidf_similarity = vectorized_tfidf_similarity(business_vector, features)[0]
+    match_percentage, roi_estimate, composite_score = score_from_category(
+        tfidf_similarity, category_scores_of(scored), features
+    )
+    head_match, head_roi, head_composite = score_from_category(
+        0.0, category_scores_of(unscored_head),
+        {key: catalog_features[key][unscored_head] for key in CANDIDATE_SCORE_COLUMNS}
+    )
+
+    # Rank the union in catalog order so ties break exactly as in the full scan
+    rows = np.concatenate([scored, unscored_head])
+    by_row = np.argsort(rows, kind="stable")
+    composite_score = np.concatenate([composite_score, head_composite])[by_row]
+    top = top_k_indices(np.round(composite_score, 1), count)
+    match_percentage = np.concatenate([match_percentage, head_match])[by_row]
+    roi_estimate = np.concatenate([roi_estimate, head_roi])[by_row]
+    return rows[by_row][top], match_percentage[top], roi_estimate[top], composite_score[top]
+
+category_candidates, _ = build_category_candidates(catalog_features, catalog_row_hashes)
+logger.info(f"Precomputed candidate lists for {len(category_candidates['order'])} categories")
+
+# Similar influencers part
+# Top-K nearest neighbours of every influencer, built once per dataset snapshot.
+# Similarity = SIMILAR_TEXT_WEIGHT * TF-IDF cosine + (1 - SIMILAR_TEXT_WEIGHT) * cosine of
+# standardized numeric metrics, computed as one sparse product over combined rows,
+# a block of rows at a time. Stored as int32 neighbour rows and float32 scores.
+
+SIMILAR_NEIGHBORS = int(os.getenv("SIMILAR_NEIGHBORS", 20))
+SIMILAR_TEXT_WEIGHT = float(os.getenv("SIMILAR_TEXT_WEIGHT", 0.7))
+SIMILAR_MAX_BLOCK_CELLS = int(os.getenv("SIMILAR_MAX_BLOCK_CELLS", 2_000_000))
+
+def similarity_rows(features: Dict[str, Any], vectors=None) -> sp.csr_matrix:
+    """Rows whose dot products are the weighted text + metrics similarity"""
+    vectors = influencer_vectors if vectors is None else vectors
+    size = len(features["usernames"])
+    vector_index = features["vector_index"]
+    known = np.nonzero(vector_index >= 0)[0]
+    # Catalog-aligned TF-IDF rows; influencers without a vector get an empty row
+    placement = sp.csr_matrix((np.ones(len(known)), (known, vector_index[known])), shape=(size, vectors.shape[0]))
+    text_rows = placement @ vectors
+
+    metrics = np.column_stack([
+        np.log1p(np.nan_to_num(features["followers"])),
+        np.nan_to_num(features["engagement"]),
+        features["influence"],
+        features["credibility"],
+        features["engagement_quality"],
+        features["longevity"],
+    ])
+    std = metrics.std(axis=0)
+    metrics = (metrics - metrics.mean(axis=0)) / np.where(std > 0, std, 1)
+    norms = np.linalg.norm(metrics, axis=1, keepdims=True)
+    metrics = metrics / np.where(norms > 0, norms, 1)
+
+    return sp.hstack([
+        text_rows * math.sqrt(SIMILAR_TEXT_WEIGHT),
+        sp.csr_matrix(metrics * math.sqrt(1 - SIMILAR_TEXT_WEIGHT)),
+    ], format="csr")
+
+def build_neighbor_index(features: Dict[str, Any], k: int = SIMILAR_NEIGHBORS, vectors=None, version: Optional[str] = None) -> Dict[str, Any]:
+    """Top-k neighbours per row (excluding the row itself), best first"""
+    rows = similarity_rows(features, vectors)
+    size = rows.shape[0]
+    k = max(0, min(k, size - 1))
+    neighbors = np.zeros((size, k), dtype=np.int32)
+    scores = np.zeros((size, k), dtype=np.float32)
+    block_size = max(1, SIMILAR_MAX_BLOCK_CELLS // max(1, size))
+    transposed = rows.T.tocsc()
+
+    for start in range(0, size, block_size):
+        stop = min(size, start + block_size)
+        block = (rows[start:stop] @ transposed).toarray()
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # Not your own neighbour
+        if k == 0:
+            continue
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        neighbors[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+    return {"dataset_version": dataset_version if version is None else version, "neighbors": neighbors, "scores": scores}
+
+neighbor_index = build_neighbor_index(catalog_features)
+logger.info(f"Built similar-influencer index ({neighbor_index['neighbors'].shape[1]} neighbours per row)")
+
+@app.get("/influencers/{username}/similar")
+def similar_influencers(username: str, count: int = Query(10, ge=1, le=SIMILAR_NEIGHBORS)):
+    """Influencers most similar to username by content and audience metrics"""
+    idx = influencer_map.get(username)
+    if idx is None:
+        raise HTTPException(status_code=404, detail=f"Influencer '{username}' not found")
+
+    neighbors = neighbor_index["neighbors"][idx, :count]
+    scores = neighbor_index["scores"][idx, :count]
+    return {
+        "username": username,
+        "similar": [
+            {
+                "username": catalog_features["usernames"][neighbor],
+                "channel_info": json_data[neighbor].get("channel_info", ""),
+                "category": catalog_features["match_category"][neighbor] or "Unknown",
+                "followers": json_data[neighbor].get("followers", "Unknown"),
+                "similarity": round(float(score), 4),
+            }
+            for neighbor, score in zip(neighbors.tolist(), scores.tolist())
+        ],
+    }
+
+# Search part
+# Username lookup for autocomplete. Prefix matches come from a sorted array of lowercased
+# names (bisect gives the range); prefixes matching more than SEARCH_SCAN_LIMIT names have
+# their best rows precomputed, smaller ranges are ranked on the fly. Typos are handled by
+# a trigram index. Results are ordered by influenceiq_score. Rebuilt per dataset snapshot.
+
+SEARCH_SCAN_LIMIT = int(os.getenv("SEARCH_SCAN_LIMIT", 20000))
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_POSTING = int(os.getenv("SEARCH_MAX_POSTING", 50000))  # Trigrams this common don't narrow anything
+SEARCH_FUZZY_THRESHOLD = 0.3
+MAX_CHARACTER = chr(0x10FFFF)
+
+def normalize_search_text(text) -> str:
+    return str(text).strip().lstrip("@").lower()
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def top_rows_by_score(rows: np.ndarray, scores: np.ndarray, limit: int) -> np.ndarray:
+    """rows with the highest scores, best first (ties by row)"""
+    return rows[top_k_indices(scores, limit)]
+
+def build_search_index(records: List[Dict[str, Any]], version: Optional[str] = None) -> Dict[str, Any]:
+    names = [normalize_search_text(item.get("channel_info", "")) for item in records]
+    scores = pd.to_numeric([item.get("influenceiq_score") for item in records], errors="coerce")
+    scores = np.nan_to_num(np.asarray(scores, dtype=float), nan=-np.inf)
+
+    order = np.array(sorted(range(len(names)), key=names.__getitem__), dtype=np.int64)
+    sorted_names = [names[i] for i in order]
+    sorted_scores = scores[order]
+
+    # Best rows of every prefix whose range is too large to rank per keystroke
+    heavy_prefixes = {}
+    pending = [("", 0, len(sorted_names))]
+    while pending:
+        prefix, low, high = pending.pop()
+        if high - low <= SEARCH_SCAN_LIMIT:
+            continue
+        heavy_prefixes[prefix] = order[low:high][top_k_indices(sorted_scores[low:high], SEARCH_MAX_RESULTS)]
+        depth = len(prefix)
+        position = low
+        while position < high:
+            name = sorted_names[position]
+            if len(name) <= depth:
+                position += 1
+                continue
+            child = name[:depth + 1]
+            end = bisect.bisect_right(sorted_names, child + MAX_CHARACTER, position, high)
+            pending.append((child, position, end))
+            position = end
+
+    # Trigram -> rows, plus each name's trigram count for the similarity
+    postings = {}
+    gram_counts = np.zeros(len(names), dtype=np.int32)
+    for row, name in enumerate(names):
+        grams = trigrams(name)
+        gram_counts[row] = len(grams)
+        for gram in grams:
+            postings.setdefault(gram, []).append(row)
+    postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    return {
+        "dataset_version": dataset_version if version is None else version,
+        "sorted_names": sorted_names,
+        "order": order,
+        "sorted_scores": sorted_scores,
+        "scores": scores,
+        "heavy_prefixes": heavy_prefixes,
+        "postings": postings,
+        "gram_counts": gram_counts,
+    }
+
+def prefix_matches(index: Dict[str, Any], query: str, limit: int) -> np.ndarray:
+    if query in index["heavy_prefixes"]:
+        return index["heavy_prefixes"][query][:limit]
+    names = index["sorted_names"]
+    low = bisect.bisect_left(names, query)
+    # Every prefix with more than SEARCH_SCAN_LIMIT names is in heavy_prefixes, so this range is small
+    high = bisect.bisect_right(names, query + MAX_CHARACTER, low)
+    return index["order"][low:high][top_k_indices(index["sorted_scores"][low:high], limit)]
+
+def fuzzy_matches(index: Dict[str, Any], query: str, limit: int, exclude: np.ndarray) -> np.ndarray:
+    query_grams = trigrams(query)
+    lists = [index["postings"][gram] for gram in query_grams if gram in index["postings"]]
+    lists = [rows for rows in lists if len(rows) <= SEARCH_MAX_POSTING]
+    if not lists:
+        return np.array([], dtype=np.int64)
+
+    # Trigram Jaccard similarity between the query and every name sharing a trigram
+    rows, shared = np.unique(np.concatenate(lists), return_counts=True)
+    similarity = shared / (len(query_grams) + index["gram_counts"][rows] - shared)
+    keep = (similarity >= SEARCH_FUZZY_THRESHOLD) & ~np.isin(rows, exclude)
+    rows = rows[keep].astype(np.int64)
+    return top_rows_by_score(rows, index["scores"][rows], limit)
+
+search_index = build_search_index(json_data)
+logger.info(f"Built search index over {len(search_index['sorted_names'])} usernames")
+
+@app.get("/search")
+def search_influencers(
+    q: str = Query(..., min_length=1, description="Username prefix or approximate username"),
+    limit: int = Query(8, ge=1, le=SEARCH_MAX_RESULTS),
+    fuzzy: bool = Query(True, description="Add typo-tolerant matches after the prefix matches"),
+):
+    """Autocomplete over channel_info: prefix matches first, then fuzzy ones, each by influenceiq_score"""
+    query = normalize_search_text(q)
+    if not query:
+        return {"query": q, "results": []}
+
+    prefix_rows = prefix_matches(search_index, query, limit)
+    results = [(row, "prefix") for row in prefix_rows.tolist()]
+    if fuzzy and len(results) < limit and len(query) >= 3:
+        fuzzy_rows = fuzzy_matches(search_index, query, limit - len(results), prefix_rows)
+        results += [(row, "fuzzy") for row in fuzzy_rows.tolist()]
+
+    return {
+        "query": q,
+        "results": [
+            {
+                "username": catalog_features["usernames"][row],
+                "channel_info": json_data[row].get("channel_info", ""),
+                "rank": json_data[row].get("rank"),
+                "influenceiq_score": compact_value(json_data[row].get("influenceiq_score")),
+                "match": match,
+            }
+            for row, match in results
+        ],
+    }
+
+def load_change_list(file_sha: str) -> Optional[Dict[str, Any]]:
+    """The change list from main.py --incremental, if it leads from the loaded file to file_sha"""
+    try:
+        with open(CHANGE_LIST_PATH, 'r') as changes_file:
+            changes = json.load(changes_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if changes.get("previous_sha1") != dataset_file_sha or changes.get("sha1") != file_sha:
+        return None
+    return changes
+
+def apply_change_list(raw: bytes, changes: Dict[str, Any]):
+    """
+    Next json_data from a change list: unchanged records are taken over from the loaded
+    snapshot, only changed ones are parsed out of raw. Returns (records, row hashes with
+    None for changed rows, changed rows).
+    """
+    records: List[Optional[Dict[str, Any]]] = [None] * changes["rows"]
+    row_hashes: List[Optional[str]] = [None] * changes["rows"]
+    for new_start, old_start, length in changes["reused"]:
+        records[new_start:new_start + length] = json_data[old_start:old_start + length]
+        row_hashes[new_start:new_start + length] = catalog_row_hashes[old_start:old_start + length]
+
+    changed_rows = []
+    for row, start, end in changes["changed"]:
+        records[row] = json.loads(raw[start:end])
+        changed_rows.append(row)
+    return records, row_hashes, changed_rows
+
+# Serializes reloads (the endpoint and background jobs); requests keep being served meanwhile
+reload_lock = threading.Lock()
+
+def reload_dataset() -> Dict[str, Any]:
+    """
+    Reload JSON_FILE_PATH (and enhanced categories), refresh vectors and recompute derived metrics for changed rows only.
+    Blocking: call it from a worker thread. The new snapshot is built next to the loaded one
+    and swapped in with a single assignment, so requests see either the old or the new dataset.
+    """
+    global json_data, influencer_map, tfidf_vectorizer, influencer_vectors, text_index
+    global dataset_version, dataset_file_sha, dataset_categories_sha
+    global catalog_features, catalog_row_hashes, category_candidates, neighbor_index, search_index
+
+    with reload_lock:
+        with open(JSON_FILE_PATH, 'rb') as json_file:
+            raw = json_file.read()
+        file_sha = hashlib.sha1(raw).hexdigest()
+        categories_sha = file_digest(ENHANCED_CATEGORIES_FILE)
+        version = snapshot_version(file_sha, categories_sha)
+        if version == dataset_version:
+            return {"dataset_version": dataset_version, "rows": len(json_data), "recomputed_rows": 0}
+
+        # With a matching change list (and the same categories) only changed records are parsed and hashed
+        changes = load_change_list(file_sha) if categories_sha == dataset_categories_sha else None
+        if changes is not None:
+            records, row_hashes, changed_rows = apply_change_list(raw, changes)
+            vector_map = VectorizationManager.prepare_records(records)
+            for row in changed_rows:
+                row_hashes[row] = hash_influencer_row(records[row])
+        else:
+            records = json.loads(raw)
+            vector_map = VectorizationManager.prepare_records(records)
+            row_hashes = [hash_influencer_row(item) for item in records]
+
+        if VECTORIZATION_MODE == "incremental":
+            if changes is None:
+                previous_hashes = set(catalog_row_hashes)
+                changed_rows = [i for i, row_hash in enumerate(row_hashes) if row_hash not in previous_hashes]
+            removed_usernames = list(set(catalog_features["usernames"]) - set(vector_map))
+            vectorizer, vectors, index = VectorizationManager.apply_changes(records, changed_rows, removed_usernames)
+        else:
+            vectorizer, vectors, index = VectorizationManager.build_vectors(records)
+
+        features, recomputed = materialize_catalog_features(
+            records, row_hashes, catalog_features, catalog_row_hashes, vector_map
+        )
+        candidates, _ = build_category_candidates(features, row_hashes, category_candidates, vectors, version)
+        neighbors = build_neighbor_index(features, vectors=vectors, version=version)
+        search = build_search_index(records, version)
+
+        # Nothing in the swap calls out or frees memory (previous keeps the old objects alive
+        # until it is done), so no request thread runs between its stores
+        previous = (json_data, influencer_map, tfidf_vectorizer, influencer_vectors, text_index, catalog_features,
+                    catalog_row_hashes, category_candidates, neighbor_index, search_index)
+        (json_data, influencer_map, tfidf_vectorizer, influencer_vectors, text_index, catalog_features,
+         catalog_row_hashes, category_candidates, neighbor_index, search_index,
+         dataset_version, dataset_file_sha, dataset_categories_sha) = (
+            records, vector_map, vectorizer, vectors, index, features,
+            row_hashes, candidates, neighbors, search,
+            version, file_sha, categories_sha,
+        )
+        del previous
+        # Encoded columns of the replaced snapshot are never requested again
+        projection_column.cache_clear()
+
+    source = "change list" if changes is not None else "full parse"
+    logger.info(f"Reloaded dataset {version} ({source}): {len(records)} rows, {recomputed} recomputed")
+    return {
+        "dataset_version": version,
+        "rows": len(records),
+        "recomputed_rows": recomputed,
+        "from_change_list": changes is not None,
+    }
+
+@app.post("/admin/reload-data")
+async def reload_data():
+    """Pick up a rewritten output_file.json without restarting the service"""
+    try:
+        return await asyncio.to_thread(reload_dataset)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.error(f"Failed to reload dataset: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to reload dataset: {str(e)}")
+
+# Background jobs part
+# Long-running Gemini work runs in a JobQueue (see job_queue.py) instead of inside requests.
+# Jobs persist in JOB_DB_PATH, so queued work survives a restart, and at most JOB_WORKERS
+# run at once. POST /jobs submits, GET /jobs/{id} reports progress, GET /jobs/{id}/result
+# returns the outcome.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# A job still running after this many starts (each one ended by the process dying) is failed instead of re-run
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_PREWARM_MAX = int(os.getenv("JOB_PREWARM_MAX", 500))
+
+class JobRequest(BaseModel):
+    type: str
+    params: Dict[str, Any] = {}
+
+class SummaryPrewarmParams(BaseModel):
+    top_n: int = Field(50, ge=1, le=JOB_PREWARM_MAX)
+
+class CategoryEnrichmentParams(BaseModel):
+    batch_size: int = Field(25, ge=1, le=100)
+    limit: Optional[int] = Field(None, ge=1)     # At most this many new creators per job
+    use_classifier: bool = True                  # Label confident creators locally, see category_classifier.py
+
+def rank_order(influencer: Dict[str, Any]) -> float:
+    rank = influencer.get("rank")
+    return rank if isinstance(rank, (int, float)) else float("inf")
+
+async def prewarm_summaries(params: Dict[str, Any], progress) -> Dict[str, Any]:
+    """Generate and cache summaries for the top_n influencers by rank"""
+    ranked = sorted(json_data, key=rank_order)[:params["top_n"]]
+    pending = [item for item in ranked if summary_cache.get(build_summary_prompt(item)) is None]
+    generated = failed = skipped = 0
+
+    # One coalescer batch at a time, so a job holds at most one Gemini call
+    for start in range(0, len(pending), SUMMARY_MAX_BATCH_SIZE):
+        chunk = pending[start:start + SUMMARY_MAX_BATCH_SIZE]
+        results = await asyncio.gather(
+            *(summary_coalescer.summarize(item) for item in chunk), return_exceptions=True
+        )
+        generated += sum(not isinstance(result, BaseException) for result in results)
+        failed += sum(isinstance(result, BaseException) for result in results)
+        progress(start + len(chunk), len(pending))
+        if any(isinstance(result, CircuitOpenError) for result in results):
+            # Gemini is unavailable; the rest would fail the same way
+            skipped = len(pending) - start - len(chunk)
+            break
+
+    return {
+        "requested": len(ranked),
+        "already_cached": len(ranked) - len(pending),
+        "generated": generated,
+        "failed": failed,
+        "skipped": skipped,
+    }
+
+def save_enhanced_categories(updates: Dict[str, str]):
+    """Merge updates into ENHANCED_CATEGORIES_FILE, replacing it atomically"""
+    categories = {}
+    if os.path.exists(ENHANCED_CATEGORIES_FILE):
+        with open(ENHANCED_CATEGORIES_FILE, 'r', encoding='utf-8') as f:
+            categories = json.load(f)
+    categories.update(updates)
+
+    temporary_path = ENHANCED_CATEGORIES_FILE + ".tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(categories, f, indent=2)
+    os.replace(temporary_path, ENHANCED_CATEGORIES_FILE)
+
+async def enrich_new_categories(params: Dict[str, Any], progress) -> Dict[str, Any]:
+    """
+    Categorize influencers missing from the enhanced categories, then reload. The local
+    classifier labels the ones it is confident about; only the rest go to Gemini.
+    """
+    # Imported here: enrich_categories configures logging on import, which must not override ours
+    from enrich_categories import build_category_prompt, parse_category_response
+    from category_classifier import load_or_train, save_predicted, split_by_confidence
+
+    missing = [
+        item for item in json_data
+        if get_username(item.get("channel_info", "")) not in enhanced_categories_cache
+    ]
+    if params["limit"]:
+        missing = missing[:params["limit"]]
+
+    predicted = {}
+    if missing and params["use_classifier"]:
+        # Training (when the labels changed) and prediction are CPU-bound; keep them off the event loop
+        classifier = await asyncio.to_thread(load_or_train, json_data, dict(enhanced_categories_cache))
+        predicted, missing_after = await asyncio.to_thread(
+            split_by_confidence, classifier, missing,
+            [get_username(item.get("channel_info", "")) for item in missing]
+        )
+    else:
+        missing_after = missing
+    categorized = {username: prediction["category"] for username, prediction in predicted.items()}
+
+    failed_batches = 0
+    batch_size = params["batch_size"]
+    for start in range(0, len(missing_after), batch_size):
+        batch = missing_after[start:start + batch_size]
+        asked = {get_username(item.get("channel_info", "")) for item in batch}
+        try:
+            answer = parse_category_response(await call_gemini(build_category_prompt(batch)))
+            categorized.update({
+                username: category.strip() for username, category in answer.items()
+                if username in asked and isinstance(category, str) and category.strip()
+            })
+        except Exception as e:
+            failed_batches += 1
+            logger.warning(f"Category enrichment batch failed: {str(e)}")
+        progress(len(predicted) + start + len(batch), len(missing))
+
+    reloaded = None
+    if categorized:
+        if predicted:
+            await asyncio.to_thread(save_predicted, predicted)
+        await asyncio.to_thread(save_enhanced_categories, categorized)
+        # Off the event loop and behind reload_lock, like /admin/reload-data
+        reloaded = await asyncio.to_thread(reload_dataset)
+
+    return {
+        "missing": len(missing),
+        "classified_locally": len(predicted),
+        "sent_to_gemini": len(missing_after),
+        "categorized": len(categorized),
+        "failed_batches": failed_batches,
+        "reload": reloaded,
+    }
+
+job_params = {
+    "summary_prewarm": SummaryPrewarmParams,
+    "category_enrichment": CategoryEnrichmentParams,
+}
+# Opened by the app's lifespan, so importing this module doesn't touch JOB_DB_PATH
+job_queue: Optional[JobQueue] = None
+
+def start_job_workers(loop: asyncio.AbstractEventLoop):
+    global job_queue
+    job_queue = JobQueue(JOB_DB_PATH, JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS)
+    job_queue.register("summary_prewarm", prewarm_summaries)
+    job_queue.register("category_enrichment", enrich_new_categories)
+    # Coroutine handlers run on the server's event loop, next to request handlers
+    job_queue.start(loop)
+
+def stop_job_workers():
+    job_queue.stop(timeout=5)
+
+def running_job_queue() -> JobQueue:
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="The job queue is not running")
+    return job_queue
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in job.items() if key != "result"}
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest):
+    params_model = job_params.get(request.type)
+    if params_model is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job type '{request.type}'. Available: {', '.join(job_params)}"
+        )
+    try:
+        params = params_model(**request.params)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    return job_status(running_job_queue().submit(request.type, params.model_dump()))
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(JOB_STATUSES)}")
+    return {
+        "counts": running_job_queue().counts(),
+        "jobs": [job_status(job) for job in running_job_queue().list(status, limit)],
+    }
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = running_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job_status(job)
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = running_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=409, detail=f"Job failed: {job['error']}")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    return {"id": job_id, "type": job["type"], "result": job["result"]}
+
+# Campaign optimizer part
+# Picks the set of influencers that maximizes expected return (or reach) within a budget.
+# Greedy by value per dollar: every extra influencer in the same (country, category)
+# audience segment is worth overlap_penalty times less than the previous one. The result is the better of
+# the greedy set and the best single influencer, and the fractional knapsack bound on
+# the undiscounted values is returned alongside as an upper bound.
+
+CAMPAIGN_OBJECTIVES = ("roi", "reach")
+
+class CampaignOptimizerRequest(BaseModel):
+    business: BusinessDetails
+    budget: float = Field(..., gt=0)
+    objective: str = "roi"  # "roi": expected net return in $, "reach": estimated reach
+    max_per_country: Optional[int] = Field(None, ge=1)
+    max_per_category: Optional[int] = Field(None, ge=1)
+    max_influencers: Optional[int] = Field(None, ge=1)
+    overlap_penalty: float = Field(0.8, gt=0, le=1)  # 1 disables the diminishing returns
+
+@lru_cache(maxsize=4)
+def catalog_segments(version: str):
+    """Country and category ids per catalog row, with the id -> name lists"""
+    countries = [
+        item.get("country") if isinstance(item.get("country"), str) and item.get("country") else "Unknown"
+        for item in json_data
+    ]
+    country_names, country_ids = np.unique(np.array(countries, dtype=object), return_inverse=True)
+    categories = [category or "Unknown" for category in catalog_features["match_category"]]
+    category_names, category_ids = np.unique(np.array(categories, dtype=object), return_inverse=True)
+    return country_ids, list(country_names), category_ids, list(category_names)
+
+def optimize_campaign(values: np.ndarray, costs: np.ndarray, country_ids: np.ndarray, category_ids: np.ndarray,
+                      budget: float, max_per_country: Optional[int] = None, max_per_category: Optional[int] = None,
+                      max_influencers: Optional[int] = None, overlap_penalty: float = 1.0):
+    """
+    Choose rows within budget. Returns (rows, discounted value per row, strategy, upper bound).
+    """
+    eligible = np.nonzero(np.isfinite(values) & (values > 0) & (costs > 0) & (costs <= budget))[0]
+    if len(eligible) == 0:
+        return [], [], "none", 0.0
+
+    # Fractional knapsack on undiscounted values: no selection can do better
+    by_ratio = eligible[np.argsort(-(values[eligible] / costs[eligible]), kind="stable")]
+    cumulative_cost = np.cumsum(costs[by_ratio])
+    whole = int(np.searchsorted(cumulative_cost, budget, side="right"))
+    upper_bound = float(values[by_ratio[:whole]].sum())
+    if whole < len(by_ratio):
+        spent = cumulative_cost[whole - 1] if whole else 0.0
+        upper_bound += float(values[by_ratio[whole]] * (budget - spent) / costs[by_ratio[whole]])
+
+    # Within a segment every influencer carries the same discount, so each segment is
+    # ranked once by value per dollar and the heap only holds the head of each segment
+    n_categories = int(category_ids.max()) + 1
+    segment_ids = country_ids[eligible] * n_categories + category_ids[eligible]
+    ratios = values[eligible] / costs[eligible]
+    ordered = eligible[np.lexsort((-ratios, segment_ids))]
+    ordered_segments = np.sort(segment_ids)
+    starts = np.flatnonzero(np.r_[True, ordered_segments[1:] != ordered_segments[:-1]])
+    ends = np.r_[starts[1:], len(ordered)]
+
+    ordered = ordered.tolist()
+    value_of = values.tolist()
+    cost_of = costs.tolist()
+    country_of = country_ids.tolist()
+    category_of = category_ids.tolist()
+
+    # Heap entries: (-discounted value per dollar, row, segment position, segment end, picks in segment)
+    heap = [(-value_of[ordered[start]] / cost_of[ordered[start]], ordered[start], int(start), int(end), 0)
+            for start, end in zip(starts, ends)]
+    heapq.heapify(heap)
+    country_picks = {}
+    category_picks = {}
+    min_cost = float(costs[eligible].min())
+    remaining = budget
+    rows, row_values = [], []
+
+    while heap and remaining >= min_cost:
+        if max_influencers is not None and len(rows) >= max_influencers:
+            break
+        _, i, position, end, picks = heapq.heappop(heap)
+        # Caps close the whole segment: all its influencers share the country and category
+        if max_per_country is not None and country_picks.get(country_of[i], 0) >= max_per_country:
+            continue
+        if max_per_category is not None and category_picks.get(category_of[i], 0) >= max_per_category:
+            continue
+
+        if cost_of[i] <= remaining:
+            rows.append(i)
+            row_values.append(value_of[i] * overlap_penalty ** picks)
+            remaining -= cost_of[i]
+            picks += 1
+            country_picks[country_of[i]] = country_picks.get(country_of[i], 0) + 1
+            category_picks[category_of[i]] = category_picks.get(category_of[i], 0) + 1
+        # An influencer that doesn't fit now never will, as the budget only shrinks
+
+        if position + 1 < end:
+            following = ordered[position + 1]
+            heapq.heappush(heap, (-value_of[following] * overlap_penalty ** picks / cost_of[following], following, position + 1, end, picks))
+
+    # Greedy by ratio can miss one expensive, very valuable influencer
+    best_single = int(eligible[np.argmax(values[eligible])])
+    if values[best_single] > sum(row_values):
+        return [best_single], [float(values[best_single])], "best_single", upper_bound
+    return rows, row_values, "greedy", upper_bound
+
+@app.post("/campaign-optimizer")
+async def campaign_optimizer(request: CampaignOptimizerRequest):
+    """
+    Select influencers for a business that maximize total expected return or reach
+    without exceeding the budget, with optional country/category caps.
+    """
+    if request.objective not in CAMPAIGN_OBJECTIVES:
+        raise HTTPException(status_code=400, detail=f"objective must be one of: {', '.join(CAMPAIGN_OBJECTIVES)}")
+
+    logger.info(f"Optimizing a ${request.budget:,.0f} campaign for {request.business.businessName}")
+
+    match_percentage = vectorized_match_percentage(request.business, catalog_features)
+    roi_estimate = vectorized_roi_estimate(match_percentage, catalog_features)
+    costs = catalog_features["cost_estimate"]
+    reach = catalog_features["estimated_reach"].astype(float)
+    # Expected net return in $ (ROI is a percentage of the cost)
+    expected_return = roi_estimate / 100 * costs
+    values = expected_return if request.objective == "roi" else reach
+
+    country_ids, country_names, category_ids, category_names = catalog_segments(dataset_version)
+    rows, row_values, strategy, upper_bound = optimize_campaign(
+        values, costs, country_ids, category_ids, request.budget,
+        request.max_per_country, request.max_per_category, request.max_influencers, request.overlap_penalty
+    )
+
+    selected = []
+    for i, value in zip(rows, row_values):
+        selected.append({
+            "username": catalog_features["usernames"][i],
+            "channel_info": json_data[i].get("channel_info", ""),
+            "country": country_names[country_ids[i]],
+            "category": category_names[category_ids[i]],
+            "match_percentage": round(float(match_percentage[i]), 1),
+            "estimated_cost": round(float(costs[i]), 2),
+            "estimated_roi": round(float(roi_estimate[i]), 2),
+            "estimated_reach": int(reach[i]),
+            "value": round(value, 2),
+        })
+
+    total_cost = float(costs[rows].sum()) if rows else 0.0
+    return {
+        "objective": request.objective,
+        "strategy": strategy,
+        "budget": request.budget,
+        "total_cost": round(total_cost, 2),
+        "remaining_budget": round(request.budget - total_cost, 2),
+        "total_value": round(sum(row_values), 2),
+        "upper_bound": round(upper_bound, 2),
+        "total_reach": int(reach[rows].sum()) if rows else 0,
+        "expected_return": round(float(expected_return[rows].sum()), 2) if rows else 0.0,
+        "influencers": selected,
+    }
 
 # ---------------------------------- Romeiro's code ends here --------------------------------------------
 
 
+# Field projection / compact payloads for the list endpoints
+# fields=a,b,c keeps only those fields; compact=true rounds floats and returns
+# struct-of-arrays JSON ({"fields", "count", "columns"}). Every field is JSON-encoded
+# once per dataset version (projection_column) and responses are joined from slices
+# of those encodings, so the cache holds at most two entries per catalog field.
+
+COMPACT_FLOAT_DIGITS = 3
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Validate a comma-separated fields= parameter against the catalog's fields.
+    Duplicates are dropped and the fields come back in catalog order.
+    """
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    known = catalog_fields(dataset_version)
+    unknown = sorted(requested - set(known))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return [field for field in known if field in requested]
+
+@lru_cache(maxsize=4)
+def catalog_fields(version: str) -> List[str]:
+    """All record fields in first-seen order"""
+    seen = {}
+    for item in json_data:
+        for key in item:
+            seen.setdefault(key, None)
+    return list(seen)
+
+def compact_value(value):
+    if isinstance(value, float):
+        return round(value, COMPACT_FLOAT_DIGITS) if math.isfinite(value) else None
+    return value
+
+def encode_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), allow_nan=False)
+
+@lru_cache(maxsize=128)
+def projection_column(version: str, field: str, compact: bool) -> List[Optional[str]]:
+    """
+    The field of every catalog row, JSON-encoded. Compact columns hold the rounded value
+    (null when missing); row columns hold the '"field":value' member, or None when the
+    row has no such field. Cleared by reload_dataset().
+    """
+    if compact:
+        return [encode_json(compact_value(item.get(field))) for item in json_data]
+    prefix = encode_json(field) + ":"
+    return [prefix + encode_json(item[field]) if field in item else None for item in json_data]
+
+def encode_projection(start: int, end: int, fields: Optional[List[str]], compact: bool) -> str:
+    """JSON projection of catalog rows start:end"""
+    if compact:
+        fields = fields or catalog_fields(dataset_version)
+        columns = ",".join(
+            f"{encode_json(field)}:[{','.join(projection_column(dataset_version, field, True)[start:end])}]"
+            for field in fields
+        )
+        count = len(json_data[start:end])
+        return f'{{"fields":{encode_json(fields)},"count":{count},"columns":{{{columns}}}}}'
+    if not fields:
+        return "[" + ",".join("{}" for _ in json_data[start:end]) + "]"
+    columns = [projection_column(dataset_version, field, False)[start:end] for field in fields]
+    rows = ("{" + ",".join(member for member in members if member is not None) + "}" for members in zip(*columns))
+    return "[" + ",".join(rows) + "]"
+
+def projected_response(body: str) -> Response:
+    return Response(content=body.encode("utf-8"), media_type="application/json")
+
 # API Endpoint to fetch paginated data
 @app.get("/data")
-def get_data(page: int = Query(1, ge=1), per_page: int = Query(200, ge=1)):
+def get_data(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(200, ge=1),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    compact: bool = Query(False, description="Round floats and return columns as arrays"),
+):
     """
     Fetch paginated JSON data.
     """
     logger.info(f"Fetching data for page {page} with {per_page} items per page")
     start = (page - 1) * per_page
     end = start + per_page
-    return json_data[start:end]
+    if not fields and not compact:
+        return json_data[start:end]
+
+    return projected_response(encode_projection(start, end, parse_fields(fields), compact))
 
 # API Endpoint to fetch a specific influencer by rank
 @app.get("/data/rank/{rank}")
@@ -899,9 +3243,152 @@ def get_influencer_by_rank(rank: int):
 
 # Add this endpoint to fetch all usernames
 @app.get("/users")
-def get_all_users():
+def get_all_users(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    compact: bool = Query(False, description="Round floats and return columns as arrays"),
+):
     logger.info("Fetching all user data")
-    return {"users": json_data}
+    if not fields and not compact:
+        return {"users": json_data}
+
+    body = encode_projection(0, len(json_data), parse_fields(fields), compact)
+    return projected_response(f'{{"users":{body}}}')
+
+# Aggregates part
+# Per-country and per-category summary tables for the dashboard views, built with
+# pandas group-bys once per dataset snapshot and served as small cached responses.
+
+AGGREGATE_DIMENSIONS = ("country", "category")
+
+@lru_cache(maxsize=4)
+def catalog_frame(version: str) -> pd.DataFrame:
+    """Numeric catalog columns with their country and category labels"""
+    country_ids, country_names, category_ids, category_names = catalog_segments(version)
+    return pd.DataFrame({
+        "country": np.array(country_names, dtype=object)[country_ids],
+        "category": np.array(category_names, dtype=object)[category_ids],
+        "followers": catalog_features["followers"],
+        "engagement": catalog_features["engagement"],
+        "influence_score": catalog_features["influence"],
+        "credibility_score": catalog_features["credibility"],
+        "engagement_quality_score": catalog_features["engagement_quality"],
+        "longevity_score": catalog_features["longevity"],
+        "influenceiq_score": pd.to_numeric([item.get("influenceiq_score") for item in json_data], errors="coerce"),
+    })
+
+def build_aggregates(dimension: str) -> Dict[str, Any]:
+    """count, sum, mean and percentiles of the catalog metrics per group"""
+    frame = catalog_frame(dataset_version)
+    grouped = frame.groupby(dimension, sort=False)
+    table = grouped.agg(
+        count=("followers", "size"),
+        followers_total=("followers", "sum"),
+        followers_mean=("followers", "mean"),
+        engagement_mean=("engagement", "mean"),
+        influence_score_mean=("influence_score", "mean"),
+        credibility_score_mean=("credibility_score", "mean"),
+        influenceiq_score_mean=("influenceiq_score", "mean"),
+    )
+    for column in ("followers", "engagement", "influenceiq_score"):
+        percentiles = grouped[column].quantile([0.5, 0.9]).unstack()
+        table[f"{column}_p50"] = percentiles[0.5]
+        table[f"{column}_p90"] = percentiles[0.9]
+    table = table.sort_values(["count", "followers_total"], ascending=False)
+
+    groups = []
+    for key, row in table.iterrows():
+        group = {dimension: key, "count": int(row["count"])}
+        group.update({column: compact_value(float(value)) for column, value in row.items() if column != "count"})
+        groups.append(group)
+    return {
+        "dimension": dimension,
+        "dataset_version": dataset_version,
+        "total": len(frame),
+        "groups": groups,
+    }
+
+@app.get("/aggregates/{dimension}")
+def get_aggregates(dimension: str):
+    """
+    Summary per country or per category: counts, follower totals, and mean and
+    percentile scores. Use /aggregates/countries or /aggregates/categories.
+    """
+    dimension = {"countries": "country", "categories": "category"}.get(dimension, dimension)
+    if dimension not in AGGREGATE_DIMENSIONS:
+        raise HTTPException(status_code=404, detail="Use /aggregates/countries or /aggregates/categories")
+    return projected_response(("aggregates", dimension), lambda: build_aggregates(dimension))
+
+# Comparison part
+# Percentile ranks come from sorted copies of every metric (catalog-wide and per
+# country/category), built once per snapshot and searched with np.searchsorted.
+
+COMPARE_METRICS = (
+    "followers", "engagement", "influence_score", "credibility_score",
+    "engagement_quality_score", "longevity_score", "influenceiq_score",
+)
+COMPARE_MAX_USERNAMES = 20
+
+def sorted_finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return np.sort(values[np.isfinite(values)])
+
+@lru_cache(maxsize=2)
+def percentile_tables(version: str) -> Dict[str, Any]:
+    """Sorted metric arrays: {"all": {metric: array}, "country": {name: {metric: array}}, "category": ...}"""
+    frame = catalog_frame(version)
+    tables = {"all": {metric: sorted_finite(frame[metric]) for metric in COMPARE_METRICS}}
+    for dimension in AGGREGATE_DIMENSIONS:
+        tables[dimension] = {
+            key: {metric: sorted_finite(group[metric]) for metric in COMPARE_METRICS}
+            for key, group in frame.groupby(dimension, sort=False)
+        }
+    return tables
+
+def percentile_rank(sorted_values: np.ndarray, value: float) -> Optional[float]:
+    """Share of values below, counting ties as half, in percent"""
+    if len(sorted_values) == 0 or not math.isfinite(value):
+        return None
+    below = np.searchsorted(sorted_values, value, side="left")
+    at_or_below = np.searchsorted(sorted_values, value, side="right")
+    return round(float((below + at_or_below) / 2 / len(sorted_values) * 100), 1)
+
+@app.get("/compare")
+def compare_influencers(usernames: str = Query(..., description="Comma-separated usernames")):
+    """Metrics of several influencers with their percentile rank in the catalog, country and category"""
+    requested = [username.strip() for username in usernames.split(",") if username.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="Provide at least one username")
+    if len(requested) > COMPARE_MAX_USERNAMES:
+        raise HTTPException(status_code=400, detail=f"Compare at most {COMPARE_MAX_USERNAMES} influencers")
+
+    frame = catalog_frame(dataset_version)
+    tables = percentile_tables(dataset_version)
+    influencers, not_found = [], []
+    for username in requested:
+        idx = influencer_map.get(username)
+        if idx is None:
+            not_found.append(username)
+            continue
+
+        row = frame.iloc[idx]
+        metrics = {}
+        for metric in COMPARE_METRICS:
+            value = float(row[metric])
+            metrics[metric] = {
+                "value": compact_value(value),
+                "percentile": percentile_rank(tables["all"][metric], value),
+                "country_percentile": percentile_rank(tables["country"][row["country"]][metric], value),
+                "category_percentile": percentile_rank(tables["category"][row["category"]][metric], value),
+            }
+        influencers.append({
+            "username": username,
+            "channel_info": json_data[idx].get("channel_info", ""),
+            "country": row["country"],
+            "category": row["category"],
+            "metrics": metrics,
+        })
+
+    return {"influencers": influencers, "not_found": not_found}
 
 
 # Health check endpoint
@@ -952,9 +3439,7 @@ async def receive_business(user: BusinessUser):
 
     # Call Gemini
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        suggestions = response.text.strip()
+        suggestions = (await call_gemini(prompt)).strip()
         logger.info(f"Gemini suggestions: {suggestions}")
         
         # ✅ Return suggestions to Node.js
@@ -963,33 +3448,183 @@ async def receive_business(user: BusinessUser):
             "suggested_influencers": suggestions
         }
 
+    except CircuitOpenError:
+        logger.warning("Gemini circuit breaker open, using TF-IDF shortlist")
     except GoogleAPICallError as e:
         logger.error(f"Gemini API error: {e.message}")
-        raise HTTPException(status_code=500, detail="Gemini API failed with an error.")
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        raise HTTPException(status_code=500, detail="Unexpected error occurred.")
+        logger.error(f"Unexpected error: {type(e).__name__}: {e}")
+
+    # Fallback: the closest influencers by TF-IDF similarity to the description
+    return {
+        "message": "Business data received and suggestions generated locally.",
+        "suggested_influencers": "\n".join(f"- {username}" for username in tfidf_shortlist(user.description)),
+        "fallback": True
+    }
+
+def tfidf_shortlist(description: str, count: int = 10) -> List[str]:
+    """Usernames of the influencers most similar to a business description"""
+    if not description or not description.strip():
+        scores = catalog_features["metrics_score"].copy()
+    else:
+        business_vector = tfidf_vectorizer.transform([description])
+        scores = vectorized_tfidf_similarity(business_vector, catalog_features)[0]
+        # Break similarity ties (e.g. no shared terms) by influencer quality
+        scores = scores + catalog_features["metrics_score"] * 1e-6
+    return [catalog_features["usernames"][idx] for idx in top_k_indices(scores, count)]
+
+
+@app.get("/health/gemini")
+def gemini_health():
+    """Circuit breaker state and counters for monitoring"""
+    return gemini_breaker.snapshot()
+
+
+# World influence map part
+# Influence is spread from the home country using a precomputed country-affinity
+# matrix built from language, region and geographic proximity.
+
+COUNTRY_METADATA_FILE = "country_metadata.json"
+
+def load_country_metadata(path: str = COUNTRY_METADATA_FILE) -> List[Dict[str, Any]]:
+    """Load the country list (names match world_countries.geojson on the frontend)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.error(f"Failed to load country metadata from {path}: {str(e)}")
+        return []
+
+def build_country_affinity(countries: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Pairwise country affinity in [0, 1] (1 on the diagonal), combining
+    shared languages, shared subregion/continent and great-circle distance.
+    """
+    n = len(countries)
+    if n == 0:
+        return np.zeros((0, 0))
+
+    # Language overlap (Jaccard) via a country x language indicator matrix
+    languages = sorted({lang for country in countries for lang in country.get("languages", [])})
+    language_index = {lang: i for i, lang in enumerate(languages)}
+    spoken = np.zeros((n, max(1, len(languages))))
+    for i, country in enumerate(countries):
+        for lang in country.get("languages", []):
+            spoken[i, language_index[lang]] = 1
+    shared = spoken @ spoken.T
+    counts = spoken.sum(axis=1)
+    union = counts[:, None] + counts[None, :] - shared
+    language_affinity = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+    # Same subregion counts fully, same continent partially
+    continent = np.array([country.get("continent", "") for country in countries], dtype=object)
+    subregion = np.array([country.get("subregion", "") for country in countries], dtype=object)
+    region_affinity = np.where(
+        subregion[:, None] == subregion[None, :], 1.0,
+        np.where(continent[:, None] == continent[None, :], 0.6, 0.0)
+    )
+
+    # Proximity decays with distance between country label points (haversine, km)
+    lat = np.radians([country.get("latitude", 0.0) for country in countries])
+    lon = np.radians([country.get("longitude", 0.0) for country in countries])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    distance_km = 2 * 6371 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    proximity_affinity = np.exp(-distance_km / 3000)
+
+    affinity = 0.45 * language_affinity + 0.3 * region_affinity + 0.25 * proximity_affinity
+    np.fill_diagonal(affinity, 1.0)
+    return affinity
+
+country_metadata = load_country_metadata()
+country_names = [country["name"] for country in country_metadata]
+country_affinity = build_country_affinity(country_metadata)
+
+# Lowercased name/alias -> row in country_affinity
+country_index = {}
+for i, country in enumerate(country_metadata):
+    for name in [country["name"], *country.get("aliases", [])]:
+        country_index[name.lower()] = i
+country_index.update({
+    alias: country_index[target]
+    for alias, target in {
+        "usa": "united states of america",
+        "us": "united states of america",
+        "uk": "united kingdom",
+        "great britain": "united kingdom",
+        "czech republic": "czechia",
+    }.items()
+    if target in country_index
+})
+
+def resolve_country(country) -> Optional[int]:
+    """Find the affinity row for a country name, tolerating aliases and mis-decoded UTF-8"""
+    if not isinstance(country, str) or not country.strip():
+        return None
+    name = country.strip()
+    idx = country_index.get(name.lower())
+    if idx is None:
+        try:
+            # Some CSV rows were decoded as latin-1, e.g. "CÃ´te d'Ivoire"
+            idx = country_index.get(name.encode("latin-1").decode("utf-8").lower())
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return idx
+
+@lru_cache(maxsize=4096)
+def compute_influence_map(home_country: str, base_score: float, followers: float, version: str) -> Dict[str, float]:
+    """
+    Per-country influence scores (0-100) for one influencer.
+    Memoized per influencer inputs and dataset version.
+    """
+    # Bigger audiences travel further: the floor outside the home region grows with followers
+    global_reach = min(1.0, math.log10(followers + 1) / 9) if followers > 0 else 0.0
+    floor = 0.05 + 0.3 * global_reach
+    base_score = max(0.0, min(100.0, base_score))
+
+    home_idx = resolve_country(home_country)
+    if home_idx is None:
+        # Unknown home country: spread evenly at the global reach level
+        scores = np.full(len(country_names), base_score * (floor + (1 - floor) * 0.3))
+    else:
+        scores = base_score * (floor + (1 - floor) * country_affinity[home_idx])
+
+    return {name: round(float(score), 1) for name, score in zip(country_names, scores)}
 
+class InfluenceMapRequest(BaseModel):
+    influencer_name: Optional[str] = None
+    influencer_country: Optional[str] = None
+    influencer_category: Optional[str] = None
+    base_influence_score: Optional[float] = 50
+    request_type: Optional[str] = None
 
 @app.post("/api/gemini/generate-influence")
-async def generate_influence(request: InfluencerRequest):
+async def generate_influence(request: InfluenceMapRequest):
+    """
+    Generate a world influence map for an influencer.
+    Computed locally from the country-affinity matrix; catalog influencers use their stored metrics.
+    """
     try:
-        # Call to Google's Gemini API
-        response = genai.generate_content(f"""
-        Generate a world influence map for {request.influencer_name} from {request.influencer_category} category.
-        Based on their home country of {request.influencer_country} and base influence score of {request.base_influence_score},
-        create a JSON object with country names as keys and influence scores (0-100) as values for major countries worldwide.
-        Consider cultural, geographic, linguistic proximity factors. Format as valid JSON only.
-        """)
-        
-        # Parse the generated content
-        influence_map = json.loads(response.text)
-        
+        home_country = request.influencer_country or ""
+        base_score = float(request.base_influence_score or 50)
+        followers = 0.0
+
+        idx = influencer_map.get(get_username(request.influencer_name or ""))
+        if idx is not None:
+            influencer = json_data[idx]
+            home_country = influencer.get("country") or home_country
+            base_score = float(influencer.get("influence_score", base_score))
+            followers = parse_follower_count(influencer.get("followers", 0))
+
+        influence_map = compute_influence_map(str(home_country), base_score, followers, dataset_version)
+
         return {
             "status": "success",
             "influence_map": influence_map
         }
     except Exception as e:
+        logger.error(f"Error generating influence map: {str(e)}")
         return {
             "status": "error",
             "message": str(e),
@@ -1010,13 +3645,18 @@ class RegressionResult(BaseModel):
     r_squared: float
     predictions: List[Dict[str, Union[str, float]]]
         
-@app.post("/analyze/regression/{metric}")
-async def calculate_regression(metric: str, data: List[TrendPoint]):
-    """Calculate linear regression for specified metric and return model details."""
+REGRESSION_METRICS = ["engagement", "quality_score", "followers", "likes"]
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def fit_regression(metric: str, data: List[TrendPoint], future_labels: Optional[List[Dict[str, str]]] = None) -> RegressionResult:
+    """
+    Linear regression of metric over the points, with predictions for the points and the
+    future periods. future_labels names those periods; by default 9 months after the last point.
+    """
     if not data or len(data) < 2:
         raise HTTPException(400, "Need at least 2 data points for regression")
     
-    if metric not in ["engagement", "quality_score", "followers", "likes"]:
+    if metric not in REGRESSION_METRICS:
         raise HTTPException(400, f"Unsupported metric: {metric}")
     
     # Extract data for regression
@@ -1026,8 +3666,9 @@ async def calculate_regression(metric: str, data: List[TrendPoint]):
     # Fit regression model
     model = LinearRegression().fit(X, y)
     
-    # Calculate predictions including 9 future months
-    future_X = np.array(range(len(data) + 9)).reshape(-1, 1)
+    # Calculate predictions including the future periods
+    future_count = 9 if future_labels is None else len(future_labels)
+    future_X = np.array(range(len(data) + future_count)).reshape(-1, 1)
     predictions = model.predict(future_X)
     
     # Generate prediction results
@@ -1037,15 +3678,16 @@ async def calculate_regression(metric: str, data: List[TrendPoint]):
         if i < len(data):
             month = data[i].month
             period = data[i].period
+        elif future_labels is not None:
+            month = future_labels[i - len(data)]["month"]
+            period = future_labels[i - len(data)]["period"]
         else:
             # For future months, generate month names
             # This is simplified - you might want more accurate month prediction
             last_date_parts = data[-1].period.split()
-            month_idx = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                         "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"].index(last_date_parts[0])
+            month_idx = MONTH_NAMES.index(last_date_parts[0])
             future_month_idx = (month_idx + (i - len(data) + 1)) % 12
-            month = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"][future_month_idx]
+            month = MONTH_NAMES[future_month_idx]
             year = int(last_date_parts[1])
             if future_month_idx < month_idx:
                 year += 1
@@ -1064,6 +3706,47 @@ async def calculate_regression(metric: str, data: List[TrendPoint]):
         r_squared=float(model.score(X, y)),
         predictions=prediction_results
     )
+
+@app.post("/analyze/regression/{metric}")
+async def calculate_regression(metric: str, data: List[TrendPoint]):
+    """Calculate linear regression for specified metric and return model details."""
+    return fit_regression(metric, data)
+
+def future_period_labels(last_day: str, interval: str, count: int) -> List[Dict[str, str]]:
+    """month/period/date labels of the `count` intervals after the one starting on last_day"""
+    last = np.datetime64(last_day, "D")
+    if interval == "month":
+        days = (last.astype("datetime64[M]") + np.arange(1, count + 1)).astype("datetime64[D]")
+    else:
+        days = last + np.arange(1, count + 1) * (7 if interval == "week" else 1)
+    return [
+        {
+            "month": day.strftime("%b") if interval == "month" else day.strftime("%d %b"),
+            "period": day.strftime("%b %Y"),
+            "date": day.isoformat(),
+        }
+        for day in days.tolist()
+    ]
+
+@app.get("/analyze/regression/{metric}/{username}")
+async def calculate_history_regression(
+    metric: str,
+    username: str,
+    start: Optional[str] = Query(None, description="ISO date"),
+    end: Optional[str] = Query(None, description="ISO date"),
+    interval: str = Query("month", description="day, week or month"),
+    aggregate: str = Query("last", description="last, mean, min or max of the points in each interval"),
+    future: int = Query(9, ge=0, le=366, description="Intervals to predict after the last point"),
+):
+    """Linear regression over an influencer's stored history, downsampled like /trends"""
+    idx = influencer_map.get(username)
+    stored = stored_trend_points(json_data[idx].get("channel_info", ""), start, end, interval, aggregate) \
+        if idx is not None else None
+    if stored is None:
+        raise HTTPException(404, f"No stored history for influencer '{username}'")
+    labels = future_period_labels(stored[-1]["date"], interval, future) if stored else []
+    return fit_regression(metric, [TrendPoint(**point) for point in stored], labels)
+
 # Run the API using Uvicorn
 if __name__ == "__main__":
     import uvicorn
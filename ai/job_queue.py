@@ -0,0 +1,211 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+class JobQueue:
+    """
+    Persistent background job queue: jobs are rows in a SQLite table and a fixed
+    number of worker threads run them in submission order.
+
+    Handlers are registered per job type as handler(params, progress) -> result, where
+    progress(done, total) records how far the job got and result is JSON-serializable.
+    Coroutine handlers run on the event loop passed to start(), so they can share
+    state with request handlers; the worker thread waits for them, which keeps the
+    number of concurrently running jobs at `workers` either way.
+
+    Jobs that were queued or running when the process stopped run again after start(),
+    unless they have already been started max_attempts times: a job that keeps taking the
+    process down with it (out of memory, a crash in native code) is marked failed instead.
+    """
+
+    def __init__(self, path: str, workers: int = 2, history_limit: int = 1000, max_attempts: int = 3):
+        self.path = path
+        self.workers = max(1, workers)
+        self.history_limit = history_limit
+        self.max_attempts = max(1, max_attempts)
+        self.handlers: Dict[str, Callable] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.threads: List[threading.Thread] = []
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+
+        # One connection shared by all threads; the lock serializes every statement
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock:
+            if path != ":memory:":
+                self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress_done INTEGER NOT NULL DEFAULT 0,
+                    progress_total INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def register(self, job_type: str, handler: Callable):
+        self.handlers[job_type] = handler
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Re-queue jobs interrupted by a restart (or fail them after max_attempts) and start the worker threads"""
+        if self.threads:
+            return
+        self.loop = loop
+        self.stopping.clear()
+        with self.lock:
+            abandoned = self.connection.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE status = 'running' AND attempts >= ?",
+                (f"Interrupted {self.max_attempts} times without finishing; not retried", time.time(), self.max_attempts),
+            ).rowcount
+            recovered = self.connection.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+        if abandoned:
+            logger.error(f"Failed {abandoned} jobs interrupted {self.max_attempts} times")
+        if recovered:
+            logger.info(f"Re-queued {recovered} jobs interrupted by a restart")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop taking new jobs; jobs already running finish (or re-run after a restart)"""
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if job_type not in self.handlers:
+            raise KeyError(job_type)
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO jobs (id, type, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, job_type, json.dumps(params), time.time()),
+            )
+        self.wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.to_dict(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM jobs"
+        args: tuple = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self.lock:
+            rows = self.connection.execute(query, args + (limit,)).fetchall()
+        return [self.to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        found = {status: count for status, count in rows}
+        return {status: found.get(status, 0) for status in JOB_STATUSES}
+
+    @staticmethod
+    def to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it (None if the queue is empty)"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+        return self.to_dict(row)
+
+    def work(self):
+        while not self.stopping.is_set():
+            job = self.claim()
+            if job is None:
+                # Woken by submit(); the timeout also covers wake-ups another worker consumed
+                self.wakeup.wait(timeout=1.0)
+                self.wakeup.clear()
+                continue
+            self.run(job)
+
+    def run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        handler = self.handlers.get(job["type"])
+
+        def progress(done: int, total: Optional[int] = None):
+            with self.lock:
+                self.connection.execute(
+                    "UPDATE jobs SET progress_done = ?, progress_total = ? WHERE id = ?", (done, total, job_id)
+                )
+
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise KeyError(f"No handler registered for job type '{job['type']}'")
+            if asyncio.iscoroutinefunction(handler):
+                if self.loop is None:
+                    raise RuntimeError("Coroutine handlers need the event loop passed to start()")
+                result = asyncio.run_coroutine_threadsafe(handler(job["params"], progress), self.loop).result()
+            else:
+                result = handler(job["params"], progress)
+            self.finish(job_id, "succeeded", result=json.dumps(result))
+            logger.info(f"Job {job_id} ({job['type']}) succeeded in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            self.finish(job_id, "failed", error=str(e))
+            logger.error(f"Job {job_id} ({job['type']}) failed: {str(e)}")
+
+    def finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+            # Keep only the most recent finished jobs so the table doesn't grow forever
+            self.connection.execute(
+                """
+                DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND id NOT IN (
+                    SELECT id FROM jobs WHERE status IN ('succeeded', 'failed')
+                    ORDER BY finished_at DESC LIMIT ?
+                )
+                """,
+                (self.history_limit,),
+            )
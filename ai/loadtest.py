@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import types
+import random
+import asyncio
+import logging
+import argparse
+import threading
+
+import numpy as np
+
+# fetch.py insists on a key at import time; the stand-in below never uses it
+os.environ.setdefault("GEMINI_API_KEY", "loadtest-only")
+# Simulated clients are told apart by X-Forwarded-For, which is only trusted from a proxy
+os.environ.setdefault("ADMISSION_TRUSTED_PROXIES", "127.0.0.1")
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+DEFAULT_MIX = "data=30,trends=25,collab=20,batch=10,summary=10,stream=5"
+
+BUSINESSES = [
+    {"businessName": "PeakFit", "businessCategory": "Sports", "description": "Gym apparel and training gear for athletes"},
+    {"businessName": "Glow Lab", "businessCategory": "Beauty", "description": "Vegan skincare and makeup products"},
+    {"businessName": "Beatbox", "businessCategory": "Music", "description": "Wireless headphones and concert merchandise"},
+    {"businessName": "Urban Thread", "businessCategory": "Fashion", "description": "Streetwear clothing and sneakers"},
+    {"businessName": "Snack Attack", "businessCategory": "Food", "description": "Healthy snacks delivered to your door"},
+]
+
+
+class FakeGeminiSettings:
+    latency_ms = 800.0      # Median latency of a full answer
+    jitter = 0.3            # Log-normal sigma of the latency
+    error_rate = 0.0        # Fraction of calls that raise
+    stream_chunks = 8       # Chunks per streamed answer
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Drop-in for google.generativeai.GenerativeModel with configurable latency and errors"""
+
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    def latency(self):
+        return FakeGeminiSettings.latency_ms / 1000 * random.lognormvariate(0, FakeGeminiSettings.jitter)
+
+    def maybe_fail(self):
+        if random.random() < FakeGeminiSettings.error_rate:
+            from google.api_core.exceptions import ServiceUnavailable
+            raise ServiceUnavailable("Fake Gemini error")
+
+    def answer(self, prompt):
+        if "JSON object" in prompt:
+            # Batched summary prompts ask for one summary per "ID: n" entry
+            count = prompt.count("ID: ")
+            return json.dumps({str(i): f"Summary {i} from the load-test stand-in." for i in range(count)})
+        return "This creator has an engaged audience and steady growth. " * 4
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.maybe_fail()
+        text = self.answer(prompt)
+        if not stream:
+            time.sleep(self.latency())
+            return FakeResponse(text)
+        return self.stream(text)
+
+    def stream(self, text):
+        chunks = max(1, FakeGeminiSettings.stream_chunks)
+        delay = self.latency() / chunks
+        size = max(1, len(text) // chunks)
+        for start in range(0, len(text), size):
+            time.sleep(delay)
+            yield FakeResponse(text[start:start + size])
+
+
+def install_fake_gemini():
+    """Register the stand-in as google.generativeai before fetch is imported"""
+    fake = types.ModuleType("google.generativeai")
+    fake.configure = lambda **kwargs: None
+    fake.GenerativeModel = FakeGenerativeModel
+    sys.modules["google.generativeai"] = fake
+    import google
+    google.generativeai = fake
+
+
+def start_server(app, port):
+    """Run the app with uvicorn in a background thread and wait until it accepts requests"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        route, weight = part.split("=")
+        weights[route.strip()] = float(weight)
+    return weights
+
+
+def build_request(route, usernames, rng):
+    """(method, path, json body) for one request of the given route kind"""
+    business = rng.choice(BUSINESSES)
+    if route == "data":
+        return "GET", f"/data?page={rng.randint(1, 3)}&per_page=50", None
+    if route == "trends":
+        return "GET", f"/trends/{rng.choice(usernames)}", None
+    if route == "collab":
+        return "POST", "/collab-simulation", {"business": business, "influencer_username": rng.choice(usernames)}
+    if route == "batch":
+        return "POST", "/batch-collab-recommendations", {"business": business, "count": 10}
+    if route == "summary":
+        return "POST", "/generate-summary", {"influencer": rng.choice(fetch.json_data)}
+    if route == "stream":
+        return "POST", "/generate-summary/stream", {"influencer": rng.choice(fetch.json_data)}
+    raise ValueError(f"Unknown route kind '{route}'")
+
+
+async def run_load(base_url, mix, rps, duration, clients, seed, abandon_rate=0.0):
+    """Open-loop load: requests start on schedule whether or not earlier ones finished"""
+    import httpx
+
+    rng = random.Random(seed)
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    usernames = [fetch.get_username(item.get("channel_info", "")) for item in fetch.json_data]
+    results = {route: [] for route in routes}
+
+    async def fire(client, route):
+        method, path, body = build_request(route, usernames, rng)
+        # Spread requests over simulated client addresses, like traffic behind a proxy
+        headers = {"x-forwarded-for": f"10.0.{rng.randrange(clients) // 256}.{rng.randrange(clients) % 256}"}
+        started = time.perf_counter()
+        fallback = False
+        try:
+            if route == "stream":
+                # Some readers hang up after the first event, like a closed browser tab
+                async with client.stream(method, path, json=body, headers=headers) as response:
+                    status = response.status_code
+                    content = b""
+                    async for chunk in response.aiter_bytes():
+                        content += chunk
+                        if rng.random() < abandon_rate:
+                            break
+            else:
+                response = await client.request(method, path, json=body, headers=headers)
+                status = response.status_code
+                content = response.content
+            # Degraded answers (e.g. template summaries while Gemini fails) still return 200
+            fallback = status == 200 and (b'"fallback":true' in content or b'"fallback": true' in content)
+        except httpx.HTTPError:
+            status = 0
+        results[route].append((time.perf_counter() - started, status, fallback))
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        tasks = []
+        started = time.perf_counter()
+        total = int(rps * duration)
+        for i in range(total):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            route = rng.choices(routes, weights)[0]
+            tasks.append(asyncio.create_task(fire(client, route)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    report = {}
+    for route, samples in results.items():
+        if not samples:
+            continue
+        latencies = np.array([latency for latency, _, _ in samples]) * 1000
+        statuses = np.array([status for _, status, _ in samples])
+        report[route] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 1),
+            "error_rate": round(float(np.mean((statuses >= 500) | (statuses == 0))), 4),
+            "rejected_rate": round(float(np.mean((statuses == 429) | (statuses == 503))), 4),
+            "fallback_rate": round(float(np.mean([fallback for _, _, fallback in samples])), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p90_ms": round(float(np.percentile(latencies, 90)), 1),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+            "max_ms": round(float(latencies.max()), 1),
+        }
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test fetch.py locally with a fake Gemini")
+    parser.add_argument("--rps", type=float, default=50, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Route weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--clients", type=int, default=200, help="Distinct simulated client addresses")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=FakeGeminiSettings.latency_ms)
+    parser.add_argument("--gemini-jitter", type=float, default=FakeGeminiSettings.jitter)
+    parser.add_argument("--gemini-error-rate", type=float, default=FakeGeminiSettings.error_rate)
+    parser.add_argument("--gemini-stream-chunks", type=int, default=FakeGeminiSettings.stream_chunks)
+    parser.add_argument("--stream-abandon-rate", type=float, default=0.2,
+                        help="Chance per received chunk that a stream reader disconnects early")
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    FakeGeminiSettings.latency_ms = args.gemini_latency_ms
+    FakeGeminiSettings.jitter = args.gemini_jitter
+    FakeGeminiSettings.error_rate = args.gemini_error_rate
+    FakeGeminiSettings.stream_chunks = args.gemini_stream_chunks
+    random.seed(args.seed)
+
+    install_fake_gemini()
+    import fetch
+    logging.getLogger("fetch").setLevel(logging.WARNING)
+
+    server, thread = start_server(fetch.app, args.port)
+    logger.info(f"Running {args.rps} rps for {args.duration}s against 127.0.0.1:{args.port} ({args.mix})")
+    try:
+        results, elapsed = asyncio.run(run_load(
+            f"http://127.0.0.1:{args.port}", parse_mix(args.mix), args.rps, args.duration, args.clients, args.seed,
+            args.stream_abandon_rate,
+        ))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    report = summarize(results, elapsed)
+    logger.info(f"{'route':<10}{'reqs':>7}{'rps':>8}{'err':>8}{'shed':>8}{'fallbk':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for route, row in report.items():
+        logger.info(
+            f"{route:<10}{row['requests']:>7}{row['throughput_rps']:>8}{row['error_rate']:>8.2%}{row['rejected_rate']:>8.2%}"
+            f"{row['fallback_rate']:>8.2%}"
+            f"{row['p50_ms']:>9}{row['p90_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}"
+        )
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=4)
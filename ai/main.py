@@ -1,6 +1,14 @@
 import pandas as pd
+import numpy as np
+import argparse
+import hashlib
 import json
 import math
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from timeseries_store import TimeSeriesStore
 
 # Function to convert k/m to actual numbers
 def convert_value(value):
@@ -62,16 +70,8 @@ def calculate_scores(influencer):
             "engagement_quality_score": 0,
             "influenceiq_score": 0,
         }
-# Define the CSV file path and the output JSON file path
-csv_file_path = 'insta.csv'
-json_file_path = 'output_file.json'
-
-# Read the CSV file
-df = pd.read_csv(csv_file_path)
-
-# Convert CSV to JSON and add new fields
-json_data = []
-for _, row in df.iterrows():
+# Function to turn one CSV row into an output record
+def build_record(row):
     influencer = row.to_dict()
     
     # Handle missing values
@@ -82,12 +82,309 @@ for _, row in df.iterrows():
     
     # Add scores to the influencer data
     influencer.update(scores)
-    
-    # Append to JSON data
-    json_data.append(influencer)
+    return influencer
+
+# Function to serialize one record for the output format
+def serialize_record(influencer, output_format):
+    if output_format == "ndjson":
+        return json.dumps(influencer) + "\n"
+    # Same layout json.dump(..., indent=4) gives an element of the top-level array
+    return "\n".join("    " + line for line in json.dumps(influencer, indent=4).split("\n"))
+
+# Function run in worker processes: convert one chunk and return its serialized records
+def convert_chunk(chunk, output_format):
+    return [serialize_record(build_record(row), output_format) for _, row in chunk.iterrows()]
+
+# Function to find the column types pandas would infer for the whole file,
+# so every chunk is parsed the same way as a single read_csv
+def infer_column_dtypes(csv_file_path, chunksize):
+    dtypes = {}
+    for chunk in pd.read_csv(csv_file_path, chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            previous = dtypes.get(column, dtype)
+            if previous == dtype:
+                dtypes[column] = dtype
+            elif pd.api.types.is_numeric_dtype(previous) and pd.api.types.is_numeric_dtype(dtype) \
+                    and not pd.api.types.is_bool_dtype(previous) and not pd.api.types.is_bool_dtype(dtype):
+                dtypes[column] = np.result_type(previous, dtype)
+            else:
+                dtypes[column] = object
+    return dtypes
+
+# Convert the whole file in memory (original behaviour)
+def convert_in_memory(csv_file_path, json_file_path):
+    # Read the CSV file
+    df = pd.read_csv(csv_file_path)
+
+    # Convert CSV to JSON and add new fields
+    json_data = []
+    for _, row in df.iterrows():
+        # Append to JSON data
+        json_data.append(build_record(row))
+
+    # Write the updated JSON data to a file
+    with open(json_file_path, 'w') as json_file:
+        json.dump(json_data, json_file, indent=4)
+
+# Convert the file chunk by chunk in a process pool, writing chunks in input order.
+# At most workers * 2 chunks are in memory at once, whatever the input size.
+def convert_streaming(csv_file_path, json_file_path, chunksize, workers, output_format):
+    dtypes = infer_column_dtypes(csv_file_path, chunksize)
+    chunks = pd.read_csv(csv_file_path, chunksize=chunksize, dtype=dtypes)
+    max_in_flight = max(1, workers) * 2
+    written = 0
+
+    with open(json_file_path, 'w') as json_file, ProcessPoolExecutor(max_workers=workers) as executor:
+        def write(records):
+            nonlocal written
+            for record in records:
+                if output_format == "json":
+                    json_file.write("[\n" if written == 0 else ",\n")
+                json_file.write(record)
+                written += 1
+
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(convert_chunk, chunk, output_format))
+            if len(in_flight) >= max_in_flight:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
+
+        if output_format == "json":
+            json_file.write("\n]" if written else "[]")
+
+    return written
+
+# Incremental mode: a manifest next to the output remembers each row's content hash and
+# where its record sits in the output file. Unchanged rows are copied from the previous
+# output byte for byte; only new or changed rows are scored and serialized. The change
+# list written alongside lets the API apply the same update without re-reading every record.
+MANIFEST_VERSION = 1
+
+def file_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_manifest(manifest_path, json_file_path, dtypes):
+    """The previous run's manifest, or None when it can't be reused for this input"""
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # Records depend on the parsed column types, and spans only hold for the exact file they describe
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("dtypes") != dtypes:
+        return None
+    if not os.path.exists(json_file_path) or file_sha1(json_file_path) != manifest.get("sha1"):
+        return None
+    return manifest
+
+def match_previous_rows(hashes, previous_hashes):
+    """Row of the previous run with the same content hash for every row (-1 for new or changed rows)"""
+    if len(previous_hashes) == 0 or len(hashes) == 0:
+        return np.full(len(hashes), -1, dtype=np.int64)
+    unique_hashes, first_row = np.unique(previous_hashes, return_index=True)
+    position = np.minimum(np.searchsorted(unique_hashes, hashes), len(unique_hashes) - 1)
+    return np.where(unique_hashes[position] == hashes, first_row[position], -1)
+
+def reused_runs(source):
+    """[new_start, old_start, length] for each run of rows copied from consecutive previous rows"""
+    reused = np.nonzero(source >= 0)[0]
+    if len(reused) == 0:
+        return []
+    # A run breaks where either the new or the previous row numbers stop being consecutive
+    breaks = np.nonzero((np.diff(reused) != 1) | (np.diff(source[reused]) != 1))[0] + 1
+    starts = np.concatenate([[0], breaks])
+    lengths = np.diff(np.concatenate([starts, [len(reused)]]))
+    return [[int(reused[start]), int(source[reused[start]]), int(length)] for start, length in zip(starts, lengths)]
+
+def key_changes(previous_keys, previous_hashes, keys, hashes):
+    """
+    (added, modified, removed) channel_info keys between two runs. Rows are compared as
+    (key, content hash) pairs, counted per key, so duplicated keys are handled too: a key
+    is listed once for every row of it that was added, modified or removed. A row that
+    changed content is a modification when its key lost an old row at the same time.
+    """
+    previous_rows = Counter(zip(previous_keys, previous_hashes))
+    current_rows = Counter(zip(keys, hashes))
+    unchanged = previous_rows & current_rows
+    new_rows, old_rows = Counter(), Counter()
+    for (key, _), count in (current_rows - unchanged).items():
+        new_rows[key] += count
+    for (key, _), count in (previous_rows - unchanged).items():
+        old_rows[key] += count
+
+    added, modified = [], []
+    for key in dict.fromkeys(keys):  # Order of first appearance in this run
+        replaced = min(new_rows[key], old_rows[key])
+        modified += [key] * replaced
+        added += [key] * (new_rows[key] - replaced)
+    removed = sorted(
+        key for key, count in old_rows.items() for _ in range(count - min(new_rows[key], count))
+    )
+    return added, modified, removed
+
+def convert_incremental(csv_file_path, json_file_path, manifest_path, changes_path):
+    df = pd.read_csv(csv_file_path)
+    dtypes = {column: str(dtype) for column, dtype in df.dtypes.items()}
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    keys = df["channel_info"].astype(str).tolist() if "channel_info" in df else [str(i) for i in range(len(df))]
+
+    manifest = load_manifest(manifest_path, json_file_path, dtypes)
+    previous_hashes = np.array(manifest["hashes"] if manifest else [], dtype=np.uint64)
+    source = match_previous_rows(hashes, previous_hashes)
+    changed = np.nonzero(source < 0)[0]
+
+    previous_output = b""
+    if manifest:
+        with open(json_file_path, 'rb') as json_file:
+            previous_output = json_file.read()
+    previous_starts = np.array(manifest["starts"] if manifest else [], dtype=np.int64)
+    previous_ends = np.array(manifest["ends"] if manifest else [], dtype=np.int64)
+
+    # Score only new or changed rows
+    fresh = {
+        int(i): serialize_record(build_record(row), "json").encode("utf-8")
+        for i, (_, row) in zip(changed, df.iloc[changed].iterrows())
+    }
+
+    # Record lengths give every record's span in the new file: "[\n" first, then ",\n" between records
+    lengths = np.zeros(len(df), dtype=np.int64)
+    reused = source >= 0
+    lengths[reused] = previous_ends[source[reused]] - previous_starts[source[reused]]
+    for i, record in fresh.items():
+        lengths[i] = len(record)
+    starts = 2 + np.cumsum(lengths + 2) - (lengths + 2)
+    ends = starts + lengths
+
+    # Runs of copied records keep their ",\n" separators, so a run is written like a single record
+    runs = reused_runs(source)
+    pieces = [(run[0], previous_output[previous_starts[run[1]]:previous_ends[run[1] + run[2] - 1]]) for run in runs]
+    pieces += list(fresh.items())
+    pieces.sort(key=lambda piece: piece[0])
+
+    temporary_path = json_file_path + ".tmp"
+    digest = hashlib.sha1()
+    with open(temporary_path, 'wb') as json_file:
+        def write(data):
+            digest.update(data)
+            json_file.write(data)
+
+        if not pieces:
+            write(b"[]")
+        for n, (_, piece) in enumerate(pieces):
+            write(b"[\n" if n == 0 else b",\n")
+            write(piece)
+        if pieces:
+            write(b"\n]")
+    os.replace(temporary_path, json_file_path)
+    sha1 = digest.hexdigest()
+
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "sha1": sha1,
+            "dtypes": dtypes,
+            "keys": keys,
+            "hashes": hashes.tolist(),
+            "starts": starts.tolist(),
+            "ends": ends.tolist(),
+        }, manifest_file)
+
+    added, modified, removed = key_changes(
+        manifest["keys"] if manifest else [], manifest["hashes"] if manifest else [], keys, hashes.tolist()
+    )
+    with open(changes_path, 'w') as changes_file:
+        json.dump({
+            "previous_sha1": manifest["sha1"] if manifest else None,
+            "sha1": sha1,
+            "rows": len(df),
+            "reused": runs,
+            "changed": [[int(i), int(starts[i]), int(ends[i])] for i in changed],
+            "added": added,
+            "modified": modified,
+            "removed": removed,
+        }, changes_file)
+
+    return len(df), len(changed)
+
+# Time-series snapshots: every ingest appends each creator's current followers, engagement,
+# likes and engagement quality score to the store, which is where /trends reads real history from.
+def count_column(values):
+    """convert_value for a whole column; missing or unparseable values become 0 like handle_missing_values"""
+    text = values.astype(str)
+    multiplier = np.select([text.str.contains("k"), text.str.contains("m"), text.str.contains("b")], [1e3, 1e6, 1e9], 1.0)
+    return (pd.to_numeric(text.str.replace("[kmb]", "", regex=True), errors="coerce") * multiplier).fillna(0.0)
+
+def snapshot_metrics(df):
+    df = df[df["channel_info"].notna()]
+    followers = count_column(df["followers"])
+    likes = count_column(df["avg_likes"])
+    engagement = pd.to_numeric(df["avg_engagement"].astype(str).str.replace("%", ""), errors="coerce").fillna(0.0)
+    quality = (likes / followers.where(followers != 0) * 100).fillna(0.0)
+    usernames = df["channel_info"].astype(str).tolist()
+    return usernames, {"followers": followers, "engagement": engagement, "likes": likes, "quality": quality}
+
+def snapshot_timeseries(csv_file_path, store_path, timestamp, chunksize):
+    store = TimeSeriesStore(store_path)
+    chunks = pd.read_csv(csv_file_path, chunksize=chunksize) if chunksize > 0 else [pd.read_csv(csv_file_path)]
+    points = 0
+    for chunk in chunks:
+        usernames, metrics = snapshot_metrics(chunk)
+        points += store.append(timestamp, usernames, metrics)
+    return points
+
+def parse_snapshot_time(value):
+    if not value:
+        return int(datetime.now(timezone.utc).timestamp())
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert the influencer CSV export to scored JSON")
+    # Define the CSV file path and the output JSON file path
+    parser.add_argument("--input", default='insta.csv', help="CSV file to convert")
+    parser.add_argument("--output", default='output_file.json', help="Where to write the records")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="Rows per chunk; enables streaming mode for inputs too big for memory")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes in streaming mode")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json",
+                        help="JSON array (default) or one record per line; ndjson needs --chunksize")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rescore rows that changed since the previous incremental run")
+    parser.add_argument("--manifest", help="Row hash manifest for --incremental (default: <output>.manifest.json)")
+    parser.add_argument("--changes", help="Change list written by --incremental (default: <output>.changes.json)")
+    parser.add_argument("--timeseries", default="timeseries",
+                        help="Time-series store to append this ingest's metrics to (empty string to skip)")
+    parser.add_argument("--snapshot-time", help="ISO timestamp of the snapshot, UTC unless given (default: now)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    csv_file_path = args.input
+    json_file_path = args.output
 
-# Write the updated JSON data to a file
-with open(json_file_path, 'w') as json_file:
-    json.dump(json_data, json_file, indent=4)
+    if args.incremental:
+        if args.chunksize > 0 or args.format != "json":
+            raise SystemExit("--incremental writes a JSON array in one pass; drop --chunksize/--format")
+        rows, changed = convert_incremental(
+            csv_file_path, json_file_path,
+            args.manifest or json_file_path + ".manifest.json",
+            args.changes or json_file_path + ".changes.json",
+        )
+        print(f"CSV file '{csv_file_path}' has been converted incrementally ({changed} of {rows} rows rescored) and saved as '{json_file_path}'.")
+    elif args.chunksize > 0:
+        rows = convert_streaming(csv_file_path, json_file_path, args.chunksize, args.workers, args.format)
+        print(f"CSV file '{csv_file_path}' has been converted in chunks ({rows} rows) and saved as '{json_file_path}'.")
+    elif args.format == "ndjson":
+        raise SystemExit("--format ndjson requires --chunksize")
+    else:
+        convert_in_memory(csv_file_path, json_file_path)
+        print(f"CSV file '{csv_file_path}' has been converted to JSON and saved as '{json_file_path}'.")
 
-print(f"CSV file '{csv_file_path}' has been converted to JSON and saved as '{json_file_path}'.")
\ No newline at end of file
+    if args.timeseries:
+        points = snapshot_timeseries(csv_file_path, args.timeseries, parse_snapshot_time(args.snapshot_time), args.chunksize)
+        print(f"Appended {points} points to the time-series store '{args.timeseries}'.")
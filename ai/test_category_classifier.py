@@ -0,0 +1,14 @@
+from category_classifier import training_key
+
+RECORDS = [{"channel_info": f"creator{i}"} for i in range(30)]
+LABELS = ["music" if i % 2 else "sports" for i in range(30)]
+
+
+def test_training_key_changes_when_a_label_is_corrected():
+    corrected = list(LABELS)
+    corrected[3] = "comedy"
+    assert training_key(RECORDS, corrected) != training_key(RECORDS, LABELS)
+
+
+def test_training_key_ignores_record_order():
+    assert training_key(RECORDS[::-1], LABELS[::-1]) == training_key(RECORDS, LABELS)
@@ -0,0 +1,53 @@
+import os
+import time
+import asyncio
+
+os.environ.setdefault("GEMINI_API_KEY", "test-only")
+
+from loadtest import FakeGeminiSettings, install_fake_gemini
+
+install_fake_gemini()
+import fetch
+
+
+def half_open_breaker(monkeypatch):
+    """A breaker that has opened and whose reset period has passed"""
+    breaker = fetch.CircuitBreaker(failure_threshold=1, reset_seconds=0.05, slow_call_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    monkeypatch.setattr(fetch, "gemini_breaker", breaker)
+    monkeypatch.setattr(FakeGeminiSettings, "latency_ms", 500.0)
+    monkeypatch.setattr(FakeGeminiSettings, "error_rate", 0.0)
+    return breaker
+
+
+def test_cancelled_trial_call_releases_half_open_breaker(monkeypatch):
+    breaker = half_open_breaker(monkeypatch)
+
+    async def cancel_trial():
+        task = asyncio.create_task(fetch.call_gemini("cancelled trial prompt"))
+        await asyncio.sleep(0.05)
+        assert breaker.state == "half_open" and breaker.trial_in_flight
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_trial())
+    assert breaker.allow_request()
+
+
+def test_closed_stream_releases_half_open_breaker(monkeypatch):
+    breaker = half_open_breaker(monkeypatch)
+
+    async def close_stream_early():
+        events = fetch.stream_summary_events(f"closed stream prompt {time.time()}", {"channel_info": "someone"})
+        first = await events.__anext__()
+        assert first.startswith("data:")
+        assert breaker.state == "half_open" and breaker.trial_in_flight
+        await events.aclose()
+
+    asyncio.run(close_stream_early())
+    assert breaker.allow_request()
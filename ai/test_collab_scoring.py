@@ -0,0 +1,124 @@
+import os
+import random
+import asyncio
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-only")
+
+from loadtest import install_fake_gemini
+
+install_fake_gemini()
+import fetch
+from fastapi.testclient import TestClient
+
+client = TestClient(fetch.app)
+
+BUSINESS = {"businessName": "Glow", "businessCategory": "beauty", "description": "skincare makeup cosmetics brand"}
+
+
+def test_raw_rows_with_unparseable_metrics_are_rejected():
+    for row in ({"channel_info": "x", "followers": "abc"}, {"channel_info": "x", "avg_engagement": "n/a%"}):
+        response = client.post("/batch-collab-simulation", json={"business": BUSINESS, "influencers": [row]})
+        assert response.status_code == 422
+
+
+def test_raw_row_scores_like_the_catalog_row_it_copies():
+    username = fetch.catalog_features["usernames"][5]
+    row = dict(fetch.json_data[5])
+    response = client.post("/batch-collab-simulation", json={
+        "business": BUSINESS, "influencer_usernames": [username], "influencers": [row],
+    })
+    assert response.status_code == 200
+    catalog_result, raw_result = response.json()["results"]
+    assert raw_result == catalog_result
+
+
+def test_uncertainty_rejects_cost_specs_that_can_reach_zero():
+    username = fetch.catalog_features["usernames"][3]
+    for uncertainty in (
+        {"cost": {"distribution": "normal", "spread": 0.5}},
+        {"cost": {"distribution": "uniform", "spread": 1.0}},
+        {"cost": {"distribution": "fixed", "center": 0}},
+        {"aov": {"distribution": "bogus"}},
+    ):
+        response = client.post("/collab-simulation", json={
+            "business": BUSINESS, "influencer_username": username, "uncertainty": uncertainty,
+        })
+        assert response.status_code == 422
+
+    response = client.post("/collab-simulation", json={
+        "business": BUSINESS, "influencer_username": username,
+        "uncertainty": {"seed": 1, "cost": {"distribution": "triangular", "spread": 0.9}},
+    })
+    distribution = response.json()["roi_distribution"]
+    assert distribution["p5"] <= distribution["p50"] <= distribution["p95"] < 1e5
+
+
+# The calculate_* functions are the per-influencer reference for the scoring model; requests
+# are served by the vectorized_* versions over catalog_features. Both must agree on the catalog.
+REFERENCE_BUSINESSES = [
+    fetch.BusinessDetails(businessName="Glow", businessCategory="beauty", description="skincare makeup cosmetics brand"),
+    fetch.BusinessDetails(businessName="Kickoff", businessCategory="soccer", description="football boots and match kits"),
+    fetch.BusinessDetails(businessName="Stage", businessCategory="Music", description="concert tickets"),
+    fetch.BusinessDetails(businessName="Trail", businessCategory="travel adventure", description=""),
+    fetch.BusinessDetails(businessName="Pixel", businessCategory="tech", description="gadgets and phone accessories"),
+    fetch.BusinessDetails(businessName="", businessCategory="", description=""),
+]
+
+
+def reference_reach(influencer):
+    try:
+        return fetch.calculate_reach(influencer)
+    except ValueError:
+        return 0  # int() of a NaN reach ('NaN%' engagement); the array version reports 0
+
+
+def test_vectorized_scoring_matches_the_reference_functions():
+    features, recomputed = fetch.materialize_catalog_features(fetch.json_data, fetch.catalog_row_hashes)
+    assert recomputed == len(fetch.json_data)
+
+    for i, influencer in enumerate(fetch.json_data):
+        assert features["cost_estimate"][i] == pytest.approx(fetch.calculate_cost_estimate(influencer), rel=1e-12)
+        assert features["longevity_potential"][i] == pytest.approx(fetch.calculate_longevity(influencer), rel=1e-12)
+        assert features["estimated_reach"][i] == reference_reach(influencer)
+
+    for business in REFERENCE_BUSINESSES:
+        match_percentage = fetch.vectorized_match_percentage(business, features)
+        roi_estimate = fetch.vectorized_roi_estimate(match_percentage, features)
+        relevancy = fetch.vectorized_relevancy(business, features)
+        for i, influencer in enumerate(fetch.json_data):
+            expected_match = fetch.calculate_match_percentage(business, influencer)
+            assert match_percentage[i] == pytest.approx(expected_match, rel=1e-9)
+            assert roi_estimate[i] == pytest.approx(fetch.calculate_roi_estimate(expected_match, influencer, business), rel=1e-9, abs=1e-9)
+            assert relevancy[i] == pytest.approx(fetch.calculate_relevancy(business, influencer), rel=1e-12)
+
+
+def random_business(rng: random.Random, categories, words) -> dict:
+    category = rng.choice(categories + ["pet supplies", "Fashion Apparel", "sports", "gaming"])
+    description = " ".join(rng.sample(words, rng.randint(0, 6)))
+    return {"businessName": f"Shop{rng.randint(0, 999)}", "businessCategory": category, "description": description}
+
+
+def recommend(business: dict, count: int) -> dict:
+    # Called directly rather than over HTTP, which would hit the per-client rate limit
+    request = fetch.BatchCollabRequest(business=fetch.BusinessDetails(**business), count=count)
+    return asyncio.run(fetch.batch_recommendations(request))
+
+
+def test_candidate_index_returns_the_full_scan_ranking(monkeypatch):
+    rng = random.Random(0)
+    categories = sorted(set(fetch.enhanced_categories_cache.values()))
+    words = sorted({word for item in fetch.json_data for word in str(item.get("country", "")).lower().split()})
+    words += categories + ["makeup", "football", "recipes", "gadgets", "workout", "travel", "zzzunknown"]
+    requests = [(random_business(rng, categories, words), count) for _ in range(75) for count in (1, 5, 10, 50)]
+
+    pruned = [recommend(b, n) for b, n in requests]
+    served_from_candidates = sum(
+        fetch.rank_from_category_candidates(fetch.BusinessDetails(**b), n) is not None for b, n in requests
+    )
+    assert served_from_candidates > len(requests) // 2
+
+    monkeypatch.setattr(fetch, "rank_from_category_candidates", lambda business, count: None)
+    full_scan = [recommend(b, n) for b, n in requests]
+    assert pruned == full_scan
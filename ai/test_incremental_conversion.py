@@ -0,0 +1,80 @@
+import json
+
+import pandas as pd
+import pytest
+
+from main import convert_in_memory, convert_incremental
+
+BASE = pd.read_csv("insta.csv").head(8)
+
+
+def write_csv(path, frame):
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def convert_both(tmp_path, previous, current):
+    """Incremental output after converting previous then current, the full conversion of current and the change list"""
+    incremental = str(tmp_path / "incremental.json")
+    manifest, changes = incremental + ".manifest.json", incremental + ".changes.json"
+    convert_incremental(write_csv(tmp_path / "previous.csv", previous), incremental, manifest, changes)
+    convert_incremental(write_csv(tmp_path / "current.csv", current), incremental, manifest, changes)
+
+    full = str(tmp_path / "full.json")
+    convert_in_memory(str(tmp_path / "current.csv"), full)
+    with open(incremental, "rb") as f, open(full, "rb") as g, open(changes) as h:
+        return f.read(), g.read(), json.load(h)
+
+
+def test_unchanged_input_reuses_every_row(tmp_path):
+    incremental, full, changes = convert_both(tmp_path, BASE, BASE)
+    assert incremental == full
+    assert changes["reused"] == [[0, 0, len(BASE)]]
+    assert changes["changed"] == []
+    assert (changes["added"], changes["modified"], changes["removed"]) == ([], [], [])
+
+
+def test_edited_row_is_the_only_one_rescored(tmp_path):
+    current = BASE.copy()
+    current.loc[3, "followers"] = "1.0k"
+    incremental, full, changes = convert_both(tmp_path, BASE, current)
+    assert incremental == full
+    assert [row for row, _, _ in changes["changed"]] == [3]
+    assert changes["modified"] == [current.loc[3, "channel_info"]]
+    assert (changes["added"], changes["removed"]) == ([], [])
+    # The change list's spans locate the new record in the output
+    _, start, end = changes["changed"][0]
+    assert json.loads(incremental[start:end])["followers"] == "1.0k"
+
+
+def test_inserted_deleted_and_reordered_rows(tmp_path):
+    inserted = BASE.iloc[[0]].assign(channel_info="newcomer", rank=99)
+    # Drop row 2, swap rows 5 and 6, insert a row after row 3
+    current = pd.concat([BASE.iloc[[0, 1, 3]], inserted, BASE.iloc[[4, 6, 5, 7]]], ignore_index=True)
+    incremental, full, changes = convert_both(tmp_path, BASE, current)
+    assert incremental == full
+    assert json.loads(incremental) == json.loads(full)
+    assert [row for row, _, _ in changes["changed"]] == [3]
+    assert changes["added"] == ["newcomer"]
+    assert changes["modified"] == []
+    assert changes["removed"] == [BASE.loc[2, "channel_info"]]
+
+
+@pytest.mark.parametrize("current_rows, expected", [
+    # The second copy of a duplicated row is dropped
+    ([0, 1, 2], ([], [], ["dup"])),
+    # One copy edited, the other kept
+    ([0, 1, "edited", 2], ([], ["dup"], [])),
+    # A third copy appears
+    ([0, 1, 1, 1, 2], (["dup"], [], [])),
+])
+def test_duplicate_channel_info_keys(tmp_path, current_rows, expected):
+    rows = BASE.head(3).copy()
+    rows.loc[1, "channel_info"] = "dup"
+    previous = rows.iloc[[0, 1, 1, 2]]
+    edited = rows.iloc[[1]].assign(posts="1.0k")
+    current = pd.concat([edited if row == "edited" else rows.iloc[[row]] for row in current_rows], ignore_index=True)
+
+    incremental, full, changes = convert_both(tmp_path, previous, current)
+    assert incremental == full
+    assert (changes["added"], changes["modified"], changes["removed"]) == expected
@@ -0,0 +1,30 @@
+import time
+
+from job_queue import JobQueue
+
+
+def interrupted_job(queue: JobQueue, attempts: int) -> str:
+    """A job left 'running' by a process that died during its attempts-th run"""
+    job_id = queue.submit("echo", {"attempts": attempts})["id"]
+    queue.connection.execute("UPDATE jobs SET status = 'running', attempts = ? WHERE id = ?", (attempts, job_id))
+    return job_id
+
+
+def test_interrupted_jobs_are_retried_until_max_attempts():
+    queue = JobQueue(":memory:", workers=1, max_attempts=2)
+    queue.register("echo", lambda params, progress: params)
+    retried = interrupted_job(queue, 1)
+    exhausted = interrupted_job(queue, 2)
+
+    queue.start()
+    try:
+        for _ in range(50):
+            if queue.get(retried)["status"] == "succeeded":
+                break
+            time.sleep(0.02)
+    finally:
+        queue.stop(timeout=1)
+
+    assert queue.get(retried)["status"] == "succeeded"
+    assert queue.get(exhausted)["status"] == "failed"
+    assert "Interrupted 2 times" in queue.get(exhausted)["error"]
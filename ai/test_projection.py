@@ -0,0 +1,38 @@
+import os
+import json
+
+os.environ.setdefault("GEMINI_API_KEY", "test-only")
+
+from loadtest import install_fake_gemini
+
+install_fake_gemini()
+import fetch
+from fastapi.testclient import TestClient
+
+client = TestClient(fetch.app)
+
+
+def test_fields_are_deduplicated_and_put_in_catalog_order():
+    expected = client.get("/data", params={"fields": "rank,channel_info", "per_page": 5}).json()
+    for fields in ("channel_info,rank", "rank,rank,channel_info", " channel_info , rank ,"):
+        assert client.get("/data", params={"fields": fields, "per_page": 5}).json() == expected
+    assert list(expected[0]) == ["rank", "channel_info"]
+
+
+def test_pages_are_sliced_from_cached_columns():
+    fetch.projection_column.cache_clear()
+    records = fetch.json_data[10:17]
+    fields = ["channel_info", "followers", "credibility_score"]
+    response = client.get("/data", params={"fields": ",".join(fields), "page": 3, "per_page": 5, "compact": True})
+    columns = response.json()["columns"]
+    assert response.json()["count"] == 5
+    assert columns["channel_info"] == [item["channel_info"] for item in records[:5]]
+    assert columns["credibility_score"] == [round(item["credibility_score"], 3) for item in records[:5]]
+
+    response = client.get("/data", params={"fields": ",".join(fields), "page": 2, "per_page": 10})
+    expected = [{field: item[field] for field in fields} for item in fetch.json_data[10:20]]
+    assert response.content == json.dumps(expected, separators=(",", ":")).encode()
+
+    # One entry per (field, compact) however many pages were requested
+    client.get("/data", params={"fields": ",".join(fields), "page": 4, "per_page": 3})
+    assert fetch.projection_column.cache_info().currsize <= 2 * len(fields)
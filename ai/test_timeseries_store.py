@@ -0,0 +1,37 @@
+import numpy as np
+
+from timeseries_store import METRICS, TimeSeriesStore, downsample
+
+DAY = 86400
+OCTOBER = int(np.datetime64("2026-10-01", "s").astype(np.int64))
+NOVEMBER = int(np.datetime64("2026-11-01", "s").astype(np.int64))
+
+
+def snapshot(store, day, usernames, value):
+    store.append(OCTOBER + (day - 1) * DAY, usernames, {metric: np.full(len(usernames), value) for metric in METRICS})
+
+
+def test_latest_per_bucket_ignores_append_order(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "store"))
+    snapshot(store, 1, ["a", "b"], 1.0)
+    snapshot(store, 18, ["a", "b"], 18.0)
+    # Backfilled after the 18th
+    snapshot(store, 5, ["a", "b"], 5.0)
+
+    latest = store.latest_per_bucket(["a", "b", "unknown"], [OCTOBER, NOVEMBER], ("followers",))["followers"]
+    assert latest[:, 0].tolist()[:2] == [18.0, 18.0]
+    assert np.isnan(latest[2, 0])
+
+    # Same answer as a range query downsampled to months
+    monthly = downsample(store.query("a", OCTOBER, NOVEMBER - 1), "month", "last")
+    assert monthly["followers"].tolist() == [18.0]
+
+
+def test_latest_per_bucket_stops_at_bucket_end(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "store"))
+    # One segment with per-row timestamps on both sides of the bucket end
+    timestamps = [OCTOBER + 3 * DAY, OCTOBER + 20 * DAY, NOVEMBER + 2 * DAY]
+    store.append(timestamps, ["a", "a", "a"], {metric: np.array([3.0, 20.0, 33.0]) for metric in METRICS})
+
+    latest = store.latest_per_bucket(["a"], [OCTOBER, NOVEMBER, NOVEMBER + 30 * DAY], ("followers",))["followers"]
+    assert latest.tolist() == [[20.0, 33.0]]
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class IncrementalTextIndex:
+    """
+    TF-IDF style text index that can add, update and remove documents without a refit.
+
+    Terms are hashed into a fixed feature space (no global vocabulary), and document
+    frequencies are maintained incrementally, so adding, replacing or removing documents
+    costs time proportional to those documents. Raw sublinear term frequencies are
+    stored and the current IDF weights are applied when vectors are requested, so every
+    row always reflects the latest corpus statistics. Because IDF depends on the corpus
+    size, any change moves every document's weights: matrix() is one vectorized pass
+    over all stored non-zeros, i.e. O(corpus), not O(change).
+
+    transform() and matrix() return L2-normalized rows, like TfidfVectorizer with
+    sublinear_tf=True and smooth_idf=True.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.hasher = HashingVectorizer(
+            stop_words="english",
+            ngram_range=(1, 2),      # Same n-grams as the fit-based TfidfVectorizer
+            n_features=n_features,
+            alternate_sign=False,    # Keep counts non-negative so they behave like term frequencies
+            norm=None,
+        )
+        self.n_features = n_features
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.row_of: Dict[str, int] = {}
+        self.blocks: List[sp.csr_matrix] = []
+        self.tf_matrix = sp.csr_matrix((0, n_features), dtype=np.float64)
+        self.idf_cache = None
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def term_frequencies(self, texts: Iterable[str]) -> sp.csr_matrix:
+        """Hashed, sublinear-scaled term frequencies (1 + log(tf)) for texts"""
+        tf = self.hasher.transform(texts).tocsr().astype(np.float64)
+        tf.data = 1 + np.log(tf.data)
+        return tf
+
+    def idf(self) -> np.ndarray:
+        """Smoothed IDF for the current corpus: log((1 + n) / (1 + df)) + 1"""
+        if self.idf_cache is None:
+            n_documents = len(self.row_of)
+            self.idf_cache = np.log((1 + n_documents) / (1 + self.document_frequency)) + 1
+        return self.idf_cache
+
+    def upsert_many(self, keys: List[str], texts: List[str]):
+        """Add new documents or replace existing ones; cost scales with the given texts only"""
+        if not keys:
+            return
+
+        # Retire the old rows of documents being replaced (their rows become unused)
+        self.remove_many(keys)
+
+        tf = self.term_frequencies(texts)
+        start = self.tf_matrix.shape[0] + sum(block.shape[0] for block in self.blocks)
+        self.blocks.append(tf)
+        for offset, key in enumerate(keys):
+            self.row_of[key] = start + offset
+
+        # Every term present in a document adds one to its document frequency
+        np.add.at(self.document_frequency, tf.indices, 1)
+        self.idf_cache = None
+
+    def remove(self, key: str):
+        self.remove_many([key])
+
+    def remove_many(self, keys: Iterable[str]):
+        """Drop documents (unknown keys are ignored); their rows stay until the next compact()"""
+        rows = [self.row_of.pop(key) for key in keys if key in self.row_of]
+        if not rows:
+            return
+        self.flush_blocks()
+        old = self.tf_matrix[np.array(rows, dtype=np.int64)]
+        np.subtract.at(self.document_frequency, old.indices, 1)
+        self.idf_cache = None
+
+    def flush_blocks(self):
+        """Append pending rows to the stored matrix"""
+        if self.blocks:
+            self.tf_matrix = sp.vstack([self.tf_matrix, *self.blocks], format="csr")
+            self.blocks = []
+
+    def transform(self, texts: List[str]) -> sp.csr_matrix:
+        """Vectorize query texts (e.g. business descriptions) with the current IDF"""
+        return self.weight(self.term_frequencies(texts))
+
+    def matrix(self, keys: List[str]) -> sp.csr_matrix:
+        """
+        Normalized TF-IDF rows for keys, in that order (unknown keys get empty rows).
+        Re-weights every selected row, so it costs O(len(keys)) however few documents changed.
+        """
+        self.flush_blocks()
+        if self.tf_matrix.shape[0] > 2 * max(1, len(self.row_of)):
+            self.compact()
+        rows = np.array([self.row_of.get(key, -1) for key in keys], dtype=np.int64)
+        known = rows >= 0
+
+        selected = self.tf_matrix[rows[known]] if known.any() else sp.csr_matrix((0, self.n_features))
+        if not known.all():
+            # Scatter known rows into place, leaving zero rows for unknown keys
+            placement = sp.csr_matrix(
+                (np.ones(known.sum()), (np.nonzero(known)[0], np.arange(known.sum()))),
+                shape=(len(keys), known.sum()),
+            )
+            selected = placement @ selected
+
+        return self.weight(selected)
+
+    def weight(self, tf: sp.csr_matrix) -> sp.csr_matrix:
+        """Apply the current IDF to term frequencies and L2-normalize, touching only non-zeros"""
+        weighted = tf.copy()
+        weighted.data = weighted.data * self.idf()[weighted.indices]
+        return normalize(weighted, norm="l2", copy=False)
+
+    def copy(self) -> "IncrementalTextIndex":
+        """
+        Independent index with the same documents. Stored matrices are replaced rather than
+        modified in place, so they are shared; only the frequencies and row map are copied.
+        """
+        index = IncrementalTextIndex.__new__(IncrementalTextIndex)
+        index.hasher = self.hasher
+        index.n_features = self.n_features
+        index.document_frequency = self.document_frequency.copy()
+        index.row_of = dict(self.row_of)
+        index.blocks = list(self.blocks)
+        index.tf_matrix = self.tf_matrix
+        index.idf_cache = self.idf_cache
+        return index
+
+    def compact(self):
+        """Drop rows of removed or replaced documents"""
+        self.flush_blocks()
+        keys = list(self.row_of)
+        rows = np.array([self.row_of[key] for key in keys], dtype=np.int64)
+        self.tf_matrix = self.tf_matrix[rows]
+        self.row_of = {key: i for i, key in enumerate(keys)}
@@ -0,0 +1,286 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Column name -> on-disk dtype. Every column is one flat little-endian binary file.
+COLUMNS = {
+    "influencer_id": np.dtype("<i4"),
+    "timestamp": np.dtype("<i8"),      # Seconds since the epoch, UTC
+    "followers": np.dtype("<f4"),
+    "engagement": np.dtype("<f4"),     # Percent
+    "likes": np.dtype("<f4"),
+    "quality": np.dtype("<f4"),
+}
+METRICS = ("followers", "engagement", "likes", "quality")
+
+# One record per append: the segment's row range and time range
+SEGMENT_DTYPE = np.dtype([("start", "<i8"), ("end", "<i8"), ("min_timestamp", "<i8"), ("max_timestamp", "<i8")])
+
+INTERVALS = ("day", "week", "month")
+AGGREGATES = ("last", "mean", "min", "max")
+
+
+class TimeSeriesStore:
+    """
+    Append-only columnar store of (influencer id, timestamp, followers, engagement, likes,
+    quality) points.
+
+    Columns are flat binary files read through np.memmap, so queries only touch the pages
+    they need and the data never has to fit in memory. Every append() writes one segment
+    whose rows are sorted by influencer id (then time); segments.bin records each
+    segment's row range and time range. A query for one influencer binary-searches the
+    id column of each segment overlapping the requested time range.
+
+    Influencer ids are line numbers in influencers.txt. Single writer: data is written
+    before the segment record that makes it visible, so readers (and a restarted writer)
+    never see a partial append. Readers pick up new segments with refresh(); a lock keeps
+    a refresh from swapping the memory maps out from under a running query.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.names_offset = 0
+        self.segments = np.zeros(0, dtype=SEGMENT_DTYPE)
+        self.segments_size = -1
+        self.maps: Dict[str, np.memmap] = {}
+        self.lock = threading.RLock()
+        self.refresh()
+
+        if not readonly:
+            # Drop rows of an append that never got its segment record
+            for column, dtype in COLUMNS.items():
+                with open(self.column_path(column), "ab") as column_file:
+                    column_file.truncate(self.rows * dtype.itemsize)
+
+    def column_path(self, column: str) -> str:
+        return os.path.join(self.path, f"{column}.bin")
+
+    @property
+    def rows(self) -> int:
+        return int(self.segments["end"][-1]) if len(self.segments) else 0
+
+    def refresh(self):
+        """Pick up segments and influencers appended since the last call (cheap when nothing changed)"""
+        with self.lock:
+            segments_path = os.path.join(self.path, "segments.bin")
+            size = os.path.getsize(segments_path) if os.path.exists(segments_path) else 0
+            if size == self.segments_size:
+                return
+            complete = size - size % SEGMENT_DTYPE.itemsize
+            self.segments = np.fromfile(segments_path, dtype=SEGMENT_DTYPE, count=complete // SEGMENT_DTYPE.itemsize) \
+                if complete else np.zeros(0, dtype=SEGMENT_DTYPE)
+            self.segments_size = size
+            self.maps = {}
+
+            names_path = os.path.join(self.path, "influencers.txt")
+            if os.path.exists(names_path):
+                with open(names_path, "rb") as names_file:
+                    names_file.seek(self.names_offset)
+                    tail = names_file.read()
+                # Only whole lines; a name being written right now is read next time
+                complete_tail = tail[:tail.rfind(b"\n") + 1]
+                for name in complete_tail.decode("utf-8").splitlines():
+                    self.ids[name] = len(self.names)
+                    self.names.append(name)
+                self.names_offset += len(complete_tail)
+
+    def column(self, name: str) -> np.ndarray:
+        """Memory-mapped view of one column over all committed rows"""
+        if self.rows == 0:
+            return np.zeros(0, dtype=COLUMNS[name])
+        if name not in self.maps:
+            self.maps[name] = np.memmap(self.column_path(name), dtype=COLUMNS[name], mode="r", shape=(self.rows,))
+        return self.maps[name]
+
+    def add_influencers(self, usernames: Iterable[str]) -> np.ndarray:
+        """Ids for usernames, registering the ones seen for the first time"""
+        new = []
+        for username in usernames:
+            if username not in self.ids:
+                self.ids[username] = len(self.names)
+                self.names.append(username)
+                new.append(username)
+        if new:
+            with open(os.path.join(self.path, "influencers.txt"), "ab") as names_file:
+                data = "".join(f"{name}\n" for name in new).encode("utf-8")
+                names_file.write(data)
+                names_file.flush()
+                os.fsync(names_file.fileno())
+            self.names_offset += len(data)
+        return np.array([self.ids[username] for username in usernames], dtype=np.int32)
+
+    def append(self, timestamps, usernames: List[str], metrics: Dict[str, Iterable[float]]) -> int:
+        """Append one segment of points; timestamps is one value (a snapshot) or one per row"""
+        if self.readonly:
+            raise PermissionError("Store was opened read-only")
+        if not usernames:
+            return 0
+        influencer_ids = self.add_influencers(usernames)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.int64), influencer_ids.shape)
+        order = np.lexsort((timestamps, influencer_ids))
+        values = {
+            "influencer_id": influencer_ids[order],
+            "timestamp": timestamps[order],
+            **{metric: np.asarray(metrics[metric], dtype=np.float64)[order] for metric in METRICS},
+        }
+
+        start = self.rows
+        for column, dtype in COLUMNS.items():
+            with open(self.column_path(column), "ab") as column_file:
+                column_file.write(values[column].astype(dtype).tobytes())
+                column_file.flush()
+                os.fsync(column_file.fileno())
+
+        # The segment record commits the rows
+        segment = np.array(
+            [(start, start + len(order), timestamps.min(), timestamps.max())], dtype=SEGMENT_DTYPE
+        )
+        with open(os.path.join(self.path, "segments.bin"), "ab") as segments_file:
+            segments_file.write(segment.tobytes())
+            segments_file.flush()
+            os.fsync(segments_file.fileno())
+        self.segments = np.concatenate([self.segments, segment])
+        self.segments_size += SEGMENT_DTYPE.itemsize
+        self.maps = {}
+        return len(order)
+
+    def overlapping_segments(self, start: Optional[int], end: Optional[int]) -> np.ndarray:
+        keep = np.ones(len(self.segments), dtype=bool)
+        if start is not None:
+            keep &= self.segments["max_timestamp"] >= start
+        if end is not None:
+            keep &= self.segments["min_timestamp"] <= end
+        return np.nonzero(keep)[0]
+
+    def covered_buckets(self, edges: List[int]) -> int:
+        """Number of [edges[i], edges[i + 1]) time buckets with at least one segment in them"""
+        with self.lock:
+            return sum(len(self.overlapping_segments(edges[i], edges[i + 1] - 1)) > 0 for i in range(len(edges) - 1))
+
+    def query(self, username: str, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """All points of one influencer with start <= timestamp <= end, oldest first"""
+        with self.lock:
+            empty = {column: np.zeros(0, dtype=COLUMNS[column]) for column in ("timestamp",) + METRICS}
+            if username not in self.ids or self.rows == 0:
+                return empty
+            # Same dtype as the column, or searchsorted would convert every segment it searches
+            influencer_id = COLUMNS["influencer_id"].type(self.ids[username])
+
+            id_column = self.column("influencer_id")
+            ranges = []
+            for segment in self.segments[self.overlapping_segments(start, end)]:
+                ids = id_column[segment["start"]:segment["end"]]
+                low, high = np.searchsorted(ids, influencer_id, "left"), np.searchsorted(ids, influencer_id, "right")
+                if high > low:
+                    ranges.append(np.arange(segment["start"] + low, segment["start"] + high))
+            if not ranges:
+                return empty
+
+            rows = np.concatenate(ranges)
+            timestamps = np.asarray(self.column("timestamp")[rows])
+            in_range = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                in_range &= timestamps >= start
+            if end is not None:
+                in_range &= timestamps <= end
+            rows = rows[in_range][np.argsort(timestamps[in_range], kind="stable")]
+            return {column: np.asarray(self.column(column)[rows]) for column in ("timestamp",) + METRICS}
+
+    def latest_per_bucket(self, usernames: List[str], edges: List[int], metrics=METRICS) -> Dict[str, np.ndarray]:
+        """
+        Latest value of every metric for each username in each [edges[i], edges[i + 1])
+        time bucket, shape (len(usernames), len(edges) - 1), NaN where there is none.
+        Each bucket's segments are visited newest (by max timestamp) first, and only while
+        one of them could still hold a newer point than the ones found, so full snapshots
+        cost one segment per bucket even when older snapshots were backfilled later.
+        """
+        with self.lock:
+            query_ids = np.array([self.ids.get(username, -1) for username in usernames], dtype=COLUMNS["influencer_id"])
+            result = {metric: np.full((len(usernames), len(edges) - 1), np.nan) for metric in metrics}
+            known = np.nonzero(query_ids >= 0)[0]
+            if len(known) == 0 or self.rows == 0:
+                return result
+
+            id_column = self.column("influencer_id")
+            timestamp_column = self.column("timestamp")
+            for bucket in range(len(edges) - 1):
+                bucket_start, bucket_end = edges[bucket], edges[bucket + 1]
+                segments = self.overlapping_segments(bucket_start, bucket_end - 1)
+                # Newest first; of two segments ending at the same time the later append wins
+                segments = segments[np.lexsort((-segments, -self.segments["max_timestamp"][segments]))]
+                best = np.full(len(known), np.iinfo(np.int64).min)
+                rows = np.full(len(known), -1, dtype=np.int64)
+                for segment in self.segments[segments]:
+                    newest_possible = min(int(segment["max_timestamp"]), bucket_end - 1)
+                    candidates = np.nonzero(best < newest_possible)[0]
+                    if len(candidates) == 0:
+                        break
+                    start = int(segment["start"])
+                    ids = id_column[start:segment["end"]]
+                    low = np.searchsorted(ids, query_ids[known[candidates]], "left")
+                    high = np.searchsorted(ids, query_ids[known[candidates]], "right")
+                    # Rows are sorted by time within an id: binary search each id's run for the bucket end
+                    first_after, last = low.copy(), high.copy()
+                    while True:
+                        searching = first_after < last
+                        if not searching.any():
+                            break
+                        middle = (first_after + last) // 2
+                        before_end = np.zeros(len(candidates), dtype=bool)
+                        before_end[searching] = timestamp_column[start + middle[searching]] < bucket_end
+                        first_after = np.where(searching & before_end, middle + 1, first_after)
+                        last = np.where(searching & ~before_end, middle, last)
+                    position = start + first_after - 1
+                    found = first_after > low
+                    timestamps = np.full(len(candidates), np.iinfo(np.int64).min)
+                    timestamps[found] = timestamp_column[position[found]]
+                    newer = found & (timestamps >= bucket_start) & (timestamps > best[candidates])
+                    best[candidates[newer]] = timestamps[newer]
+                    rows[candidates[newer]] = position[newer]
+
+                have = rows >= 0
+                for metric in metrics:
+                    result[metric][known[have], bucket] = np.asarray(self.column(metric)[rows[have]])
+            return result
+
+def bucket_starts(timestamps: np.ndarray, interval: str) -> np.ndarray:
+    """First day (datetime64[D]) of the calendar day, week (Monday first) or month of each timestamp"""
+    days = timestamps.astype("datetime64[s]").astype("datetime64[D]")
+    if interval == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if interval == "week":
+        # 1970-01-01 was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+    return days
+
+
+def downsample(points: Dict[str, np.ndarray], interval: str, aggregate: str = "last") -> Dict[str, np.ndarray]:
+    """
+    Aggregate time-ordered points (as returned by query()) into calendar buckets.
+    Returns the bucket start days and one aggregated value per metric and bucket.
+    """
+    buckets = bucket_starts(points["timestamp"], interval)
+    if len(buckets) == 0:
+        return {"bucket": buckets, **{metric: np.zeros(0) for metric in METRICS}}
+    starts = np.nonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))[0]
+    counts = np.diff(np.concatenate([starts, [len(buckets)]]))
+
+    result = {"bucket": buckets[starts]}
+    for metric in METRICS:
+        values = points[metric].astype(np.float64)
+        if aggregate == "last":
+            result[metric] = values[starts + counts - 1]
+        elif aggregate == "mean":
+            result[metric] = np.add.reduceat(values, starts) / counts
+        elif aggregate == "min":
+            result[metric] = np.minimum.reduceat(values, starts)
+        else:
+            result[metric] = np.maximum.reduceat(values, starts)
+    return result
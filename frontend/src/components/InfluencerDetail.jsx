@@ -138,7 +138,7 @@ const InfluencerDetail = () => {
       setSummaryLoading(true);
 
       const response = await fetch(
-        "https://influenceiq-python.onrender.com/generate-summary",
+        "https://influenceiq-python.onrender.com/generate-summary/stream",
         {
           method: "POST",
           headers: {
@@ -154,8 +154,38 @@ const InfluencerDetail = () => {
         throw new Error(`HTTP error! Status: ${response.status}`);
       }
 
-      const data = await response.json();
-      setSummary(data.summary);
+      // Read Server-Sent Events and show the summary as it is generated
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let text = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+
+        for (const rawEvent of events) {
+          const eventLine = rawEvent.split("\n").find((line) => line.startsWith("event: "));
+          const dataLine = rawEvent.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine) continue;
+
+          const eventType = eventLine ? eventLine.slice(7) : "message";
+          const data = JSON.parse(dataLine.slice(6));
+
+          if (eventType === "error") {
+            throw new Error(data.detail);
+          } else if (eventType === "done") {
+            setSummary(data.summary);
+          } else {
+            text += data.text;
+            setSummary(text);
+          }
+        }
+      }
     } catch (err) {
       setSummary("Unable to generate influencer summary at this time.");
     } finally {
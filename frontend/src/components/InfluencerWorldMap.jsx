@@ -16,14 +16,14 @@ const InfluencerWorldMap = ({ influencer }) => {
         try {
       
           const payload = {
-            influencer_name: influencer.name || "Anonymous Influencer",
+            influencer_name: influencer.channel_info || influencer.name || "Anonymous Influencer",
             influencer_country: influencer.country || "United States",
             influencer_category: influencer.category || "Technology",
             base_influence_score: influencer.influence_score || 50,
             request_type: "generate_world_influence"
           };
       
-          const response = await fetch('/api/gemini/generate-influence', {
+          const response = await fetch('https://influenceiq-python.onrender.com/api/gemini/generate-influence', {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
@@ -165,7 +165,6 @@ const Search = ({ isEmbedded = false }) => {
           searchQuery={searchQuery}
           handleInputChange={handleInputChange}
           handleSearch={handleSearch}
-          users={users}
           isLoading={isLoading}
           setSearchQuery={setSearchQuery}
         />
@@ -389,7 +388,6 @@ const Search = ({ isEmbedded = false }) => {
             searchQuery={searchQuery}
             handleInputChange={handleInputChange}
             handleSearch={handleSearch}
-            users={users}
             isLoading={isLoading}
             setSearchQuery={setSearchQuery}
           />
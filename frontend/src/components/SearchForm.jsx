@@ -7,7 +7,6 @@ const SearchForm = ({
   handleInputChange,
   handleSearch,
   isLoading,
-  users = [],
   setSearchQuery,
 }) => {
   const [isDropdownOpen, setIsDropdownOpen] = useState(false);
@@ -20,25 +19,37 @@ useEffect(() => {
     justSelectedRef.current = false; 
     return; 
   }
-  if (searchQuery && users?.length > 0) {
-    const filtered = users
-  .filter(user =>
-    user.channel_info &&
-    user.channel_info.toLowerCase().includes(searchQuery.toLowerCase())
-  )
-  .slice(0, 8);
-
+  if (!searchQuery || !searchQuery.trim()) {
+    setFilteredUsers([]);
+    setIsDropdownOpen(false);
+    return;
+  }
 
-    
-    if (JSON.stringify(filtered) !== JSON.stringify(filteredUsers)) {
+  // Ask the server's search index instead of filtering the whole user list here
+  const controller = new AbortController();
+  const timer = setTimeout(async () => {
+    try {
+      const response = await fetch(
+        `https://influenceiq-python.onrender.com/search?q=${encodeURIComponent(searchQuery)}&limit=8`,
+        { signal: controller.signal }
+      );
+      const data = await response.json();
+      const filtered = data.results || [];
       setFilteredUsers(filtered);
       setIsDropdownOpen(filtered.length > 0);
+    } catch (err) {
+      if (err.name !== "AbortError") {
+        setFilteredUsers([]);
+        setIsDropdownOpen(false);
+      }
     }
-  } else if (filteredUsers.length > 0) {
-    setFilteredUsers([]);
-    setIsDropdownOpen(false);
-  }
-}, [searchQuery, users]);
+  }, 150);
+
+  return () => {
+    clearTimeout(timer);
+    controller.abort();
+  };
+}, [searchQuery]);
 
 
   useEffect(() => {